@@ -1,4 +1,5 @@
 from action_type import ActionType
+from metrics import metrics_registry
 
 
 class Action:
@@ -18,7 +19,22 @@ class Action:
         :param data_sources: all data sources available to the agent including query results
         :return: data sources with possibly updated query results
         """
-        result = self.action_type.value[1](data_sources, scenario)
+        with metrics_registry.span("agent_action_seconds", action=self.action_type.name):
+            result = self.action_type.value[1](data_sources, scenario)
+        if result != "":
+            self.no_result = result.is_empty()
+
+        return data_sources
+
+    async def execute_async(self, data_sources, scenario):
+        """
+        Execute functionality, which is assigned to the action type, without blocking the event loop.
+        :param scenario: scenario to be evaluated
+        :param data_sources: all data sources available to the agent including query results
+        :return: data sources with possibly updated query results
+        """
+        with metrics_registry.span("agent_action_seconds", action=self.action_type.name):
+            result = await self.action_type.value[2](data_sources, scenario)
         if result != "":
             self.no_result = result.is_empty()
 
@@ -0,0 +1,128 @@
+import logging
+import os
+import random
+import threading
+from collections import deque
+
+# Veracities at which the answer of "Agent.construct_answer" changes: between false and true at 0, and to high
+# confidence beyond -0.5 and 0.5
+ANSWER_THRESHOLDS = (-0.5, 0.0, 0.5)
+
+
+class ActionPlanner:
+    """
+    The action planner decides whether querying another data source is still worth its cost. For every action type it
+    observes how long the action takes and how much it changes the veracity. Before the agent queries a data source,
+    the planner estimates how far the answer could still move the veracity: the "quantile" of the changes observed in
+    the last "window" evaluations, or the trust in the data source as long as fewer than "min_observations" changes
+    have been observed. If the veracity is further than this estimate plus "margin" away from every threshold of the
+    answer, the data source cannot change the answer and the agent answers right away. Data sources whose observed
+    latency is below "min_latency" seconds are always queried. A skipped action is never observed, so an
+    "exploration" share of the actions that could be skipped is taken anyway to keep the estimate up to date. The
+    planner is shared by all agents of the process.
+    """
+    def __init__(self, enabled=False, margin=0.0, min_latency=0.0, min_observations=20, quantile=0.95, window=500,
+                 smoothing=0.2, exploration=0.05, thresholds=ANSWER_THRESHOLDS, seed=None):
+        self.enabled = enabled
+        self.margin = margin
+        self.min_latency = min_latency
+        self.min_observations = min_observations
+        self.quantile = quantile
+        self.smoothing = smoothing
+        self.exploration = exploration
+        self.thresholds = thresholds
+        self.random = random.Random(seed)
+
+        self.window = window
+        self.changes = {}
+        self.latencies = {}
+        self.calls = {}
+        self.skips = {}
+        self.explorations = {}
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_environment(cls):
+        """
+        Create a planner from the settings in the environment variables.
+        :return: action planner
+        """
+        return cls(os.environ.get("AGENT_EARLY_EXIT", "0") == "1",
+                   float(os.environ.get("AGENT_EARLY_EXIT_MARGIN", 0.0)),
+                   float(os.environ.get("AGENT_EARLY_EXIT_MIN_LATENCY", 0.0)),
+                   int(os.environ.get("AGENT_EARLY_EXIT_MIN_OBSERVATIONS", 20)),
+                   float(os.environ.get("AGENT_EARLY_EXIT_QUANTILE", 0.95)),
+                   exploration=float(os.environ.get("AGENT_EARLY_EXIT_EXPLORATION", 0.05)))
+
+    def record(self, action_type, latency, change):
+        """
+        Record an executed action.
+        :param action_type: type of the action
+        :param latency: seconds the action took
+        :param change: change of the veracity caused by the action
+        """
+        with self.lock:
+            self.changes.setdefault(action_type, deque(maxlen=self.window)).append(abs(change))
+            # Exponentially weighted moving average, so the latency follows a data source that slows down
+            previous_latency = self.latencies.get(action_type)
+            self.latencies[action_type] = latency if previous_latency is None \
+                else previous_latency + self.smoothing * (latency - previous_latency)
+            self.calls[action_type] = self.calls.get(action_type, 0) + 1
+
+    def estimate_change(self, action_type, max_change):
+        """
+        Estimate how much an action could still change the veracity.
+        :param action_type: type of the action
+        :param max_change: largest possible change, the trust in the data source queried by the action
+        :return: estimated change
+        """
+        with self.lock:
+            changes = sorted(self.changes.get(action_type, ()))
+        if not changes or len(changes) < self.min_observations:
+            return max_change
+        return min(max_change, changes[int(self.quantile * (len(changes) - 1))])
+
+    def can_skip(self, action_type, veracity, max_change):
+        """
+        Decide whether an action can be skipped, because it cannot change the answer of the current veracity.
+        :param action_type: type of the action the agent would take next
+        :param veracity: current veracity of the environment state
+        :param max_change: largest possible change, the trust in the data source queried by the action
+        :return: whether the agent can answer without taking the action
+        """
+        if not self.enabled:
+            return False
+
+        estimated_change = self.estimate_change(action_type, max_change)
+        reach = estimated_change + self.margin
+        with self.lock:
+            latency = self.latencies.get(action_type)
+            expensive = latency is None or latency >= self.min_latency
+            skip = expensive and not any(veracity - reach <= threshold <= veracity + reach
+                                         for threshold in self.thresholds)
+            explore = skip and self.random.random() < self.exploration
+            if explore:
+                self.explorations[action_type] = self.explorations.get(action_type, 0) + 1
+            elif skip:
+                self.skips[action_type] = self.skips.get(action_type, 0) + 1
+
+        decision = "exploring " if explore else "skipping " if skip else "taking "
+        logging.info(" Planner: " + decision + action_type.name + " at veracity " + str(veracity)
+                     + ", estimated change " + str(estimated_change) + ", latency " + str(latency))
+        return skip and not explore
+
+    def get_statistics(self):
+        """
+        Return what the planner observed per action type.
+        :return: dictionary of statistics per name of the action type
+        """
+        with self.lock:
+            statistics = {action_type: {
+                "calls": self.calls[action_type],
+                "skips": self.skips.get(action_type, 0),
+                "explorations": self.explorations.get(action_type, 0),
+                "latency": self.latencies[action_type]
+            } for action_type in self.calls}
+        for action_type, action_statistics in statistics.items():
+            action_statistics["estimated_change"] = self.estimate_change(action_type, 1.0)
+        return {action_type.name: action_statistics for action_type, action_statistics in statistics.items()}
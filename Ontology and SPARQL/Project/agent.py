@@ -1,124 +1,398 @@
 import logging
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
 
-from environment_state import EnvironmentState
 from internal_state import InternalState
 from action import Action
 from action_type import ActionType
+from evaluation_context import EvaluationContext
+from evaluation_result import EvaluationResult
+from knowledge_base import KnowledgeBase
+from lazy_data_sources import LazyDataSources
+from metrics import metrics_registry, profile_call
 from ontology_helper import OntologyHelper
+from prefetched_data_source import PrefetchedDataSource
+from replay_twitter_helper import ReplayTwitterHelper
+from text_normalizer import form_query
 from twitter_helper import TwitterHelper
 
 logging.getLogger().setLevel(logging.WARN)
 
+# Action that queries a data source, used when all data sources are queried at once
+QUERY_ACTION_TYPES = {"ontology": ActionType.QUERY_ONTOLOGY, "twitter": ActionType.QUERY_TWITTER}
 
-class Agent:
+# Explanation of a data source that did not answer within its latency budget
+TIMEOUT_EXPLANATIONS = {
+    "ontology": "Searching my own knowledge about the world did not finish in time.",
+    "twitter": "Twitter did not respond in time."
+}
 
-    def __init__(self):
-        self.environment_state = EnvironmentState("", 0)
-        self.previous_veracity = 0
+# Explanation of a data source that the planner did not query, because it could not have changed the verdict
+SKIPPED_EXPLANATIONS = {
+    "twitter": "I did not search twitter, because it could not have changed my conclusion."
+}
 
-        self.internal_state = InternalState(-1, -1)
-        self.recent_action = Action(ActionType.NO_ACTION)
 
-        self.starting_state = True
+class Agent:
 
-        self.data_sources = {
-            "ontology": OntologyHelper(),
-            "twitter": TwitterHelper()
-        }
+    def __init__(self):
+        # The data source helpers share the process-wide knowledge base and therefore stay warm between evaluations.
+        # They are never changed by an evaluation, so several threads can evaluate scenarios with the same agent. A
+        # helper, and with it the part of the knowledge base it needs, is only created when its action first runs.
+        self.data_sources = LazyDataSources({
+            "ontology": OntologyHelper,
+            "twitter": ReplayTwitterHelper if os.environ.get("AGENT_TWITTER_SOURCE") == "replay" else TwitterHelper
+        })
         self.ontology_trust = 0.5
         self.twitter_trust = 0.5
 
-    def reset(self):
-        self.__init__()
+        # In concurrent mode all data sources are queried at once, and a data source that does not answer within its
+        # latency budget (in seconds, unlimited if unset) contributes no evidence
+        self.concurrent = os.environ.get("AGENT_CONCURRENT_QUERIES", "0") == "1"
+        self.latency_budgets = {
+            "ontology": float(os.environ.get("AGENT_ONTOLOGY_LATENCY_BUDGET", 0)) or None,
+            "twitter": float(os.environ.get("AGENT_TWITTER_LATENCY_BUDGET", 0)) or None
+        }
+
+    @property
+    def action_planner(self):
+        # Decides whether querying twitter is still worth it, see "rule_matching"
+        return KnowledgeBase.get_instance().action_planner
+
+    def load_data_sources(self, names=None):
+        """
+        The function "load_data_sources" creates the helpers of the data sources right away instead of on first use,
+        for example before the server forks its workers, so that they start warm.
+        :param names: names of the data sources, all data sources if None
+        """
+        self.data_sources.load(names)
+
+    def create_context(self, scenario):
+        """
+        The function "create_context" starts the evaluation of a scenario with its own state and its own data source
+        helpers, which share their connections with the data source helpers of the agent. The helpers of the
+        evaluation are created when the evaluation first queries their data source.
+        :param scenario: user input to be evaluated
+        :return: evaluation context
+        """
+        return EvaluationContext(scenario, LazyDataSources({
+            name: lambda name=name: self.data_sources[name].for_evaluation() for name in self.data_sources
+        }))
 
     def evaluate_scenario(self, scenario):
         """
         The function "evaluate_scenario" calls the agent function ("agent_function") and updates the environment state
         until all obtainable information is collected, more specifically until the recent action is of type
-        ActionType.NO_ACTION or ActionType.RETURN_ANSWER.
+        ActionType.NO_ACTION or ActionType.RETURN_ANSWER. All state of the evaluation is kept in its own evaluation
+        context, so the agent can evaluate several scenarios at the same time.
         :param scenario: user input to be evaluated
         :return: explanation in natural language as to how the agent evaluates the given scenario
         """
-        self.environment_state = EnvironmentState(scenario, 0)
+        return self.evaluate_context(self.create_context(scenario))
 
-        while self.recent_action.action_type != ActionType.RETURN_ANSWER or self.starting_state:
-            self.log()
+    def evaluate_context(self, context):
+        """
+        The function "evaluate_context" runs the condition-action loop of "evaluate_scenario" on the given context.
+        :param context: evaluation context of the scenario
+        :return: explanation in natural language as to how the agent evaluates the scenario
+        """
+        with metrics_registry.span("agent_evaluation_seconds"):
+            if self.concurrent:
+                self.query_concurrently(context)
 
-            next_action = self.agent_function()
-            self.data_sources = next_action.execute(self.data_sources, self.environment_state.scenario)
-            self.recent_action = next_action
-            self.update_environment_state()
+            while context.recent_action.action_type != ActionType.RETURN_ANSWER or context.starting_state:
+                self.log(context)
 
-            self.starting_state = False
+                next_action = self.agent_function(context)
+                action_start = time.perf_counter()
+                context.data_sources = next_action.execute(context.data_sources, context.environment_state.scenario)
+                context.recent_action = next_action
+                self.update_environment_state(context)
+                self.record_action(context, time.perf_counter() - action_start)
 
-        last_env_state = self.environment_state
-        ontology_explanation = self.data_sources["ontology"].get_nl_explanation(last_env_state.veracity > 0)
-        twitter_explanation = self.data_sources["twitter"].get_nl_explanation(last_env_state.veracity > 0)
+                context.starting_state = False
 
-        self.log()
-        self.reset()
+            return self.finish_evaluation(context)
 
-        return self.construct_answer(last_env_state, ontology_explanation, twitter_explanation)
+    async def evaluate_scenario_async(self, scenario):
+        """
+        The function "evaluate_scenario_async" runs the same condition-action loop as "evaluate_scenario" on an event
+        loop. The data sources are queried on their thread pools, so the loop is free to run other evaluations while
+        they wait, with the same agent or with different ones.
+        :param scenario: user input to be evaluated
+        :return: explanation in natural language as to how the agent evaluates the given scenario
+        """
+        context = self.create_context(scenario)
+        with metrics_registry.span("agent_evaluation_seconds"):
+            if self.concurrent:
+                await self.query_concurrently_async(context)
+
+            while context.recent_action.action_type != ActionType.RETURN_ANSWER or context.starting_state:
+                self.log(context)
+
+                next_action = self.agent_function(context)
+                action_start = time.perf_counter()
+                context.data_sources = await next_action.execute_async(context.data_sources,
+                                                                       context.environment_state.scenario)
+                context.recent_action = next_action
+                self.update_environment_state(context)
+                self.record_action(context, time.perf_counter() - action_start)
+
+                context.starting_state = False
+
+            return self.finish_evaluation(context)
+
+    def finish_evaluation(self, context):
+        """
+        The function "finish_evaluation" explains the last environment state of an evaluation.
+        :param context: evaluation context of the scenario
+        :return: explanation in natural language as to how the agent evaluates the scenario
+        """
+        with metrics_registry.span("agent_answer_seconds"):
+            last_env_state = context.environment_state
+            ontology_explanation = self.get_nl_explanation(context, "ontology", last_env_state.veracity > 0)
+            twitter_explanation = self.get_nl_explanation(context, "twitter", last_env_state.veracity > 0)
+
+            self.log(context)
+
+            return self.construct_answer(last_env_state, ontology_explanation, twitter_explanation)
+
+    def profile_scenario(self, scenario, sort="cumulative", limit=30):
+        """
+        The function "profile_scenario" evaluates a single scenario under cProfile, to find out where the time of a
+        slow evaluation goes.
+        :param scenario: user input to be evaluated
+        :param sort: key the profile is sorted by
+        :param limit: number of functions that are reported
+        :return: explanation in natural language and the report of the profile
+        """
+        return profile_call(self.evaluate_scenario, scenario, sort=sort, limit=limit)
 
-    def agent_function(self):
+    def evaluate_many(self, scenarios):
+        """
+        The function "evaluate_many" evaluates a batch of scenarios. Scenarios that are equal after normalization are
+        only looked up once. The ontology evidence of scenarios that match the same catalog entry is collected once, and
+        the searches on twitter are sent together. Every scenario is then evaluated like in "evaluate_scenario" on the
+        results obtained for it.
+        :param scenarios: list of user inputs to be evaluated
+        :return: list of evaluation results with the answer and duration for every scenario, in the order of the input
+        """
+        start = time.perf_counter()
+
+        keys = [form_query(scenario) for scenario in scenarios]
+        # The first occurrence of every normalized scenario is looked up for all of its duplicates
+        unique_scenarios = {}
+        for key, scenario in zip(keys, scenarios):
+            unique_scenarios.setdefault(key, scenario)
+
+        ontology_results = dict(zip(unique_scenarios,
+                                    self.data_sources["ontology"].execute_many(list(unique_scenarios.values()))))
+        twitter_results = dict(zip(unique_scenarios,
+                                   self.data_sources["twitter"].execute_many(list(unique_scenarios.values()))))
+        shared_duration = (time.perf_counter() - start) / max(len(scenarios), 1)
+
+        evaluation_results = []
+        for key, scenario in zip(keys, scenarios):
+            scenario_start = time.perf_counter()
+            context = EvaluationContext(scenario, {
+                "ontology": PrefetchedDataSource(self.data_sources["ontology"].for_evaluation(), ontology_results[key]),
+                "twitter": PrefetchedDataSource(self.data_sources["twitter"].for_evaluation(), twitter_results[key])
+            })
+            answer = self.evaluate_context(context)
+            evaluation_results.append(
+                EvaluationResult(scenario, answer, shared_duration + time.perf_counter() - scenario_start))
+
+        return evaluation_results
+
+    def query_concurrently(self, context):
+        """
+        The function "query_concurrently" starts the queries of all data sources at once and merges their confidences
+        into the environment state in the order in which the data sources answer. Every answer goes through the same
+        environment and internal state transitions as the action querying that data source in "evaluate_scenario", so
+        the agent afterwards only has to return the answer. A data source that exceeds its latency budget is treated
+        like one without results.
+        """
+        running, deadlines = self.start_concurrent_queries(context)
+        while running:
+            done, _ = wait(list(running), timeout=self.get_wait_timeout(running, deadlines),
+                           return_when=FIRST_COMPLETED)
+            self.merge_finished_queries(context, running, deadlines, done)
+
+    async def query_concurrently_async(self, context):
+        """
+        The function "query_concurrently_async" is the variant of "query_concurrently" for an event loop, which waits
+        for the data sources without blocking the loop.
+        """
+        # Only evaluations on an event loop import asyncio, see "IDataSourceHelper.execute_queries_async"
+        import asyncio
+
+        running, deadlines = self.start_concurrent_queries(context)
+        # Futures of the event loop that follow the futures of the data sources, without cancelling them on timeout
+        wrapped = {future: asyncio.wrap_future(future) for future in running}
+        for wrapper in wrapped.values():
+            # Errors are raised from the futures of the data sources, they are only marked as seen on the event loop
+            wrapper.add_done_callback(lambda done_wrapper: done_wrapper.cancelled() or done_wrapper.exception())
+        while running:
+            done, _ = await asyncio.wait([wrapped[future] for future in running],
+                                         timeout=self.get_wait_timeout(running, deadlines),
+                                         return_when=asyncio.FIRST_COMPLETED)
+            self.merge_finished_queries(context, running, deadlines,
+                                        {future for future in running if wrapped[future] in done})
+
+    def start_concurrent_queries(self, context):
+        """
+        Start the queries of all data sources.
+        :param context: evaluation context of the scenario
+        :return: dictionary of the running futures with the names of their data sources, and the deadlines of the
+                 futures of data sources with a latency budget
+        """
+        start = time.monotonic()
+        context.queries_started = start
+        running = {}
+        deadlines = {}
+        for name, data_source in context.data_sources.items():
+            future = data_source.start_queries(context.environment_state.scenario)
+            running[future] = name
+            if self.latency_budgets.get(name) is not None:
+                deadlines[future] = start + self.latency_budgets[name]
+        return running, deadlines
+
+    @staticmethod
+    def get_wait_timeout(running, deadlines):
+        pending_deadlines = [deadlines[future] for future in running if future in deadlines]
+        return max(0.0, min(pending_deadlines) - time.monotonic()) if pending_deadlines else None
+
+    def merge_finished_queries(self, context, running, deadlines, done):
+        """
+        Merge the data sources that answered and give up on the ones whose latency budget ran out.
+        :param context: evaluation context of the scenario
+        :param running: dictionary of the running futures with the names of their data sources, updated in place
+        :param deadlines: deadlines of the futures of data sources with a latency budget
+        :param done: futures that finished
+        """
+        # Data sources that answered at the same time are merged in the order of "data_sources"
+        now = time.monotonic()
+        for future in [future for future in running if future in done]:
+            name = running.pop(future)
+            result = context.data_sources[name].finish_queries(future)
+            self.merge_query(context, name, result.is_empty())
+            self.record_action(context, now - context.queries_started)
+
+        # Data sources that did not answer are not recorded, their latency and effect are unknown
+        for future in [future for future in running if future in deadlines and deadlines[future] <= now]:
+            name = running.pop(future)
+            logging.warning("Querying " + name + " exceeded the latency budget of "
+                            + str(self.latency_budgets[name]) + " s")
+            context.timed_out_sources.add(name)
+            self.merge_query(context, name, True)
+
+    def merge_query(self, context, name, no_result):
+        """
+        The function "merge_query" applies the state transitions of the action that queried the given data source.
+        :param context: evaluation context of the scenario
+        :param name: name of the data source that answered
+        :param no_result: whether the data source found nothing or did not answer in time
+        """
+        self.log(context)
+
+        action = Action(QUERY_ACTION_TYPES[name])
+        action.no_result = no_result
+        context.recent_action = action
+        self.update_environment_state(context)
+
+        context.starting_state = False
+        self.update_internal_state(context)
+
+    def record_action(self, context, latency):
+        """
+        The function "record_action" lets the planner observe the latency of the recent action and its effect on the
+        veracity, if the action queried a data source.
+        :param context: evaluation context of the scenario
+        :param latency: seconds the recent action took
+        """
+        if context.recent_action.action_type in QUERY_ACTION_TYPES.values():
+            self.action_planner.record(context.recent_action.action_type, latency,
+                                       context.environment_state.veracity - context.previous_veracity)
+
+    def get_nl_explanation(self, context, name, positive):
+        if name in context.timed_out_sources:
+            return TIMEOUT_EXPLANATIONS[name]
+        if name in context.skipped_sources:
+            return SKIPPED_EXPLANATIONS[name]
+        return context.data_sources[name].get_nl_explanation(positive)
+
+    def agent_function(self, context):
         """
         The function "agent_function" updates the internal state and obtains the next action from function
         "rule_matching"
+        :param context: evaluation context of the scenario
         :return: action = next action to take
         """
-        self.update_internal_state()
-        return self.rule_matching()
+        self.update_internal_state(context)
+        return self.rule_matching(context)
 
-    def rule_matching(self):
+    def rule_matching(self, context):
         """
         The function "rule_matching" takes as input the current internal state and returns an action. It implements
         the condition-action rules.
+        :param context: evaluation context of the scenario
         :return: action = next action to take
         """
-        if self.internal_state.ontology_queried == -1:  # refers to internal state (-1, -1)
+        if context.internal_state.ontology_queried == -1:  # refers to internal state (-1, -1)
             return Action(ActionType.QUERY_ONTOLOGY)
-        if self.internal_state.twitter_queried == -1:  # refers to internal states (0, -1) and (1, -1)
+        if context.internal_state.twitter_queried == -1:  # refers to internal states (0, -1) and (1, -1)
+            # Twitter is not queried if its answer could not flip the verdict of the ontology
+            if self.action_planner.can_skip(ActionType.QUERY_TWITTER, context.environment_state.veracity,
+                                            self.twitter_trust):
+                context.skipped_sources.add("twitter")
+                return Action(ActionType.RETURN_ANSWER)
             return Action(ActionType.QUERY_TWITTER)
         return Action(ActionType.RETURN_ANSWER)  # refers to internal states (0, 0), (0, 1), (1, 0), (1, 1)
 
-    def update_environment_state(self):
+    def update_environment_state(self, context):
         """
         The function "update_environment_state" implements the environment state transitions. Every action taken
         changes the veracity of the environment state.
+        :param context: evaluation context of the scenario
         """
-        self.previous_veracity = self.environment_state.veracity
-        recent_action_type = self.recent_action.action_type
+        context.previous_veracity = context.environment_state.veracity
+        recent_action_type = context.recent_action.action_type
 
         if recent_action_type == ActionType.NO_ACTION or recent_action_type == ActionType.RETURN_ANSWER:
             return
 
-        if recent_action_type == ActionType.QUERY_ONTOLOGY and not self.recent_action.no_result:
-            self.environment_state.veracity = \
-                self.previous_veracity + self.ontology_trust * self.data_sources["ontology"].get_result_confidence()
-        elif recent_action_type == ActionType.QUERY_TWITTER and not self.recent_action.no_result:
-            self.environment_state.veracity = \
-                self.previous_veracity + self.twitter_trust * self.data_sources["twitter"].get_result_confidence()
+        data_sources = context.data_sources
+        if recent_action_type == ActionType.QUERY_ONTOLOGY and not context.recent_action.no_result:
+            context.environment_state.veracity = \
+                context.previous_veracity + self.ontology_trust * data_sources["ontology"].get_result_confidence()
+        elif recent_action_type == ActionType.QUERY_TWITTER and not context.recent_action.no_result:
+            context.environment_state.veracity = \
+                context.previous_veracity + self.twitter_trust * data_sources["twitter"].get_result_confidence()
 
-    def update_internal_state(self):
+    def update_internal_state(self, context):
         """
         The function "update_internal_state" represents the model of the agent, meaning the knowledge of the agent of
         how the world works. It updates the internal state depending on the previous veracity, current veracity
         and current internal state. If the veracity has not changed, the internal state will stay the same.
+        :param context: evaluation context of the scenario
         """
-        current_internal_state = self.internal_state
-        current_veracity = self.environment_state.veracity
+        current_internal_state = context.internal_state
+        current_veracity = context.environment_state.veracity
+        previous_veracity = context.previous_veracity
+        recent_action_type = context.recent_action.action_type
 
-        if self.starting_state:
+        if context.starting_state:
             return
 
-        if self.recent_action.action_type == ActionType.QUERY_ONTOLOGY and current_veracity != self.previous_veracity:
-            self.internal_state = InternalState(1, current_internal_state.twitter_queried)
-        elif self.recent_action.action_type == ActionType.QUERY_ONTOLOGY and current_veracity == self.previous_veracity:
-            self.internal_state = InternalState(0, current_internal_state.twitter_queried)
-        elif self.recent_action.action_type == ActionType.QUERY_TWITTER and current_veracity != self.previous_veracity:
-            self.internal_state = InternalState(current_internal_state.ontology_queried, 1)
-        elif self.recent_action.action_type == ActionType.QUERY_TWITTER and current_veracity == self.previous_veracity:
-            self.internal_state = InternalState(current_internal_state.ontology_queried, 0)
+        if recent_action_type == ActionType.QUERY_ONTOLOGY and current_veracity != previous_veracity:
+            context.internal_state = InternalState(1, current_internal_state.twitter_queried)
+        elif recent_action_type == ActionType.QUERY_ONTOLOGY and current_veracity == previous_veracity:
+            context.internal_state = InternalState(0, current_internal_state.twitter_queried)
+        elif recent_action_type == ActionType.QUERY_TWITTER and current_veracity != previous_veracity:
+            context.internal_state = InternalState(current_internal_state.ontology_queried, 1)
+        elif recent_action_type == ActionType.QUERY_TWITTER and current_veracity == previous_veracity:
+            context.internal_state = InternalState(current_internal_state.ontology_queried, 0)
 
     def construct_answer(self, last_env_state, ontology_explanation, twitter_explanation):
         veracity = last_env_state.veracity
@@ -144,7 +418,10 @@ class Agent:
 
         return answer
 
-    def log(self):
-        logging_message = " Veracity: " + str(self.environment_state.veracity) + " "\
-                          "Recent action: " + str(self.recent_action.action_type.value[0])
+    def log(self, context):
+        # The message is only built if it is logged
+        if not logging.getLogger().isEnabledFor(logging.INFO):
+            return
+        logging_message = " Veracity: " + str(context.environment_state.veracity) + " "\
+                          "Recent action: " + str(context.recent_action.action_type.value[0])
         logging.info(logging_message)
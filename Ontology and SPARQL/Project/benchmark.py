@@ -0,0 +1,159 @@
+import argparse
+import itertools
+import os
+import statistics
+import time
+from contextlib import contextmanager
+
+from agent import Agent
+from knowledge_base import KnowledgeBase
+from metrics import metrics_registry
+
+SCENARIOS = [
+    "Healthy people are happy",
+    "Individual sports require lower body",
+    "Sugar is good for people"
+]
+# Disables the result caches of both data sources and the memo of the sentiment engine, so that every statement is
+# evaluated against the data sources instead of repeating a cached result
+UNCACHED_ENVIRONMENT = {
+    "AGENT_ONTOLOGY_CACHE_SIZE": "0",
+    "AGENT_ONTOLOGY_CACHE_PATH": "",
+    "AGENT_TWITTER_CACHE_TTL": "0",
+    "AGENT_TWITTER_CACHE_PATH": "",
+    "AGENT_SENTIMENT_MEMO_SIZE": "0"
+}
+
+
+@contextmanager
+def uncached_environment():
+    """
+    Disable the caches for the knowledge bases created within the context.
+    """
+    previous_environment = {name: os.environ.get(name) for name in UNCACHED_ENVIRONMENT}
+    os.environ.update(UNCACHED_ENVIRONMENT)
+    try:
+        yield
+    finally:
+        for name, value in previous_environment.items():
+            if value is None:
+                del os.environ[name]
+            else:
+                os.environ[name] = value
+
+
+def evaluate(agent, scenario, ontology_only):
+    """
+    Evaluate a single scenario, either end-to-end or only against the ontology.
+    :param agent: agent that evaluates the scenario
+    :param scenario: scenario to be evaluated
+    :param ontology_only: whether twitter is left out of the evaluation
+    """
+    if not ontology_only:
+        agent.evaluate_scenario(scenario)
+        return
+
+    ontology = agent.data_sources["ontology"].for_evaluation()
+    ontology.execute_queries(scenario)
+    ontology.get_result_confidence()
+
+
+def run_cold(scenarios, ontology_only):
+    """
+    Create the knowledge base and the agent anew for every scenario and compile the ontology from its .owl files again
+    each time, which is how the agent behaved before the knowledge base was shared between evaluations.
+    """
+    timings = []
+    for scenario in scenarios:
+        start = time.perf_counter()
+        KnowledgeBase.reset_instance(rebuild=True)
+        evaluate(Agent(), scenario, ontology_only)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def run_warm(scenarios, ontology_only):
+    """
+    Evaluate all scenarios with one agent on top of a knowledge base that has been loaded beforehand.
+    """
+    KnowledgeBase.reset_instance()
+    agent = Agent()
+    agent.load_data_sources()
+
+    timings = []
+    for scenario in scenarios:
+        start = time.perf_counter()
+        evaluate(agent, scenario, ontology_only)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def run_batch(scenarios, ontology_only):
+    """
+    Evaluate all scenarios in one batch on top of a knowledge base that has been loaded beforehand, end-to-end with
+    "Agent.evaluate_many" or only against the ontology with "OntologyHelper.execute_many". The time of the batch
+    lookup is shared evenly among the scenarios.
+    """
+    KnowledgeBase.reset_instance()
+    agent = Agent()
+    agent.load_data_sources()
+    if not ontology_only:
+        return [evaluation_result.duration for evaluation_result in agent.evaluate_many(scenarios)]
+
+    ontology = agent.data_sources["ontology"]
+    start = time.perf_counter()
+    results = ontology.execute_many(scenarios)
+    shared_duration = (time.perf_counter() - start) / max(len(scenarios), 1)
+
+    timings = []
+    for result in results:
+        start = time.perf_counter()
+        helper = ontology.for_evaluation()
+        helper.result = result
+        helper.get_result_confidence()
+        timings.append(shared_duration + time.perf_counter() - start)
+    return timings
+
+
+def report(name, timings):
+    timings = sorted(timings)
+    p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+    print("{:<6} total {:8.3f} s | mean {:8.3f} ms | median {:8.3f} ms | p99 {:8.3f} ms".format(
+        name, sum(timings), statistics.mean(timings) * 1000, statistics.median(timings) * 1000, p99 * 1000))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare evaluating many statements with a cold and a warm agent.")
+    parser.add_argument("-n", "--statements", type=int, default=300, help="number of statements to evaluate")
+    parser.add_argument("--ontology-only", action="store_true", help="do not query twitter")
+    parser.add_argument("--metrics", action="store_true", help="print the latency of every stage in the end")
+    parser.add_argument("--batch", action="store_true", help="also evaluate all statements end-to-end in one batch")
+    args = parser.parse_args()
+
+    scenarios = list(itertools.islice(itertools.cycle(SCENARIOS), args.statements))
+
+    # The caches would answer all but the first statements of a run, so they are only enabled for the last run
+    with uncached_environment():
+        cold = run_cold(scenarios, args.ontology_only)
+        warm = run_warm(scenarios, args.ontology_only)
+        batch = run_batch(scenarios, args.ontology_only) if args.batch else None
+    cached = run_warm(scenarios, args.ontology_only)
+
+    print("Evaluated {} statements per run, without caches unless stated".format(len(scenarios)))
+    report("cold", cold)
+    report("warm", warm)
+    print("speedup {:.1f}x".format(sum(cold) / sum(warm)))
+
+    if batch is not None:
+        report("batch", batch)
+        print("speedup over warm {:.1f}x".format(sum(warm) / sum(batch)))
+
+    report("cached", cached)
+    print("speedup of the caches over warm {:.1f}x".format(sum(warm) / sum(cached)))
+
+    if args.metrics:
+        print(metrics_registry.to_prometheus(), end="")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+import types
+from collections import defaultdict
+
+INDEX_IRI = "http://www.semanticweb.org/schon/ontologies/2022/10/ClassIndex#"
+
+
+def direct_superclasses(world):
+    """
+    Collect the asserted rdfs:subClassOf relations between named classes of a world.
+    :param world: owlready2 world
+    :return: dictionary mapping the storid of every class to the storids of its direct superclasses
+    """
+    # owlready2 is only imported once an ontology is loaded, see "quadstore.open_quadstore"
+    from owlready2 import rdfs_subclassof
+
+    parents = defaultdict(set)
+    for child, parent in world.graph.execute("SELECT s, o FROM objs WHERE p=? AND s>0 AND o>0", (rdfs_subclassof,)):
+        parents[child].add(parent)
+    return parents
+
+
+def subclass_closure(parents):
+    """
+    Compute the reflexive, transitive closure of rdfs:subClassOf.
+    :param parents: direct superclasses as returned by "direct_superclasses"
+    :return: dictionary mapping the storid of every class to the storids of all its superclasses, itself included
+    """
+    closure = {}
+    for start in set(parents).union(*parents.values()):
+        ancestors = {start}
+        stack = [start]
+        while stack:
+            for parent in parents.get(stack.pop(), ()):
+                if parent not in ancestors:
+                    ancestors.add(parent)
+                    stack.append(parent)
+        closure[start] = ancestors
+    return closure
+
+
+def materialize(world):
+    """
+    Materialize the class hierarchy of a world into a separate index ontology, so that SPARQL property paths over
+    rdfs:subClassOf become lookups of a single, indexed triple:
+        ?c idx:subClassOf ?d             is equivalent to   ?c rdfs:subClassOf* ?d
+        ?x idx:instanceOf ?d             is equivalent to   ?x a/rdfs:subClassOf* ?d
+        ?x idx:instanceOfSubClassOf ?d   is equivalent to   ?x a/rdfs:subClassOf ?d
+    The index has to be rebuilt whenever the ontology changes, which is why it is part of the quadstore build.
+    :param world: writable owlready2 world that holds the ontology
+    :return: index ontology
+    """
+    from owlready2 import ObjectProperty, rdf_type
+
+    direct_parents = direct_superclasses(world)
+    closure = subclass_closure(direct_parents)
+    class_types = list(world.graph.execute("SELECT s, o FROM objs WHERE p=? AND s>0 AND o>0", (rdf_type,)))
+
+    index_ontology = world.get_ontology(INDEX_IRI)
+    with index_ontology:
+        sub_class_of = types.new_class("subClassOf", (ObjectProperty,))
+        instance_of = types.new_class("instanceOf", (ObjectProperty,))
+        instance_of_sub_class_of = types.new_class("instanceOfSubClassOf", (ObjectProperty,))
+
+    for child, ancestors in closure.items():
+        for ancestor in ancestors:
+            index_ontology._add_obj_triple_raw_spo(child, sub_class_of.storid, ancestor)
+
+    for instance, class_type in class_types:
+        for ancestor in closure.get(class_type, (class_type,)):
+            index_ontology._add_obj_triple_raw_spo(instance, instance_of.storid, ancestor)
+        for parent in direct_parents.get(class_type, ()):
+            index_ontology._add_obj_triple_raw_spo(instance, instance_of_sub_class_of.storid, parent)
+
+    return index_ontology
+
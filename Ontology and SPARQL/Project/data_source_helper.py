@@ -1,4 +1,6 @@
+import copy
 from abc import abstractmethod, ABC
+from concurrent.futures import Future
 
 from result import IResult
 
@@ -20,3 +22,58 @@ class IDataSourceHelper(ABC):
     @abstractmethod
     def execute_queries(self, scenario) -> IResult:
         pass
+
+    def for_evaluation(self):
+        """
+        Return a helper for a single evaluation. It shares the (expensive) connection to the data source with this
+        helper, but collects its own result, so evaluations running at the same time do not see each other's results
+        and this helper is never changed by them.
+        :return: data source helper of one evaluation
+        """
+        helper = copy.copy(self)
+        helper.reset_result()
+        return helper
+
+    @abstractmethod
+    def reset_result(self):
+        """
+        Discard the result of the previous evaluation, while keeping the (expensive) connection to the data source.
+        """
+        pass
+
+    def start_queries(self, scenario) -> Future:
+        """
+        Start executing the queries without waiting for them, so several data sources can be queried at once. Pass the
+        returned future to "finish_queries" to make its result the result of the helper. Data sources that cannot be
+        queried in the background execute their queries right away.
+        :param scenario: scenario to be evaluated
+        :return: future of the query result
+        """
+        future = Future()
+        future.set_result(self.execute_queries(scenario))
+        return future
+
+    def finish_queries(self, result_future) -> IResult:
+        """
+        Wait for queries started with "start_queries" and make their result the result of the helper.
+        :param result_future: future returned by "start_queries"
+        :return: query result
+        """
+        self.result = result_future.result()
+        return self.result
+
+    async def execute_queries_async(self, scenario) -> IResult:
+        """
+        Execute the queries without blocking the event loop. The queries are started with "start_queries", so data
+        sources that query in the background keep blocking work such as SPARQL queries and sentiment analysis on
+        their thread pools.
+        :param scenario: scenario to be evaluated
+        :return: query result
+        """
+        # Only evaluations on an event loop import asyncio, which is slow to import for the command line
+        import asyncio
+
+        result_future = self.start_queries(scenario)
+        # Errors are raised by "finish_queries", like in "execute_queries"
+        await asyncio.gather(asyncio.wrap_future(result_future), return_exceptions=True)
+        return self.finish_queries(result_future)
@@ -0,0 +1,32 @@
+from environment_state import EnvironmentState
+from internal_state import InternalState
+from action import Action
+from action_type import ActionType
+
+
+class EvaluationContext:
+    """
+    The evaluation context holds everything that belongs to the evaluation of a single scenario: the environment
+    state, the internal state, the recent action and the data source helpers that collect the query results of this
+    evaluation. The agent itself only holds what all evaluations share, so one agent can run several evaluations at
+    the same time, each on its own context.
+    """
+    def __init__(self, scenario, data_sources):
+        """
+        :param scenario: user input to be evaluated
+        :param data_sources: data source helpers of this evaluation, see "IDataSourceHelper.for_evaluation"
+        """
+        self.environment_state = EnvironmentState(scenario, 0)
+        self.previous_veracity = 0
+
+        self.internal_state = InternalState(-1, -1)
+        self.recent_action = Action(ActionType.NO_ACTION)
+
+        self.starting_state = True
+        self.data_sources = data_sources
+
+        # Data sources that exceeded their latency budget or that the planner did not query
+        self.timed_out_sources = set()
+        self.skipped_sources = set()
+        # Time at which the concurrent queries were started, see "Agent.start_concurrent_queries"
+        self.queries_started = None
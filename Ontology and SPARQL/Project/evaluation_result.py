@@ -0,0 +1,9 @@
+class EvaluationResult:
+    """
+    The answer of the agent to one scenario of a batch evaluation, together with the time spent on it in seconds. The
+    time needed to query the data sources for the whole batch is divided evenly among its scenarios.
+    """
+    def __init__(self, scenario, answer, duration):
+        self.scenario = scenario
+        self.answer = answer
+        self.duration = duration
@@ -0,0 +1,150 @@
+import argparse
+import json
+import math
+import random
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from twitter_client import SEARCH_PATH
+
+POSITIVE_TEMPLATES = [
+    "I think {} is great",
+    "So happy that {} is true",
+    "Love it, {} is the best",
+]
+NEGATIVE_TEMPLATES = [
+    "{} is really bad and wrong",
+    "Nobody should believe {}, it is a terrible lie",
+    "What an awful and stupid claim, {}",
+]
+FILLER_WORDS = ["today", "honestly", "again", "friends", "news", "study", "read", "thread", "morning", "people",
+                "doctor", "article", "week", "family", "video", "blog", "podcast", "school", "team", "city",
+                "evening", "weekend", "research", "paper", "colleague", "neighbour", "book", "radio", "lecture",
+                "office", "kitchen", "garden", "train", "coffee", "breakfast", "lunch", "dinner", "summer", "winter",
+                "spring"]
+OLDEST_TWEET_ID = 1
+NEWEST_TWEET_ID = 100000
+
+
+def generate_tweet(query, tweet_id, positive_share=None):
+    """
+    Generate the tweet with the given id for a query. Tweets are deterministic, differ from each other in a few filler
+    words and are positive with a probability of "positive_share", which is derived from the query if not given.
+    """
+    if positive_share is None:
+        positive_share = zlib.crc32(query.encode("utf-8")) % 101 / 100
+    generator = random.Random(str(tweet_id) + query)
+    templates = POSITIVE_TEMPLATES if generator.random() < positive_share else NEGATIVE_TEMPLATES
+    text = generator.choice(templates).format(query) + " " + " ".join(generator.sample(FILLER_WORDS, 6))
+    return {"id": tweet_id, "full_text": text, "retweet_count": generator.randrange(3)}
+
+
+class FakeTwitterServer(ThreadingHTTPServer):
+    """
+    The fake twitter server answers the standard search endpoint with generated tweets, so the twitter client can be
+    tested and benchmarked without credentials or network access. Pages can be requested with "max_id" like on the
+    real API. It enforces a rate limit window, sends the rate limit headers of the real API and can delay every
+    response by "latency" seconds.
+    """
+    daemon_threads = True
+
+    def __init__(self, address=("127.0.0.1", 0), latency=0.0, rate_limit=180, window=15 * 60, positive_share=None):
+        super().__init__(address, FakeTwitterRequestHandler)
+        self.latency = latency
+        self.positive_share = positive_share
+        self.rate_limit = rate_limit
+        self.window = window
+        self.window_reset = time.time() + window
+        self.remaining = rate_limit
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    @property
+    def base_url(self):
+        return "http://" + self.server_address[0] + ":" + str(self.server_address[1])
+
+    def take_request(self):
+        """
+        Count a request against the current rate limit window.
+        :return: whether the request is allowed, remaining requests and reset time of the window
+        """
+        with self.lock:
+            self.requests += 1
+            if time.time() >= self.window_reset:
+                self.window_reset = time.time() + self.window
+                self.remaining = self.rate_limit
+            if self.remaining == 0:
+                return False, 0, self.window_reset
+            self.remaining -= 1
+            return True, self.remaining, self.window_reset
+
+    def start(self):
+        """
+        Serve requests on a background thread.
+        :return: the server
+        """
+        threading.Thread(target=self.serve_forever, name="fake-twitter", daemon=True).start()
+        return self
+
+
+class FakeTwitterRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path != SEARCH_PATH:
+            self.send_json(404, {"errors": [{"code": 34, "message": "Sorry, that page does not exist."}]})
+            return
+
+        allowed, remaining, reset = self.server.take_request()
+        headers = {"x-rate-limit-limit": str(self.server.rate_limit),
+                   "x-rate-limit-remaining": str(remaining),
+                   "x-rate-limit-reset": str(math.ceil(reset))}
+        if not allowed:
+            self.send_json(429, {"errors": [{"code": 88, "message": "Rate limit exceeded"}]}, headers)
+            return
+
+        time.sleep(self.server.latency)
+        parameters = parse_qs(url.query)
+        query = parameters.get("q", [""])[0]
+        count = int(parameters.get("count", ["15"])[0])
+        max_id = min(int(parameters.get("max_id", [NEWEST_TWEET_ID])[0]), NEWEST_TWEET_ID)
+        statuses = [generate_tweet(query, tweet_id, self.server.positive_share)
+                    for tweet_id in range(max_id, max(max_id - count, OLDEST_TWEET_ID - 1), -1)]
+        self.send_json(200, {"statuses": statuses}, headers)
+
+    def send_json(self, status, body, headers=None):
+        content = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve generated tweets on the twitter search endpoint.")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds every response is delayed")
+    parser.add_argument("--rate-limit", type=int, default=180, help="requests per rate limit window")
+    parser.add_argument("--window", type=float, default=15 * 60, help="length of the rate limit window in seconds")
+    parser.add_argument("--positive-share", type=float, default=None,
+                        help="share of positive tweets, derived from every query if not given")
+    arguments = parser.parse_args()
+
+    server = FakeTwitterServer(("127.0.0.1", arguments.port), arguments.latency, arguments.rate_limit,
+                               arguments.window, arguments.positive_share)
+    print("Serving fake twitter search on " + server.base_url + ", set TWITTER_API_BASE_URL to use it")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+import logging
+import os
+import threading
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from action_planner import ActionPlanner
+from ontology_snapshot import OntologySnapshot
+from ontology_watcher import OntologyWatcher
+from result_cache import ResultCache
+from sentiment_engine import SentimentEngine
+from tweet_recording import ReplayTwitterClient, TweetRecorder
+from twitter_client import TwitterClient
+
+# Ignore useless warnings
+warnings.filterwarnings("ignore")
+
+
+class KnowledgeBase:
+    """
+    The knowledge base holds everything the data source helpers need that is expensive to set up, namely the current
+    snapshot of the ontology, the caches of query results and the twitter client with its connection pool. It is
+    created once per process and shared by all agents, so that evaluating a scenario only costs the time needed to
+    query the data sources. Like the twitter client, the ontology is only loaded once it is first used, so evaluations
+    that only search twitter never load it. If "AGENT_ONTOLOGY_RELOAD_INTERVAL" is set, a watcher reloads the ontology
+    in the background whenever its sources change and swaps the new snapshot in for evaluations that start afterwards.
+    """
+    _instance = None
+    _lock = threading.Lock()
+
+    def __init__(self, rebuild=False):
+        self.rebuild = rebuild
+        self._ontology_snapshot = None
+        # Held while a snapshot is loaded, acquired or swapped, so a snapshot is never acquired after it retired
+        self.snapshot_lock = threading.Lock()
+        self.reload_lock = threading.Lock()
+        self.last_reload_error = None
+
+        # Results are cached per ontology version, so a changed ontology never serves stale results
+        self.ontology_cache = ResultCache(int(os.environ.get("AGENT_ONTOLOGY_CACHE_SIZE", 1024)),
+                                          os.environ.get("AGENT_ONTOLOGY_CACHE_PATH") or None)
+        # Evaluations that query their data sources concurrently run the ontology queries on this pool
+        self.query_pool = self.create_query_pool()
+        # The twitter clients and the sentiment engine are only created once the first statement reaches twitter
+        self.component_lock = threading.Lock()
+        self._twitter_client = None
+        self._replay_twitter_client = None
+        self._sentiment_engine = None
+        # Tweets change over time, so searches are only cached for "AGENT_TWITTER_CACHE_TTL" seconds
+        self.twitter_cache = ResultCache(int(os.environ.get("AGENT_TWITTER_CACHE_SIZE", 1024)),
+                                         os.environ.get("AGENT_TWITTER_CACHE_PATH") or None,
+                                         ttl=float(os.environ.get("AGENT_TWITTER_CACHE_TTL", 900)))
+
+        # Observed cost and effect of the actions, shared by all agents so the planner learns from every evaluation
+        self.action_planner = ActionPlanner.from_environment()
+
+        # Started once the ontology is loaded
+        self.ontology_watcher = None
+
+    @classmethod
+    def get_instance(cls):
+        """
+        Return the process-wide knowledge base and create it on first use.
+        :return: shared knowledge base
+        """
+        with cls._lock:
+            if cls._instance is None:
+                cls._instance = cls()
+            return cls._instance
+
+    @classmethod
+    def reset_instance(cls, rebuild=False):
+        """
+        Replace the process-wide knowledge base by a freshly loaded one and close the previous one.
+        :param rebuild: whether the quadstore is compiled from the .owl files again, even if it is up to date
+        :return: new shared knowledge base
+        """
+        with cls._lock:
+            if cls._instance is not None:
+                cls._instance.close()
+            cls._instance = cls(rebuild)
+            return cls._instance
+
+    def close(self):
+        """
+        Stop the watcher and release the snapshot, the caches, the thread pools and the clients. Evaluations that are
+        still running finish on the snapshot, which is closed after them.
+        """
+        if self.ontology_watcher is not None:
+            self.ontology_watcher.stop()
+        with self.snapshot_lock:
+            if self._ontology_snapshot is not None:
+                self._ontology_snapshot.retire()
+        self.query_pool.shutdown(wait=True)
+        self.ontology_cache.close()
+        self.twitter_cache.close()
+        with self.component_lock:
+            for component in (self._twitter_client, self._replay_twitter_client, self._sentiment_engine):
+                if component is not None:
+                    component.close()
+
+    @contextmanager
+    def use_ontology_snapshot(self):
+        """
+        Hold the current snapshot of the ontology while it is used, so it is not closed if a reload replaces it.
+        :return: context manager that yields the snapshot
+        """
+        with self.snapshot_lock:
+            snapshot = self._load_ontology_snapshot()
+            snapshot.acquire()
+        try:
+            yield snapshot
+        finally:
+            snapshot.release()
+
+    @property
+    def ontology_snapshot(self):
+        """
+        Return the snapshot of the ontology that serves new evaluations and load the ontology on first use.
+        :return: current ontology snapshot
+        """
+        with self.snapshot_lock:
+            return self._load_ontology_snapshot()
+
+    def _load_ontology_snapshot(self):
+        # Called with "snapshot_lock" held
+        if self._ontology_snapshot is None:
+            self._ontology_snapshot = OntologySnapshot(1, self.rebuild)
+            self.start_ontology_watcher()
+        return self._ontology_snapshot
+
+    @property
+    def twitter_client(self):
+        """
+        Return the client of the twitter API and create it on first use.
+        :return: shared twitter client
+        """
+        with self.component_lock:
+            if self._twitter_client is None:
+                self._twitter_client = TwitterClient.from_environment()
+                if os.environ.get("AGENT_TWITTER_RECORD_PATH"):
+                    self._twitter_client.recorder = TweetRecorder(os.environ["AGENT_TWITTER_RECORD_PATH"])
+            return self._twitter_client
+
+    @property
+    def replay_twitter_client(self):
+        """
+        Return the client that replays recorded searches and load the recording on first use.
+        :return: shared replay twitter client
+        """
+        with self.component_lock:
+            if self._replay_twitter_client is None:
+                self._replay_twitter_client = ReplayTwitterClient.from_environment()
+            return self._replay_twitter_client
+
+    @property
+    def sentiment_engine(self):
+        """
+        Return the sentiment engine and create it on first use.
+        :return: shared sentiment engine
+        """
+        with self.component_lock:
+            if self._sentiment_engine is None:
+                self._sentiment_engine = SentimentEngine(int(os.environ.get("AGENT_SENTIMENT_MEMO_SIZE", 65536)),
+                                                         int(os.environ.get("AGENT_SENTIMENT_WORKERS", 0)))
+            return self._sentiment_engine
+
+    @staticmethod
+    def create_query_pool():
+        return ThreadPoolExecutor(max_workers=int(os.environ.get("AGENT_CONCURRENT_WORKERS", 4)),
+                                  thread_name_prefix="ontology-evaluation")
+
+    def start_ontology_watcher(self):
+        reload_interval = float(os.environ.get("AGENT_ONTOLOGY_RELOAD_INTERVAL", 0))
+        if reload_interval > 0:
+            self.ontology_watcher = OntologyWatcher(self, reload_interval)
+            self.ontology_watcher.start()
+
+    def after_fork(self):
+        """
+        Prepare the knowledge base for a process forked from the one that loaded it, such as a worker of the server.
+        SQLite connections must not be used across a fork, so a loaded quadstore is opened anew into a snapshot of the
+        same version, and so are the connections of the on-disk caches. The pages of the quadstore are memory-mapped
+        and stay shared with the parent through the page cache. No thread of the parent exists in the forked process,
+        so the thread pools and the watcher are created anew as well. The twitter clients and the sentiment engine are
+        discarded and created again on first use, since their connections and the queues of the sentiment processes
+        would otherwise be shared with the parent and every other worker.
+        """
+        self.snapshot_lock = threading.Lock()
+        self.reload_lock = threading.Lock()
+        self.query_pool = self.create_query_pool()
+        self.ontology_cache.reopen()
+        self.twitter_cache.reopen()
+        self.component_lock = threading.Lock()
+        components = (self._twitter_client, self._replay_twitter_client, self._sentiment_engine)
+        self._twitter_client = self._replay_twitter_client = self._sentiment_engine = None
+        for component in components:
+            if component is not None:
+                component.close()
+        self.ontology_watcher = None
+        if self._ontology_snapshot is not None:
+            self._ontology_snapshot = OntologySnapshot(self._ontology_snapshot.version)
+            self.start_ontology_watcher()
+
+    def reload_ontology(self, rebuild=False):
+        """
+        Load the current version of the ontology into a new snapshot, validate it and swap it in. Evaluations that
+        already started keep using the previous snapshot, which is closed once they finished. If loading or validating
+        fails, the previous snapshot stays in place.
+        :param rebuild: whether the quadstore is compiled from the .owl files again, even if it is up to date
+        :return: whether the new snapshot was swapped in
+        """
+        with self.reload_lock:
+            try:
+                snapshot = OntologySnapshot(self.ontology_snapshot.version + 1, rebuild)
+                snapshot.validate()
+            except Exception as e:
+                self.last_reload_error = str(e)
+                logging.error("Reloading the ontology failed, keeping version " + str(self.ontology_snapshot.version)
+                              + ": " + str(e))
+                return False
+
+            with self.snapshot_lock:
+                previous_snapshot = self._ontology_snapshot
+                self._ontology_snapshot = snapshot
+            previous_snapshot.retire()
+            self.last_reload_error = None
+            logging.warning("Reloaded the ontology as version " + str(snapshot.version) + " in "
+                            + str(round(snapshot.load_duration, 3)) + " s")
+            return True
+
+    def get_ontology_status(self):
+        """
+        Return the version and load time of the ontology snapshot that serves new evaluations.
+        :return: dictionary of status information
+        """
+        status = self.ontology_snapshot.get_status()
+        status["last_reload_error"] = self.last_reload_error
+        return status
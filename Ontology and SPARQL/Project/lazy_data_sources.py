@@ -0,0 +1,46 @@
+import threading
+from collections.abc import Mapping
+
+
+class LazyDataSources(Mapping):
+    """
+    Lazy data sources map the names of the data sources to their helpers like a dictionary, but a helper is only
+    created when it is looked up for the first time, which is when the action querying its data source first runs.
+    Setting up a data source can be expensive, such as loading the ontology or creating the twitter client, and is
+    thereby skipped entirely for data sources an evaluation never reaches. Iterating over the names does not create
+    any helper, iterating over the helpers creates all of them.
+    """
+    def __init__(self, factories):
+        """
+        :param factories: dictionary mapping the name of every data source to a function that creates its helper
+        """
+        self.factories = factories
+        self.data_sources = {}
+        self.lock = threading.Lock()
+
+    def __getitem__(self, name):
+        data_source = self.data_sources.get(name)
+        if data_source is None:
+            # Several evaluations may look up a data source of the agent for the first time at once
+            with self.lock:
+                if name not in self.data_sources:
+                    self.data_sources[name] = self.factories[name]()
+                data_source = self.data_sources[name]
+        return data_source
+
+    def __iter__(self):
+        return iter(self.factories)
+
+    def __len__(self):
+        return len(self.factories)
+
+    def is_loaded(self, name):
+        return name in self.data_sources
+
+    def load(self, names=None):
+        """
+        Create the helpers of the data sources that have not been looked up yet.
+        :param names: names of the data sources, all data sources if None
+        """
+        for name in self.factories if names is None else names:
+            self[name]
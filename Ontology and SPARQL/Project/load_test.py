@@ -0,0 +1,198 @@
+import argparse
+import http.client
+import itertools
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from fake_twitter_server import FakeTwitterServer
+
+SCENARIOS = [
+    "Healthy people are happy",
+    "Individual sports require lower body",
+    "Sugar is good for people",
+    "Sugar is bad for people",
+    "Healthy people are sad"
+]
+# main.py ends every answer with a line that resets the color of the terminal
+REPL_ANSWER_END = "\033[0m"
+PROJECT_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+
+    def __init__(self, path, timeout=60):
+        super().__init__("localhost", timeout=timeout)
+        self.unix_socket = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.unix_socket)
+
+
+class ServerClient:
+    """
+    Client of the JSON API of server.py, on TCP or on a Unix socket.
+    """
+    def __init__(self, port=None, unix_socket=None):
+        self.port = port
+        self.unix_socket = unix_socket
+
+    def connect(self):
+        if self.unix_socket is not None:
+            return UnixHTTPConnection(self.unix_socket)
+        return http.client.HTTPConnection("127.0.0.1", self.port, timeout=60)
+
+    def request(self, method, path, body=None):
+        connection = self.connect()
+        try:
+            connection.request(method, path, body=None if body is None else json.dumps(body),
+                               headers={"Content-Type": "application/json"})
+            response = connection.getresponse()
+            return response.status, json.loads(response.read())
+        finally:
+            connection.close()
+
+    def evaluate(self, scenario):
+        status, body = self.request("POST", "/evaluate", {"scenario": scenario})
+        return status == 200
+
+    def wait_until_ready(self, timeout=120):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                if self.request("GET", "/ready")[0] == 200:
+                    return
+            except OSError:
+                pass
+            time.sleep(0.2)
+        raise TimeoutError("the server did not become ready within " + str(timeout) + " s")
+
+
+class ReplClient:
+    """
+    Client of the input() REPL of main.py. The REPL answers one statement at a time, so concurrent clients queue up
+    behind each other, which is included in their latency.
+    """
+    def __init__(self, environment):
+        self.process = subprocess.Popen([sys.executable, "-u", "main.py"], cwd=PROJECT_DIRECTORY, env=environment,
+                                        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                        text=True, bufsize=1)
+        self.lock = threading.Lock()
+        # The greeting is complete once the color is reset after it
+        for line in self.process.stdout:
+            if line.startswith("\033[91mHi, I am"):
+                break
+        self.read_answer()
+
+    def read_answer(self):
+        lines = []
+        for line in self.process.stdout:
+            if line.rstrip("\n") == REPL_ANSWER_END:
+                return "".join(lines)
+            lines.append(line)
+        raise EOFError("the REPL exited")
+
+    def evaluate(self, scenario):
+        with self.lock:
+            self.process.stdin.write(scenario + "\n")
+            self.process.stdin.flush()
+            return bool(self.read_answer())
+
+    def close(self):
+        self.process.stdin.write("Bye\n")
+        self.process.stdin.flush()
+        self.process.wait(timeout=30)
+
+
+def run_load(client, requests, concurrency):
+    """
+    Send statements from "concurrency" clients at the same time until "requests" statements are answered.
+    :return: latencies of the successful requests, number of failed or rejected requests and total duration
+    """
+    scenarios = list(itertools.islice(itertools.cycle(SCENARIOS), requests))
+
+    def timed_evaluate(scenario):
+        start = time.perf_counter()
+        succeeded = client.evaluate(scenario)
+        return succeeded, time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(timed_evaluate, scenarios))
+    duration = time.perf_counter() - start
+
+    return [latency for succeeded, latency in outcomes if succeeded], \
+        sum(1 for succeeded, _ in outcomes if not succeeded), duration
+
+
+def report(name, latencies, failed, duration):
+    latencies = sorted(latencies)
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print("{:<6} {:8.1f} req/s | failed {:4d} | median {:8.1f} ms | p99 {:8.1f} ms".format(
+        name, len(latencies) / duration, failed, statistics.median(latencies) * 1000, p99 * 1000))
+
+
+def free_port():
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the throughput and latency of the REPL in main.py with the "
+                                                 "server in server.py under concurrent load.")
+    parser.add_argument("-n", "--requests", type=int, default=500, help="number of statements to evaluate")
+    parser.add_argument("-c", "--concurrency", type=int, default=32, help="number of concurrent clients")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="number of server workers")
+    parser.add_argument("--threads", type=int, default=8, help="number of handler threads per server worker")
+    parser.add_argument("--twitter-latency", type=float, default=0.05,
+                        help="seconds the fake twitter API delays every search")
+    parser.add_argument("--unix-socket", help="let the server listen on this Unix socket instead of TCP")
+    parser.add_argument("--skip-repl", action="store_true", help="only load test the server")
+    arguments = parser.parse_args()
+
+    # Both sides search a local fake twitter API without a cache, so every statement costs a round trip
+    twitter = FakeTwitterServer(latency=arguments.twitter_latency, rate_limit=10 ** 9).start()
+    environment = dict(os.environ, TWITTER_API_BASE_URL=twitter.base_url, AGENT_TWITTER_CACHE_TTL="0")
+
+    print("Evaluating {} statements from {} concurrent clients".format(arguments.requests, arguments.concurrency))
+    results = {}
+    if not arguments.skip_repl:
+        repl = ReplClient(environment)
+        results["repl"] = run_load(repl, arguments.requests, arguments.concurrency)
+        repl.close()
+        report("repl", *results["repl"])
+
+    port = free_port()
+    command = [sys.executable, "server.py", "--workers", str(arguments.workers), "--threads", str(arguments.threads)]
+    command += ["--unix-socket", arguments.unix_socket] if arguments.unix_socket else ["--port", str(port)]
+    server_process = subprocess.Popen(command, cwd=PROJECT_DIRECTORY, env=environment, stdout=subprocess.DEVNULL,
+                                      stderr=subprocess.DEVNULL)
+    try:
+        client = ServerClient(port, arguments.unix_socket)
+        client.wait_until_ready()
+        results["server"] = run_load(client, arguments.requests, arguments.concurrency)
+        report("server", *results["server"])
+    finally:
+        server_process.terminate()
+        server_process.wait(timeout=30)
+
+    if "repl" in results:
+        repl_latencies, _, repl_duration = results["repl"]
+        server_latencies, _, server_duration = results["server"]
+        print("throughput {:.1f}x, p99 latency {:.1f}x lower".format(
+            len(server_latencies) / server_duration / (len(repl_latencies) / repl_duration),
+            sorted(repl_latencies)[int(len(repl_latencies) * 0.99)]
+            / sorted(server_latencies)[int(len(server_latencies) * 0.99)]))
+
+
+if __name__ == "__main__":
+    main()
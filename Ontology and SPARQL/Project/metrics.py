@@ -0,0 +1,264 @@
+import io
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Upper bounds of the latency histograms in seconds, like the default buckets of Prometheus clients
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """
+    A latency histogram with fixed buckets. Every bucket counts the observations up to its upper bound that did not fit
+    into a smaller bucket, the last bucket counts the observations above all bounds.
+    """
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def get_cumulative_counts(self):
+        cumulative_counts = []
+        total = 0
+        for count in self.counts:
+            total += count
+            cumulative_counts.append(total)
+        return cumulative_counts
+
+    def estimate_quantile(self, quantile):
+        """
+        Estimate a quantile as the upper bound of the bucket it falls into.
+        :param quantile: quantile between 0 and 1
+        :return: upper bound in seconds, infinity if the quantile lies above all bounds, None without observations
+        """
+        if self.count == 0:
+            return None
+        rank = quantile * self.count
+        for upper_bound, cumulative_count in zip(self.buckets + (float("inf"),), self.get_cumulative_counts()):
+            if cumulative_count >= rank:
+                return upper_bound
+
+
+class MetricsRegistry:
+    """
+    The metrics registry collects latency histograms and counters of the stages of the agent, such as the actions,
+    every catalog query, twitter searches, sentiment scoring and answer construction. Metrics are identified by their
+    name and labels. The registry is shared by all threads of the process and can be exported as JSON or in the text
+    format of Prometheus. If "enabled" is False, nothing is recorded.
+    """
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.histograms = {}
+        self.counters = {}
+        self.lock = threading.Lock()
+
+    def observe(self, name, seconds, **labels):
+        """
+        Record a duration in a latency histogram.
+        :param name: name of the histogram
+        :param seconds: observed duration
+        :param labels: labels that distinguish the histogram from others of the same name
+        """
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    def increment(self, name, value=1, **labels):
+        """
+        Increase a counter.
+        :param name: name of the counter
+        :param value: amount to add
+        :param labels: labels that distinguish the counter from others of the same name
+        """
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    @contextmanager
+    def span(self, name, **labels):
+        """
+        Time the enclosed block and record its duration in a latency histogram, also if the block raises.
+        :param name: name of the histogram
+        :param labels: labels that distinguish the histogram from others of the same name
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def reset(self):
+        with self.lock:
+            self.histograms.clear()
+            self.counters.clear()
+
+    def get_state(self):
+        """
+        Export the raw counts of the metrics, from which "merge_state" adds them to another registry.
+        :return: JSON-serializable dictionary with a list of histograms and counters
+        """
+        with self.lock:
+            return {
+                "histograms": [[name, labels, histogram.counts, histogram.sum, histogram.count]
+                               for (name, labels), histogram in self.histograms.items()],
+                "counters": [[name, labels, value] for (name, labels), value in self.counters.items()]
+            }
+
+    def merge_state(self, state):
+        """
+        Add the metrics exported by "get_state" of another registry, such as the one of another process.
+        :param state: raw counts as returned by "get_state"
+        """
+        with self.lock:
+            for name, labels, counts, histogram_sum, count in state["histograms"]:
+                key = (name, tuple(tuple(label) for label in labels))
+                histogram = self.histograms.get(key)
+                if histogram is None:
+                    histogram = self.histograms[key] = Histogram()
+                histogram.counts = [total + added for total, added in zip(histogram.counts, counts)]
+                histogram.sum += histogram_sum
+                histogram.count += count
+            for name, labels, value in state["counters"]:
+                key = (name, tuple(tuple(label) for label in labels))
+                self.counters[key] = self.counters.get(key, 0) + value
+
+    def to_dict(self):
+        """
+        Export the metrics as a JSON-serializable dictionary.
+        :return: dictionary with a list of histograms and counters per name
+        """
+        result = {"histograms": {}, "counters": {}}
+        with self.lock:
+            for (name, labels), histogram in sorted(self.histograms.items()):
+                result["histograms"].setdefault(name, []).append({
+                    "labels": dict(labels),
+                    "count": histogram.count,
+                    "sum": histogram.sum,
+                    "mean": histogram.sum / histogram.count,
+                    "p50": histogram.estimate_quantile(0.5),
+                    "p99": histogram.estimate_quantile(0.99),
+                    "buckets": {str(upper_bound): cumulative_count for upper_bound, cumulative_count
+                                in zip(histogram.buckets + ("+Inf",), histogram.get_cumulative_counts())}
+                })
+            for (name, labels), value in sorted(self.counters.items()):
+                result["counters"].setdefault(name, []).append({"labels": dict(labels), "value": value})
+        return result
+
+    def to_prometheus(self):
+        """
+        Export the metrics in the text exposition format of Prometheus.
+        :return: text of all metrics
+        """
+        lines = []
+        with self.lock:
+            declared_names = set()
+            for (name, labels), histogram in sorted(self.histograms.items()):
+                if name not in declared_names:
+                    lines.append("# TYPE " + name + " histogram")
+                    declared_names.add(name)
+                for upper_bound, cumulative_count in zip(histogram.buckets + ("+Inf",),
+                                                         histogram.get_cumulative_counts()):
+                    lines.append(name + "_bucket" + format_labels(labels + (("le", str(upper_bound)),)) + " "
+                                 + str(cumulative_count))
+                lines.append(name + "_sum" + format_labels(labels) + " " + repr(histogram.sum))
+                lines.append(name + "_count" + format_labels(labels) + " " + str(histogram.count))
+            for (name, labels), value in sorted(self.counters.items()):
+                if name not in declared_names:
+                    lines.append("# TYPE " + name + " counter")
+                    declared_names.add(name)
+                lines.append(name + format_labels(labels) + " " + str(value))
+        return "\n".join(lines) + "\n"
+
+
+class SharedMetrics(threading.Thread):
+    """
+    Shared metrics add up the metrics of several processes, such as the workers of the server. Every process writes
+    the raw counts of its registry to a file of its own in a shared directory every "interval" seconds, and
+    "collect" merges the files of all processes, those of processes that exited included, so counters never go back.
+    The metrics of the other processes are therefore up to "interval" seconds old.
+    """
+    def __init__(self, directory, registry=None, interval=1.0):
+        super().__init__(name="metrics-publisher", daemon=True)
+        self.directory = directory
+        self.registry = registry if registry is not None else metrics_registry
+        self.interval = interval
+        self.path = os.path.join(directory, str(os.getpid()) + ".json")
+
+    def publish(self):
+        temporary_path = self.path + ".tmp"
+        with open(temporary_path, "w", encoding="utf-8") as state_file:
+            json.dump(self.registry.get_state(), state_file)
+        # Readers never see a half-written file
+        os.replace(temporary_path, self.path)
+
+    def run(self):
+        while True:
+            time.sleep(self.interval)
+            self.publish()
+
+    def collect(self):
+        """
+        Merge the metrics of all processes, with the current metrics of this one.
+        :return: registry with the metrics of all processes
+        """
+        self.publish()
+        registry = MetricsRegistry()
+        for file_name in sorted(os.listdir(self.directory)):
+            if not file_name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.directory, file_name), encoding="utf-8") as state_file:
+                    registry.merge_state(json.load(state_file))
+            except (OSError, ValueError):
+                # The file of a process that never published is missing or empty
+                continue
+        return registry
+
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    escaped_labels = [name + "=\"" + str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n") + "\""
+                      for name, value in labels]
+    return "{" + ",".join(escaped_labels) + "}"
+
+
+def profile_call(function, *args, sort="cumulative", limit=30):
+    """
+    Run a function under cProfile, for example the evaluation of a single scenario. Only the calling thread is
+    profiled, work on thread pools shows up as waiting and is covered by the latency histograms instead.
+    :param function: function to be profiled
+    :param args: arguments of the function
+    :param sort: key the profile is sorted by
+    :param limit: number of functions that are reported
+    :return: return value of the function and the report of the profile
+    """
+    # The profilers are only imported when they are used, they are not needed to start the agent
+    import cProfile
+    import pstats
+
+    profile = cProfile.Profile()
+    result = profile.runcall(function, *args)
+    report = io.StringIO()
+    pstats.Stats(profile, stream=report).sort_stats(sort).print_stats(limit)
+    return result, report.getvalue()
+
+
+# Metrics of all agents of the process, disabled with AGENT_METRICS=0
+metrics_registry = MetricsRegistry(os.environ.get("AGENT_METRICS", "1") != "0")
@@ -0,0 +1,186 @@
+import argparse
+import pathlib
+import random
+import time
+from xml.sax.saxutils import escape
+
+from owlready2 import World
+
+from quadstore import RES_PATH
+
+EX = "http://www.semanticweb.org/raoulbrigola/ontologies/2022/8/untitled-ontology-10#"
+EX1 = "http://www.semanticweb.org/schon/ontologies/2022/8/IntelligentAgentsG4#"
+XSD = "http://www.w3.org/2001/XMLSchema#"
+
+# The schema, i.e. the classes, properties and the individuals the query catalog refers to, is taken from these files
+SCHEMA_SOURCES = [RES_PATH / "ontology.owl", RES_PATH / "IntelligentAgentsG4.owl"]
+
+
+class SchemaVocabulary:
+    """
+    The schema vocabulary holds the classes and individuals of the real ontology that synthetic individuals are
+    linked to, such as the leaf classes of diseases, food and recipes, the nutrients and the sports. Generated
+    ontologies therefore answer the queries of the catalog like the real one, only at a larger scale.
+    """
+    def __init__(self, sources=SCHEMA_SOURCES):
+        world = World()
+        for source in sources:
+            world.get_ontology(pathlib.Path(source).as_uri()).load(only_local=True)
+
+        recipes = world[EX1 + "Recipes"]
+        self.disease_classes = self.get_leaf_classes(world[EX + "Diseases"])
+        self.food_classes = [iri for iri in self.get_leaf_classes(world[EX1 + "Food"])
+                             if not issubclass(world[iri], recipes)]
+        self.recipe_classes = self.get_leaf_classes(recipes)
+        self.nutrients = sorted(nutrient.iri for nutrient in world[EX1 + "Nutrition"].instances())
+        self.conditions = sorted(condition.iri for condition in world[EX + "Conditions"].instances())
+        self.sports = sorted(sport.iri for sport in world[EX + "Sport"].instances())
+        world.close()
+
+    @staticmethod
+    def get_leaf_classes(root):
+        """
+        The method "get_leaf_classes" collects the classes below a class that have no subclasses themselves.
+        :param root: class whose descendants are collected
+        :return: sorted IRIs of the leaf classes
+        """
+        return sorted(owl_class.iri for owl_class in root.descendants() if not list(owl_class.subclasses()))
+
+
+class OntologyGenerator:
+    """
+    The ontology generator writes a synthetic ontology with the schema of "res/ontology.owl" and a configurable number
+    of people, recipes, ingredients and diseases. Every disease class of the schema is refined into a hierarchy of
+    synthetic subclasses that is "disease_depth" levels deep with "disease_branching" subclasses per class, which
+    stresses the class index. The output is the RDF/XML of the real ontology with the synthetic entities added, in the
+    same namespaces, so it can replace "res/ontology.owl" through "AGENT_ONTOLOGY_PATH". The same seed always
+    produces the same ontology.
+    """
+    def __init__(self, people, recipes=None, ingredients=None, diseases=None, disease_depth=3, disease_branching=2,
+                 seed=0, vocabulary=None):
+        self.people = people
+        self.recipes = recipes if recipes is not None else max(10, people // 10)
+        self.ingredients = ingredients if ingredients is not None else max(20, people // 5)
+        self.diseases = diseases if diseases is not None else max(10, people // 20)
+        self.disease_depth = disease_depth
+        self.disease_branching = disease_branching
+        self.random = random.Random(seed)
+        self.vocabulary = vocabulary if vocabulary is not None else SchemaVocabulary()
+
+    def write(self, path, schema_path=SCHEMA_SOURCES[0]):
+        """
+        Write the synthetic ontology.
+        :param path: path of the generated .owl file
+        :param schema_path: RDF/XML file whose schema and individuals the generated ontology extends
+        :return: number of synthetic individuals
+        """
+        schema = pathlib.Path(schema_path).read_text(encoding="utf-8")
+        end = schema.rindex("</rdf:RDF>")
+
+        with open(path, "w", encoding="utf-8") as output:
+            output.write(schema[:end])
+            output.write("    <!-- Synthetic entities of ontology_generator.py -->\n\n")
+            disease_classes = self.write_disease_classes(output)
+            diseases = self.write_individuals(output, "SyntheticDisease", self.diseases,
+                                              lambda name: self.write_disease(output, name, disease_classes))
+            ingredients = self.write_individuals(output, "SyntheticIngredient", self.ingredients,
+                                                 lambda name: self.write_ingredient(output, name))
+            recipes = self.write_individuals(output, "SyntheticRecipe", self.recipes,
+                                             lambda name: self.write_recipe(output, name, ingredients))
+            self.write_individuals(output, "SyntheticPerson", self.people,
+                                   lambda name: self.write_person(output, name, diseases, recipes))
+            output.write(schema[end:])
+
+        return self.diseases + self.ingredients + self.recipes + self.people
+
+    def write_disease_classes(self, output):
+        """
+        The method "write_disease_classes" refines every disease class of the schema into synthetic subclasses.
+        :return: IRIs of all disease classes, those of the schema included
+        """
+        disease_classes = list(self.vocabulary.disease_classes)
+        level = list(disease_classes)
+        for depth in range(1, self.disease_depth + 1):
+            next_level = []
+            for parent in level:
+                for number in range(self.disease_branching):
+                    iri = parent + "_" + str(depth) + "_" + str(number)
+                    output.write("    <owl:Class rdf:about=\"" + escape(iri) + "\">\n"
+                                 "        <rdfs:subClassOf rdf:resource=\"" + escape(parent) + "\"/>\n"
+                                 "    </owl:Class>\n")
+                    next_level.append(iri)
+            disease_classes += next_level
+            level = next_level
+        return disease_classes
+
+    @staticmethod
+    def write_individuals(output, prefix, count, write_individual):
+        names = [EX + prefix + str(number) for number in range(count)]
+        for name in names:
+            write_individual(name)
+        return names
+
+    def write_disease(self, output, name, disease_classes):
+        self.write_individual(output, name, [self.random.choice(disease_classes)], [])
+
+    def write_ingredient(self, output, name):
+        nutrients = self.random.sample(self.vocabulary.nutrients, self.random.randint(1, 2))
+        self.write_individual(output, name, [self.random.choice(self.vocabulary.food_classes)],
+                              [("IntelligentAgentsG4:denseIn", nutrient) for nutrient in nutrients])
+
+    def write_recipe(self, output, name, ingredients):
+        recipe_ingredients = self.random.sample(ingredients, min(len(ingredients), self.random.randint(2, 5)))
+        self.write_individual(output, name, [self.random.choice(self.vocabulary.recipe_classes)],
+                              [("IntelligentAgentsG4:hasIngredient", ingredient) for ingredient in recipe_ingredients],
+                              [("untitled-ontology-10:isVegetarian", "boolean", self.random.random() < 0.3)])
+
+    def write_person(self, output, name, diseases, recipes):
+        relations = [("untitled-ontology-10:afflictedWithDisease", disease)
+                     for disease in self.random.sample(diseases, self.random.choice((0, 0, 0, 1, 1, 2)))]
+        if self.random.random() < 0.2:
+            relations.append(("untitled-ontology-10:afflictedWithCondition",
+                              self.random.choice(self.vocabulary.conditions)))
+        relations += [("untitled-ontology-10:oftenEats", recipe)
+                      for recipe in self.random.sample(recipes, self.random.randint(1, 3))]
+        relations += [("untitled-ontology-10:plays", sport)
+                      for sport in self.random.sample(self.vocabulary.sports, self.random.randint(0, 2))]
+        values = [("untitled-ontology-10:hasAge", "integer", self.random.randint(5, 90)),
+                  ("untitled-ontology-10:isHappy", "boolean", self.random.random() < 0.6)]
+        self.write_individual(output, name, [EX + "Person"], relations, values)
+
+    @staticmethod
+    def write_individual(output, name, classes, relations, values=()):
+        lines = ["    <owl:NamedIndividual rdf:about=\"" + escape(name) + "\">"]
+        lines += ["        <rdf:type rdf:resource=\"" + escape(owl_class) + "\"/>" for owl_class in classes]
+        lines += ["        <" + tag + " rdf:resource=\"" + escape(target) + "\"/>" for tag, target in relations]
+        for tag, datatype, value in values:
+            text = str(value).lower() if isinstance(value, bool) else str(value)
+            lines.append("        <" + tag + " rdf:datatype=\"" + XSD + datatype + "\">" + text + "</" + tag + ">")
+        lines.append("    </owl:NamedIndividual>\n")
+        output.write("\n".join(lines) + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic ontology with the schema of res/ontology.owl.")
+    parser.add_argument("-o", "--output", required=True, help="path of the generated .owl file")
+    parser.add_argument("-p", "--people", type=int, default=1000, help="number of synthetic people")
+    parser.add_argument("--recipes", type=int, help="number of synthetic recipes, by default a tenth of the people")
+    parser.add_argument("--ingredients", type=int,
+                        help="number of synthetic ingredients, by default a fifth of the people")
+    parser.add_argument("--diseases", type=int,
+                        help="number of synthetic diseases, by default a twentieth of the people")
+    parser.add_argument("--disease-depth", type=int, default=3, help="levels of synthetic subclasses per disease class")
+    parser.add_argument("--disease-branching", type=int, default=2, help="synthetic subclasses per disease class")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the random generator")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    generator = OntologyGenerator(args.people, args.recipes, args.ingredients, args.diseases, args.disease_depth,
+                                  args.disease_branching, args.seed)
+    individuals = generator.write(args.output)
+    print("Generated {} with {} synthetic individuals in {:.3f} s".format(
+        args.output, individuals, time.perf_counter() - start))
+
+
+if __name__ == "__main__":
+    main()
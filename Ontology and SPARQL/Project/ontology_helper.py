@@ -1,24 +1,24 @@
-import pathlib
+import copy
+import logging
 
-from owlready2 import *
-
-from ontology_query_result import OntologyQueryResult
+from knowledge_base import KnowledgeBase
+from ontology_query_result import DICT_FORMAT, OntologyQueryResult
 from data_source_helper import IDataSourceHelper
 from result import IResult
 
-# Ignore useless warnings
-warnings.filterwarnings("ignore")
-
-# set local path
-onto_path.append(str(pathlib.Path(__file__).parent.resolve()) + "/res")
-
 
 class OntologyHelper(IDataSourceHelper):
 
     def __init__(self):
-        # Load the desired ontology using the file path
-        self.ontology = get_ontology("ontology.owl").load(only_local=True)
+        # The ontology is loaded and its queries are compiled once per process by the knowledge base, when the first
+        # ontology helper is created
+        self.knowledge_base = KnowledgeBase.get_instance()
+        self.knowledge_base.ontology_snapshot
+        self.result_cache = self.knowledge_base.ontology_cache
+
+        self.result = OntologyQueryResult()
 
+    def reset_result(self):
         self.result = OntologyQueryResult()
 
     def get_result_confidence(self) -> float:
@@ -30,262 +30,143 @@ class OntologyHelper(IDataSourceHelper):
         :return: interpretation of query result
         """
 
-        total_instances_set = self.result.get_total()
-        positive_instances_set = self.result.get_positive()
-        if len(total_instances_set) == 0:
+        total_instances = self.result.get_total()
+        positive_instances = self.result.get_positive()
+        if total_instances == 0:
             return 0
-        if len(positive_instances_set) == 0:
+        if positive_instances == 0:
             return -1
 
-        return ((len(positive_instances_set) / len(total_instances_set)) - 0.5) * 2
+        return ((positive_instances / total_instances) - 0.5) * 2
 
     def get_nl_explanation(self, positive) -> str:
         if self.result.is_empty():
             return "My own knowledge about the world did not help me to answer this statement."
 
-        answer = "My reasoning was as follows: There is evidence that "
+        answer = ""
+        route_match = self.result.route_match
+        if route_match is not None and route_match.similarity < 1:
+            answer += "I understood your statement as \"" + route_match.scenario + "\". "
+
+        answer += "My reasoning was as follows: There is evidence that "
         if positive:
             evidence = self.result.positive_results
         elif not positive:
             evidence = self.result.negative_results
 
-        for query in evidence:
-            answer += query + ", "
+        for query, query_evidence in evidence.items():
+            answer += query
+            if query_evidence.sample:
+                examples = [str(value).rsplit("#", 1)[-1] for row in query_evidence.sample for value in row]
+                answer += " (for example " + ", ".join(examples) + ")"
+            answer += ", "
         return answer
 
     def execute_queries(self, scenario) -> IResult:
-
         """
-                Above we have the examples from the provided code. Below we have what we have done :)
-                SPARQL variables start with a ? or $ and can match any node (resource or literal) in the RDF dataset.
-                "a" is a type predicate ... instances in all the classes using the a (rdf:type) relationship...
-                When a triple ends with a semicolon, the subject from this triple will implicitly complete the following pair to an entire triple. So for example ex:isCapitalOf ?y is short for ?x ex:isCapitalOf ?y.
-                The + sign behind the subClassOf pattern is a "1 or more levels deep" operator
-
-                <http://www.semanticweb.org/jiba/ontologies/2017/0/test#ma_pizza> 
-                <http://www.semanticweb.org/jiba/ontologies/2017/0/test#price> ?p . }""))
+        The method "execute_queries" routes the given scenario to its entry of the query catalog and collects the
+        evidence the ontology holds for and against it. The evidence is taken from the result cache if the entry has
+        been evaluated against the same version of the ontology before, otherwise the queries of the entry are
+        executed. The result stays empty if the scenario is not supported.
+        :param scenario: scenario to be evaluated
+        :return: query result
         """
+        # The whole evaluation uses the same snapshot, even if a reloaded ontology is swapped in meanwhile
+        with self.knowledge_base.use_ontology_snapshot() as snapshot:
+            self.result.ontology_version = snapshot.version
 
-        if scenario == "Healthy people are happy":
-            """                                                                                  
-            Here I'm starting to write the queries for the scenario "Healthy people are happy"
-            We need several queries :
-                (+) 1) Happy people don't suffer from any disease               -done   
-                (+) 2) Sad people have scurvy                                   -done
-                (+) 3) People that are training are happy people                -done
-                (+) 4) People that eat recipes that have vegetable are happy    -done
-                (+) 5) People that eat food packed with protein are happy       -done
-                (+) 6) People that have Corona are not happy                    -done
-                (+) 7) Young people are happy                                   -done
-            """
-            happy_people_no_disease = list(default_world.sparql("""
-                                       PREFIX ex: <http://www.semanticweb.org/raoulbrigola/ontologies/2022/8/untitled-ontology-10#>
-                                       PREFIX ex1: <http://www.semanticweb.org/schon/ontologies/2022/8/IntelligentAgentsG4#>
-                
-                                       SELECT DISTINCT ?person
-                                        WHERE {
-                                            ?person a ex:Person
-                                            ?person ex:isHappy "true".
-                                            FILTER NOT EXISTS {
-                                                ?person ex:afflictedWithDisease ?disease
-                                            }
-                                        }
-                                        """))
-            self.result.positive_results["Healthy people are happy"] = happy_people_no_disease
-
-            sad_with_scurvy = list(default_world.sparql("""
-                               PREFIX ex: <http://www.semanticweb.org/raoulbrigola/ontologies/2022/8/untitled-ontology-10#>
-                               PREFIX ex1: <http://www.semanticweb.org/schon/ontologies/2022/8/IntelligentAgentsG4#>
-    
-                               SELECT DISTINCT ?person
-                                WHERE {
-                                    ?person a ex:Person;
-                                            ex:isHappy ?value;
-                                            ex:afflictedWithDisease ?disease.
-                                    ?disease a ex:Scurvy.
-                                    FILTER (?value = "false")
-                                }
-                                """))
-            self.result.positive_results["Sad people have scurvy"] = sad_with_scurvy
-
-            happy_training_people = list(default_world.sparql("""
-                                   PREFIX ex: <http://www.semanticweb.org/raoulbrigola/ontologies/2022/8/untitled-ontology-10#>
-                                   PREFIX ex1: <http://www.semanticweb.org/schon/ontologies/2022/8/IntelligentAgentsG4#>
-    
-                                   SELECT DISTINCT ?person
-                                    WHERE {
-                                        ?person a ex:Person;
-                                                ex:isHappy ?value;
-                                                ex:plays ?sport.
-                                        FILTER (?value = "true")
-                                    }
-                                    """))
-            self.result.positive_results["People that are training are happy people"] = happy_training_people
-
-            happy_vegetables_people = list(default_world.sparql("""
-                                       PREFIX ex: <http://www.semanticweb.org/raoulbrigola/ontologies/2022/8/untitled-ontology-10#>
-                                       PREFIX ex1: <http://www.semanticweb.org/schon/ontologies/2022/8/IntelligentAgentsG4#>
-                
-                                       SELECT DISTINCT ?person
-                                       WHERE {
-                                            ?person a ex:Person;
-                                                    ex:isHappy "true";
-                                                    ex:oftenEats ?things.
-                                            ?things ex1:hasIngredient ?v.
-                                            ?v a/rdfs:subClassOf ex1:Vegetables.
-                                        }
-                                        """))
-            self.result.positive_results["People that eat recipes that have vegetable are happy"] = happy_vegetables_people
-
-            happy_protein_people = list(default_world.sparql("""
-                                   PREFIX ex: <http://www.semanticweb.org/raoulbrigola/ontologies/2022/8/untitled-ontology-10#>
-                                   PREFIX ex1: <http://www.semanticweb.org/schon/ontologies/2022/8/IntelligentAgentsG4#>
-    
-                                   SELECT DISTINCT ?person
-                                    WHERE {
-                                        ?person a ex:Person;
-                                                ex:isHappy "true";
-                                                ex:oftenEats ?food.
-                                        ?food ex1:hasIngredient ?i.
-                                        ?i ex1:denseIn ?p.
-                                        ?p a/rdfs:subClassOf* ex1:Protein.
-                                    }
-                                    """))
-            self.result.positive_results["People that eat food packed with protein are happy"] = happy_protein_people
-
-            sad_with_corona = list(default_world.sparql("""
-                                   PREFIX ex: <http://www.semanticweb.org/raoulbrigola/ontologies/2022/8/untitled-ontology-10#>
-                                   PREFIX ex1: <http://www.semanticweb.org/schon/ontologies/2022/8/IntelligentAgentsG4#>
-    
-                                   SELECT DISTINCT ?person
-                                    WHERE {
-                                        ?person a ex:Person;
-                                                ex:isHappy ?value;
-                                                ex:afflictedWithDisease ?disease.
-                                        ?disease a ex:Corona.
-                                        FILTER (?value = "false")
-                                    }
-                                    """))
-            self.result.positive_results["People that have Corona are not happy"] = sad_with_corona
-
-            young_people = list(default_world.sparql("""
-                               PREFIX ex: <http://www.semanticweb.org/raoulbrigola/ontologies/2022/8/untitled-ontology-10#>
-    
-                               SELECT DISTINCT ?person
-                                WHERE {
-                                    ?person a ex:Person;
-                                            ex:isHappy ?value;
-                                            ex:hasAge ?age
-                                    FILTER (?value = "true" && ?age<27)
-                                }
-                                """))
-            self.result.positive_results["Young people are happy"] = young_people
-
-        if scenario == "Individual sports require lower body":
-            """
-            Here I'm starting to write the queries for the scenario ``Individual sports require lower body"
-            We need several queries :
-                (+) 1) Individual sports that require lower body -done
-                (-) 2) Individual sports that require upper body -done
-            """
-
-            individual_lower = list(default_world.sparql("""
-                                   PREFIX ex: <http://www.semanticweb.org/raoulbrigola/ontologies/2022/8/untitled-ontology-10#>
-                                   PREFIX ex1: <http://www.semanticweb.org/schon/ontologies/2022/8/IntelligentAgentsG4#>
-        
-                                   SELECT DISTINCT ?sport               
-                                    WHERE{
-                                        ?sport a/rdfs:subClassOf ex:Individual.
-                                        ?sport ex:prominentlyRequires ?bodypart .
-                                        ?bodypart a/rdfs:subClassOf ex:LowerBody.
-                                    }
-                                    """))
-            self.result.positive_results["Individual sports require lower body"] = individual_lower
-
-            individual_upper = list(default_world.sparql("""
-                                       PREFIX ex: <http://www.semanticweb.org/raoulbrigola/ontologies/2022/8/untitled-ontology-10#>
-                                       PREFIX ex1: <http://www.semanticweb.org/schon/ontologies/2022/8/IntelligentAgentsG4#>
-    
-                                       SELECT DISTINCT ?sport               
-                                        WHERE{
-                                            ?sport a/rdfs:subClassOf ex:Individual.
-                                            ?sport ex:prominentlyRequires ?bodypart .
-                                            ?bodypart a/rdfs:subClassOf ex:UpperBody.
-                                        }
-                                        """))
-            self.result.negative_results["Individual sports require upper body"] = individual_upper
+            route_match = self.route(snapshot, scenario)
+            if route_match is not None:
+                self.collect_evidence(snapshot, route_match)
+        return self.result
 
-        if scenario == "Sugar is good for people":
-            """
-            Here I'm starting to write the queries for the scenario ``Sugar is good for people"
-            We need several queries :
-                (-) 1) Sugar causes diabetes                            -done
-                (+) 2) People that eat sugar are happy                  -done
-                (+) 3) People that eat sugar play sports                -done
-                (-) 4) People that eat sugar have high blood pressure   -done
-            """
+    def start_queries(self, scenario):
+        """
+        The method "start_queries" executes the queries of the given scenario on the query pool of the knowledge base.
+        They run on a helper of their own, so the result of this helper only changes in "finish_queries", even if the
+        caller stops waiting for the queries.
+        :param scenario: scenario to be evaluated
+        :return: future of the query result
+        """
+        return self.knowledge_base.query_pool.submit(self.for_evaluation().execute_queries, scenario)
 
-            sugar_diabetes = list(default_world.sparql("""
-                           PREFIX ex: <http://www.semanticweb.org/raoulbrigola/ontologies/2022/8/untitled-ontology-10#>
-                           PREFIX ex1: <http://www.semanticweb.org/schon/ontologies/2022/8/IntelligentAgentsG4#>
-    
-                           SELECT DISTINCT ?s                          
-                            WHERE{
-                                ?s a ex1:Sugars.
-                                ?s ex:causesDisease ?disease.
-                                ?disease a/rdfs:subClassOf* ex:Diabetes.
-                            }
-                            """))
-            self.result.negative_results["Sugar causes diabetes"] = sugar_diabetes
+    def execute_many(self, scenarios):
+        """
+        The method "execute_many" collects the evidence for several scenarios at once. Scenarios that are routed to the
+        same catalog entry share its evidence, so the queries of every entry are executed at most once.
+        :param scenarios: scenarios to be evaluated
+        :return: list of query results in the order of the scenarios
+        """
+        results_by_entry = {}
+        results = []
+        with self.knowledge_base.use_ontology_snapshot() as snapshot:
+            for scenario in scenarios:
+                # Every scenario is collected by a helper of its own, this helper stays unchanged
+                helper = self.for_evaluation()
+                helper.result.ontology_version = snapshot.version
+
+                route_match = helper.route(snapshot, scenario)
+                if route_match is not None:
+                    if route_match.scenario not in results_by_entry:
+                        results_by_entry[route_match.scenario] = helper.collect_evidence(snapshot, route_match)
+                    # The evidence is shared, only the route match belongs to the scenario
+                    helper.result = copy.copy(results_by_entry[route_match.scenario])
+                    helper.result.route_match = route_match
+                results.append(helper.result)
+
+        return results
+
+    def route(self, snapshot, scenario):
+        """
+        The method "route" finds the catalog entry of the given scenario.
+        :param snapshot: ontology snapshot whose query catalog is used
+        :param scenario: scenario to be evaluated
+        :return: route match, or None if the scenario is not supported
+        """
+        route_match = snapshot.query_catalog.match(scenario)
+        if route_match is None:
+            logging.info(" Scenario \"" + scenario + "\" does not match any catalog entry")
+            return None
 
-            sugar_happy_people = list(default_world.sparql("""
-                                   PREFIX ex: <http://www.semanticweb.org/raoulbrigola/ontologies/2022/8/untitled-ontology-10#>
-                                   PREFIX ex1: <http://www.semanticweb.org/schon/ontologies/2022/8/IntelligentAgentsG4#>
-    
-                                   SELECT DISTINCT ?person
-                                   WHERE{
-                                        ?person a ex:Person;
-                                                ex:isHappy "true";
-                                                ex:oftenEats ?recipe.
-                                        ?recipe ex1:hasIngredient ?food.
-                                        ?food ex1:denseIn ?s.
-                                        ?s a/rdfs:subClassOf* ex1:Sugars.
-                                        }
-                                    """))
-            self.result.positive_results["People that eat sugar are happy"] = sugar_happy_people
+        logging.info(" Scenario \"" + scenario + "\" matched catalog entry \"" + route_match.scenario + "\" with "
+                     "similarity " + str(route_match.similarity))
+        return route_match
 
-            sugar_sport_people = list(default_world.sparql("""
-                                   PREFIX ex: <http://www.semanticweb.org/raoulbrigola/ontologies/2022/8/untitled-ontology-10#>
-                                   PREFIX ex1: <http://www.semanticweb.org/schon/ontologies/2022/8/IntelligentAgentsG4#>
-        
-                                   SELECT DISTINCT ?person
-                                   WHERE{
-                                        ?person a ex:Person;
-                                                ex:plays ?sport;
-                                                ex:oftenEats ?recipe.
-                                        ?recipe ex1:hasIngredient ?food.
-                                        ?food ex1:denseIn ?s.
-                                        ?s a/rdfs:subClassOf* ex1:Sugars.
-                                        }
-                                    """))
-            self.result.positive_results["People that eat sugar play sports"] = sugar_sport_people
+    def collect_evidence(self, snapshot, route_match):
+        """
+        The method "collect_evidence" adds the evidence of the catalog entry of the given route match to the result,
+        either from the result cache or by executing its queries.
+        :param snapshot: ontology snapshot the queries are executed on
+        :param route_match: route match of the scenario
+        :return: query result
+        """
+        self.result.route_match = route_match
 
-            sugar_HBP_people = list(default_world.sparql("""
-                               PREFIX ex: <http://www.semanticweb.org/raoulbrigola/ontologies/2022/8/untitled-ontology-10#>
-                               PREFIX ex1: <http://www.semanticweb.org/schon/ontologies/2022/8/IntelligentAgentsG4#>
-    
-                               SELECT DISTINCT ?person
-                               WHERE{
-                                    ?person a ex:Person;
-                                            ex:afflictedWithCondition ?d;
-                                            ex:oftenEats ?recipe.
-                                    ?recipe ex1:hasIngredient ?food.
-                                    ?food ex1:denseIn ?s.
-                                    ?s a/rdfs:subClassOf* ex1:Sugars.
-                                    ?d a/rdfs:subClassOf* ex:BloodPressure.
-                                    FILTER (?d != "LowBlooPress")
-                                    }
-                                """))
-            self.result.negative_results["People that eat sugar have high blood pressure"] = sugar_HBP_people
+        key = [route_match.scenario, snapshot.ontology_hash, snapshot.query_catalog.catalog_hash, DICT_FORMAT]
+        cached_result = self.result_cache.get(key)
+        if cached_result is not None:
+            self.result.add_dict(cached_result)
+            return self.result
 
+        # Evidence of a scenario with timed out queries is incomplete and therefore not cached
+        if self.run_queries(snapshot, route_match.scenario):
+            self.result_cache.put(key, self.result.to_dict())
         return self.result
+
+    def run_queries(self, snapshot, scenario):
+        """
+        The method "run_queries" runs the precompiled queries that the query catalog holds for the given scenario and
+        adds their evidence to the result. Queries with a positive polarity provide evidence for the scenario, queries
+        with a negative polarity provide evidence against it. A query that timed out provides no evidence.
+        :param snapshot: ontology snapshot the queries are executed on
+        :param scenario: name of the catalog entry
+        :return: whether all queries succeeded
+        """
+        complete = True
+        for query, evidence in snapshot.query_executor.execute(snapshot.query_catalog.get_queries(scenario)):
+            if evidence is None:
+                complete = False
+                continue
+            self.result.add_evidence(query.name, query.positive, evidence)
+
+        return complete
@@ -1,25 +1,92 @@
 from result import IResult
 
+# Number of rows per query that are kept as examples for the explanation
+SAMPLE_SIZE = 3
+
+# Version of the dictionaries created by "OntologyQueryResult.to_dict", part of the key of cached results
+DICT_FORMAT = 2
+
+
+class QueryEvidence:
+    """
+    The evidence of a single query. Instead of all matched rows, only the number of matched instances and a bounded
+    sample of rows are kept, so the memory needed does not grow with the number of matches.
+    """
+    def __init__(self, count=0, sample=None):
+        self.count = count
+        self.sample = sample if sample is not None else []
+
+    def add_row(self, row, instances):
+        """
+        Count a row of the query result and keep it if the sample is not full yet.
+        :param row: row of the query result
+        :param instances: number of instances the row matches, which is the number of selected variables
+        """
+        self.count += instances
+        if len(self.sample) < SAMPLE_SIZE:
+            self.sample.append(row)
+
 
 class OntologyQueryResult(IResult):
     """
     This class acts as a data class to store the query results from the ontology and make them available
     to the agent. It implements the interface IResult to allow action objects to check for an empty result.
+    The evidence of every query is stored by query name, and the number of positive and total instances is kept up to
+    date while evidence is added.
     """
 
     def __init__(self):
         self.positive_results = {}
         self.negative_results = {}
+        self.positive_count = 0
+        self.total_count = 0
+        # Catalog entry the scenario was routed to and version of the ontology snapshot that was queried
+        self.route_match = None
+        self.ontology_version = None
+
+    def add_evidence(self, name, positive, evidence):
+        """
+        Add the evidence of a query.
+        :param name: name of the query
+        :param positive: whether the query provides evidence for the scenario
+        :param evidence: evidence of the query
+        """
+        results = self.positive_results if positive else self.negative_results
+        if name in results:
+            self.total_count -= results[name].count
+            if positive:
+                self.positive_count -= results[name].count
+
+        results[name] = evidence
+        self.total_count += evidence.count
+        if positive:
+            self.positive_count += evidence.count
 
     def get_total(self):
-        query_results = [res for query in list(self.negative_results.values()) for res in query]
-        total_instances = [instance for res in query_results for instance in res]
-        return total_instances + self.get_positive()
+        return self.total_count
 
     def get_positive(self):
-        query_results = [res for query in list(self.positive_results.values()) for res in query]
-        total_instances = [instance for res in query_results for instance in res]
-        return total_instances
+        return self.positive_count
 
     def is_empty(self) -> bool:
         return not self.positive_results and not self.negative_results
+
+    def to_dict(self):
+        """
+        Convert the result into a JSON-serializable dictionary, for instance to cache it.
+        :return: dictionary with the count and sample of every query by polarity and query name
+        """
+        return {
+            "positive": {name: [evidence.count, evidence.sample] for name, evidence in self.positive_results.items()},
+            "negative": {name: [evidence.count, evidence.sample] for name, evidence in self.negative_results.items()}
+        }
+
+    def add_dict(self, result_dict):
+        """
+        Add the evidence of a dictionary created by "to_dict".
+        :param result_dict: dictionary with the count and sample of every query by polarity and query name
+        """
+        for name, (count, sample) in result_dict["positive"].items():
+            self.add_evidence(name, True, QueryEvidence(count, sample))
+        for name, (count, sample) in result_dict["negative"].items():
+            self.add_evidence(name, False, QueryEvidence(count, sample))
@@ -0,0 +1,123 @@
+import os
+import threading
+import time
+
+from query_catalog import QueryCatalog
+from quadstore import QUADSTORE_PATH, open_quadstore
+from query_executor import QueryExecutor
+
+
+def validate_catalog(query_catalog):
+    """
+    Execute every query of a catalog once, so that a broken ontology is detected before it serves evaluations.
+    Compiling the catalog already failed if an entity the queries refer to is missing.
+    :param query_catalog: query catalog compiled against the ontology
+    """
+    for queries in query_catalog.scenarios.values():
+        for query in queries:
+            query.collect_evidence(query.execute_raw())
+
+
+def validate_quadstore(path):
+    """
+    Validate a freshly built quadstore before it replaces the one in use, see "quadstore.build_quadstore".
+    :param path: path of the new quadstore
+    """
+    from owlready2 import World
+
+    world = World(filename=str(path), read_only=True, exclusive=False)
+    try:
+        validate_catalog(QueryCatalog(world))
+    finally:
+        world.close()
+
+
+class OntologySnapshot:
+    """
+    An ontology snapshot is one loaded version of the ontology together with everything derived from it: the query
+    catalog compiled against it and the executor running those queries. A snapshot is never changed after it has been
+    loaded. A new version of the ontology is loaded into a new snapshot, so evaluations that started on the previous
+    snapshot can finish on it. Evaluations hold the snapshot they use with "acquire" and "release", and a snapshot
+    that was replaced is closed once the last of them released it.
+    """
+    def __init__(self, version, rebuild=False):
+        """
+        :param version: number of the snapshot, counted up with every reload
+        :param rebuild: whether the quadstore is compiled from the .owl files again, even if it is up to date
+        """
+        start = time.perf_counter()
+
+        # The ontology is served from a prebuilt SQLite quadstore, which is only rebuilt when the .owl files change. A
+        # rebuilt quadstore is validated before it replaces the previous one
+        self.validated = False
+        self.world, self.ontology, self.ontology_hash = open_quadstore(rebuild=rebuild, validate=self.validate_build)
+        self.query_catalog = QueryCatalog(self.world,
+                                          min_similarity=float(os.environ.get("AGENT_ROUTER_MIN_SIMILARITY", 0.8)))
+        query_timeout = os.environ.get("AGENT_ONTOLOGY_QUERY_TIMEOUT")
+        self.query_executor = QueryExecutor(QUADSTORE_PATH, int(os.environ.get("AGENT_ONTOLOGY_WORKERS", 1)),
+                                            float(query_timeout) if query_timeout else None)
+
+        self.version = version
+        self.loaded_at = time.time()
+        self.load_duration = time.perf_counter() - start
+
+        self.users = 0
+        self.retired = False
+        self.closed = False
+        self.usage_lock = threading.Lock()
+
+    def validate(self):
+        """
+        Execute every query of the catalog once, unless the quadstore was already validated when it was built.
+        """
+        if not self.validated:
+            validate_catalog(self.query_catalog)
+            self.validated = True
+
+    def validate_build(self, path):
+        validate_quadstore(path)
+        self.validated = True
+
+    def get_status(self):
+        """
+        Return the version of the snapshot and how long loading it took.
+        :return: dictionary of status information
+        """
+        return {
+            "version": self.version,
+            "ontology_hash": self.ontology_hash,
+            "loaded_at": self.loaded_at,
+            "load_duration": self.load_duration
+        }
+
+    def acquire(self):
+        with self.usage_lock:
+            self.users += 1
+
+    def release(self):
+        with self.usage_lock:
+            self.users -= 1
+            unused = self.retired and self.users == 0
+        if unused:
+            self.close()
+
+    def retire(self):
+        """
+        Close the snapshot once no evaluation uses it any more, because a newer snapshot replaced it.
+        """
+        with self.usage_lock:
+            self.retired = True
+            unused = self.users == 0
+        if unused:
+            self.close()
+
+    def close(self):
+        """
+        Release the query executor and the connection to the quadstore. The snapshot cannot be used any more.
+        """
+        with self.usage_lock:
+            if self.closed:
+                return
+            self.closed = True
+        self.query_executor.shutdown()
+        self.world.close()
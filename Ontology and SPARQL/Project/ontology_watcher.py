@@ -0,0 +1,40 @@
+import logging
+import os
+import threading
+
+from quadstore import SOURCES, source_hash
+
+
+class OntologyWatcher(threading.Thread):
+    """
+    The ontology watcher is a background thread that checks the modification times of the ontology sources every
+    "interval" seconds. If they changed and the content hash differs from the one of the current snapshot, it asks the
+    knowledge base to reload the ontology, which happens entirely on this thread.
+    """
+    def __init__(self, knowledge_base, interval):
+        super().__init__(name="ontology-watcher", daemon=True)
+        self.knowledge_base = knowledge_base
+        self.interval = interval
+        self.stop_event = threading.Event()
+
+    @staticmethod
+    def source_modification_times():
+        return [os.stat(source).st_mtime_ns for source in SOURCES]
+
+    def run(self):
+        modification_times = self.source_modification_times()
+        while not self.stop_event.wait(self.interval):
+            try:
+                current_modification_times = self.source_modification_times()
+                if current_modification_times == modification_times:
+                    continue
+
+                if source_hash() != self.knowledge_base.ontology_snapshot.ontology_hash:
+                    self.knowledge_base.reload_ontology()
+                modification_times = current_modification_times
+            except OSError as e:
+                # The sources may be replaced while they are read, the next check will see the complete files
+                logging.warning("Checking the ontology sources failed: " + str(e))
+
+    def stop(self):
+        self.stop_event.set()
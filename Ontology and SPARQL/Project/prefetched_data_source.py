@@ -0,0 +1,44 @@
+from concurrent.futures import Future
+
+from data_source_helper import IDataSourceHelper
+from result import IResult
+
+
+class PrefetchedDataSource(IDataSourceHelper):
+    """
+    A prefetched data source stands in for a data source helper whose result for a scenario has already been
+    obtained, for example by a batch evaluation. Executing its queries hands the prefetched result to the helper
+    instead of querying the data source again. Everything else is left to the helper.
+    """
+    def __init__(self, data_source, result):
+        """
+        :param data_source: data source helper that interprets the result
+        :param result: result of the data source for the scenario being evaluated
+        """
+        self.data_source = data_source
+        self.result = result
+
+    def get_result_confidence(self) -> float:
+        return self.data_source.get_result_confidence()
+
+    def get_nl_explanation(self, positive) -> str:
+        return self.data_source.get_nl_explanation(positive)
+
+    def execute_queries(self, scenario) -> IResult:
+        self.data_source.result = self.result
+        return self.result
+
+    def start_queries(self, scenario):
+        future = Future()
+        future.set_result(self.result)
+        return future
+
+    def finish_queries(self, result_future) -> IResult:
+        self.data_source.result = result_future.result()
+        return self.data_source.result
+
+    def for_evaluation(self):
+        return PrefetchedDataSource(self.data_source.for_evaluation(), self.result)
+
+    def reset_result(self):
+        self.data_source.reset_result()
@@ -0,0 +1,163 @@
+import argparse
+import hashlib
+import os
+import pathlib
+import sqlite3
+import time
+from contextlib import contextmanager
+
+from class_index import materialize
+
+RES_PATH = pathlib.Path(__file__).parent.resolve() / "res"
+
+# The first source is the ontology the agent reasons with, the others complement its vocabulary. The ontology can be
+# replaced by a schema-compatible one, such as a synthetic ontology of ontology_generator.py
+SOURCES = [pathlib.Path(os.environ.get("AGENT_ONTOLOGY_PATH", RES_PATH / "ontology.owl")),
+           RES_PATH / "IntelligentAgentsG4.owl"]
+
+# Part of the source hash, so that quadstores built by an older version of "build_quadstore" are rebuilt
+QUADSTORE_FORMAT = 2
+
+QUADSTORE_PATH = pathlib.Path(os.environ.get("AGENT_QUADSTORE_PATH", RES_PATH / "ontology.sqlite3"))
+
+
+def source_hash(sources=SOURCES):
+    """
+    Compute the content hash of the ontology sources. The quadstore is rebuilt whenever this hash changes.
+    :param sources: paths of the .owl files that are compiled into the quadstore
+    :return: hexadecimal SHA-256 digest
+    """
+    digest = hashlib.sha256(str(QUADSTORE_FORMAT).encode("utf-8"))
+    for source in sources:
+        digest.update(pathlib.Path(source).name.encode("utf-8"))
+        digest.update(pathlib.Path(source).read_bytes())
+    return digest.hexdigest()
+
+
+def read_build_info(path=QUADSTORE_PATH):
+    """
+    Read the hash of the sources and the IRI of the main ontology a quadstore was built from.
+    :param path: path of the quadstore
+    :return: tuple (source hash, ontology IRI), or None if the file is missing or was not built by "build_quadstore"
+    """
+    if not os.path.exists(path):
+        return None
+
+    try:
+        connection = sqlite3.connect("file:{}?mode=ro".format(path), uri=True)
+        try:
+            return connection.execute("SELECT source_hash, ontology_iri FROM agent_build").fetchone()
+        finally:
+            connection.close()
+    except sqlite3.DatabaseError:
+        return None
+
+
+def build_quadstore(path=QUADSTORE_PATH, sources=SOURCES, validate=None):
+    """
+    Compile the RDF/XML sources into a persistent owlready2 SQLite quadstore, together with the materialized class
+    index (see "class_index.materialize"). The quadstore is written to a temporary file first and then moved into
+    place, so processes that open it concurrently never see a half-written file, and a quadstore that fails the
+    validation never replaces the previous one.
+    :param path: path of the quadstore
+    :param sources: paths of the .owl files, the first one being the ontology the agent reasons with
+    :param validate: function called with the path of the temporary file, which raises if the quadstore is broken
+    :return: hash of the sources the quadstore was built from
+    """
+    from owlready2 import World
+
+    hash_value = source_hash(sources)
+    temporary_path = "{}.{}.tmp".format(path, os.getpid())
+    if os.path.exists(temporary_path):
+        os.remove(temporary_path)
+
+    world = World(filename=temporary_path)
+    try:
+        ontologies = [world.get_ontology(pathlib.Path(source).as_uri()).load(only_local=True) for source in sources]
+        materialize(world)
+        world.save()
+
+        world.graph.execute("CREATE TABLE agent_build (source_hash TEXT, ontology_iri TEXT, built_at DOUBLE)")
+        world.graph.execute("INSERT INTO agent_build VALUES (?, ?, ?)",
+                            (hash_value, ontologies[0].base_iri, time.time()))
+        world.save()
+    except Exception:
+        # A source that cannot be parsed must not leave a half-written quadstore behind
+        world.close()
+        os.remove(temporary_path)
+        raise
+    world.close()
+
+    if validate is not None:
+        try:
+            validate(temporary_path)
+        except Exception:
+            os.remove(temporary_path)
+            raise
+
+    os.replace(temporary_path, path)
+    return hash_value
+
+
+@contextmanager
+def build_lock(path):
+    """
+    Hold an exclusive lock on the quadstore across processes while it is built. Without "fcntl", such as on Windows,
+    no lock is taken.
+    :param path: path of the quadstore
+    """
+    try:
+        import fcntl
+    except ImportError:
+        yield
+        return
+
+    with open("{}.lock".format(path), "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def open_quadstore(path=QUADSTORE_PATH, sources=SOURCES, rebuild=False, validate=None):
+    """
+    Open the quadstore read-only and rebuild it first if it is missing or the content of its sources has changed.
+    SQLite memory-maps the file (owlready2 sets "PRAGMA mmap_size"), so worker processes share its pages instead of
+    holding their own parsed copy of the ontology.
+    :param path: path of the quadstore
+    :param sources: paths of the .owl files the quadstore is built from
+    :param rebuild: whether the quadstore is rebuilt even if it is up to date
+    :param validate: function that validates a rebuilt quadstore before it is moved into place, see "build_quadstore"
+    :return: tuple (world, main ontology, source hash)
+    """
+    build_info = read_build_info(path)
+    hash_value = source_hash(sources)
+    if rebuild or build_info is None or build_info[0] != hash_value:
+        # The workers of the server notice a change at the same time, only the first of them rebuilds the quadstore
+        with build_lock(path):
+            build_info = read_build_info(path)
+            if rebuild or build_info is None or build_info[0] != hash_value:
+                build_quadstore(path, sources, validate)
+                build_info = read_build_info(path)
+
+    # owlready2 takes long to import, so it is only imported once the ontology is loaded
+    from owlready2 import World
+
+    world = World(filename=str(path), read_only=True, exclusive=False)
+    return world, world.get_ontology(build_info[1]), build_info[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile the ontology into a SQLite quadstore.")
+    parser.add_argument("-o", "--output", default=str(QUADSTORE_PATH), help="path of the quadstore")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    hash_value = build_quadstore(args.output)
+    print("Built {} from {} in {:.3f} s (source hash {})".format(
+        args.output, ", ".join(source.name for source in SOURCES), time.perf_counter() - start, hash_value))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+import hashlib
+import json
+import pathlib
+
+from ontology_query_result import QueryEvidence
+from scenario_router import ScenarioRouter
+
+CATALOG_PATH = pathlib.Path(__file__).parent.resolve() / "res" / "query_catalog.json"
+
+
+class CatalogQuery:
+    """
+    A catalog query is a single SPARQL query of a scenario. It is compiled once into a prepared query of the world it
+    belongs to, so that executing it only binds its parameters and runs the precompiled SQL.
+    """
+    def __init__(self, name, positive, prepared_query, parameters):
+        self.name = name
+        self.positive = positive
+        self.prepared_query = prepared_query
+        self.parameters = parameters
+
+    def execute(self):
+        """
+        Execute the prepared query with its bound parameters.
+        :return: rows of the query result
+        """
+        return self.prepared_query.execute(self.parameters)
+
+    def execute_raw(self, connection=None):
+        """
+        Execute the SQL of the prepared query without converting the rows into entities.
+        :param connection: SQLite connection to the quadstore, by default the connection of the world
+        :return: cursor over the raw rows of the query result
+        """
+        if connection is None:
+            return self.prepared_query.execute_raw(self.parameters)
+        return self.prepared_query.execute_raw_with_db(self.parameters, connection)
+
+    def collect_evidence(self, raw_rows):
+        """
+        Count the raw rows of the query result as they stream in and keep a bounded sample of them.
+        :param raw_rows: raw rows as returned by "execute_raw"
+        :return: evidence with a sample of raw rows
+        """
+        instances = len(self.prepared_query.column_names)
+        evidence = QueryEvidence()
+        for raw_row in raw_rows:
+            evidence.add_row(raw_row, instances)
+        return evidence
+
+    def resolve(self, evidence):
+        """
+        Convert the sampled raw rows of the evidence into plain values. Entities are stored by their IRI, so that
+        evidence can be cached independently of the loaded ontology. This has to happen on the thread that owns the
+        connection of the world.
+        :param evidence: evidence with a sample of raw rows
+        :return: evidence with a sample of plain values
+        """
+        rows = self.prepared_query.execute(self.parameters, evidence.sample)
+        evidence.sample = [[value.iri if hasattr(value, "iri") else value for value in row] for row in rows]
+        return evidence
+
+
+class QueryCatalog:
+    """
+    The query catalog maps every supported scenario to the SPARQL queries that provide evidence for or against it. The
+    queries are stored as data in "res/query_catalog.json" together with the PREFIX declarations they share and the
+    signatures, i.e. phrasings, of the scenario that the router recognizes. Supporting a new scenario therefore only
+    requires adding an entry to that file.
+    """
+    def __init__(self, world, path=CATALOG_PATH, min_similarity=0.8):
+        with open(path, "rb") as catalog_file:
+            content = catalog_file.read()
+        catalog = json.loads(content)
+        # Part of the keys of cached evidence, so that changed queries never serve evidence of the previous ones
+        self.catalog_hash = hashlib.sha256(content).hexdigest()
+
+        self.prefixes = catalog["prefixes"]
+        prefix_block = "".join("PREFIX {}: <{}>\n".format(prefix, iri) for prefix, iri in self.prefixes.items())
+
+        self.scenarios = {}
+        signatures = {}
+        for scenario, entry in catalog["scenarios"].items():
+            self.scenarios[scenario] = [self.compile_query(world, prefix_block, query) for query in entry["queries"]]
+            signatures[scenario] = [scenario] + entry.get("signatures", [])
+
+        self.router = ScenarioRouter(signatures, min_similarity)
+
+    def compile_query(self, world, prefix_block, query):
+        """
+        Compile a query of the catalog into a prepared query of the given world.
+        :param world: owlready2 world the query is executed on
+        :param prefix_block: PREFIX declarations shared by all queries
+        :param query: catalog entry of the query
+        :return: compiled query
+        """
+        if query["polarity"] not in ("positive", "negative"):
+            raise ValueError("Unknown polarity \"" + query["polarity"] + "\" of query \"" + query["name"] + "\"")
+
+        prepared_query = world.prepare_sparql(prefix_block + "\n".join(query["query"]))
+        parameters = [self.resolve_parameter(world, parameter) for parameter in query["parameters"]]
+        return CatalogQuery(query["name"], query["polarity"] == "positive", prepared_query, parameters)
+
+    def resolve_parameter(self, world, parameter):
+        """
+        Resolve a query parameter. Strings are prefixed names of entities of the ontology, everything else is used as
+        a literal.
+        :param world: owlready2 world the entity is looked up in
+        :param parameter: parameter as stored in the catalog
+        :return: value bound to the parameter when the query is executed
+        """
+        if not isinstance(parameter, str):
+            return parameter
+
+        prefix, name = parameter.split(":", 1)
+        entity = world[self.prefixes[prefix] + name]
+        if entity is None:
+            raise ValueError("Unknown entity \"" + parameter + "\" in query catalog")
+        return entity
+
+    def match(self, statement):
+        """
+        Find the catalog entry a statement is about.
+        :param statement: statement as entered by the user
+        :return: route match, or None if the statement is not supported
+        """
+        return self.router.route(statement)
+
+    def get_queries(self, scenario):
+        """
+        Return the compiled queries of a catalog entry.
+        :param scenario: name of the catalog entry
+        :return: compiled queries, or an empty list if there is no such entry
+        """
+        return self.scenarios.get(scenario, [])
@@ -0,0 +1,127 @@
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from metrics import metrics_registry
+
+
+class QueryExecutor:
+    """
+    The query executor runs the queries of a scenario. With a single worker and no timeout, the queries are executed
+    one after another on the connection of the world. Otherwise they are fanned out over a thread pool, in which every
+    worker executes the precompiled SQL on its own read-only connection to the quadstore. The latency of a scenario is
+    then bounded by its slowest query instead of the sum of all queries. A query that runs for longer than the
+    timeout is interrupted and contributes no evidence. The timeout of a query starts when a worker picks it up, so
+    queries that wait for a free worker are not charged for the time they waited.
+    """
+    def __init__(self, quadstore_path, workers=1, timeout=None):
+        self.workers = workers
+        self.timeout = timeout
+
+        self.pool = None
+        self.connections = queue.Queue()
+        if workers > 1 or timeout is not None:
+            self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ontology-query")
+            for _ in range(workers):
+                connection = sqlite3.connect("file:{}?mode=ro".format(quadstore_path), uri=True,
+                                             check_same_thread=False)
+                connection.execute("PRAGMA mmap_size = 30000000000")
+                # The SQL generated by owlready2 expects the temporary helper table it creates on its own connection
+                connection.execute("CREATE TEMP TABLE one (i INTEGER)")
+                connection.execute("INSERT INTO one VALUES (1)")
+                self.connections.put(connection)
+
+    def execute(self, queries):
+        """
+        Execute queries and return their evidence in the order of the given queries, independent of the order in
+        which they finish.
+        :param queries: catalog queries to be executed
+        :return: list of tuples (query, evidence), where evidence is None if the query timed out or failed
+        """
+        if self.pool is None:
+            results = []
+            for query in queries:
+                with metrics_registry.span("ontology_query_seconds", query=query.name):
+                    results.append((query, query.resolve(query.collect_evidence(query.execute_raw()))))
+            return results
+
+        running = []
+        for query in queries:
+            connection_slot = {"lock": threading.Lock(), "started": threading.Event()}
+            future = self.pool.submit(self.execute_raw, query, connection_slot)
+            # A query that is cancelled before a worker picks it up never starts
+            future.add_done_callback(lambda _, started=connection_slot["started"]: started.set())
+            running.append((query, connection_slot, future))
+
+        results = []
+        for query, connection_slot, future in running:
+            try:
+                evidence = self.wait(future, connection_slot)
+                # Entities are resolved on the calling thread, which owns the connection of the world
+                results.append((query, query.resolve(evidence)))
+            except TimeoutError:
+                self.interrupt(connection_slot)
+                metrics_registry.increment("ontology_query_errors_total", query=query.name, error="timeout")
+                logging.warning("Query \"" + query.name + "\" exceeded the timeout of " + str(self.timeout) + " s")
+                results.append((query, None))
+            except sqlite3.Error as e:
+                metrics_registry.increment("ontology_query_errors_total", query=query.name, error="failed")
+                logging.warning("Query \"" + query.name + "\" failed: " + str(e))
+                results.append((query, None))
+
+        return results
+
+    def wait(self, future, connection_slot):
+        """
+        Wait for a query until it finished or ran for longer than the timeout.
+        :param future: future of the query
+        :param connection_slot: dictionary through which the connection can be interrupted while the query runs
+        :return: evidence of the query
+        """
+        if self.timeout is None:
+            return future.result()
+        connection_slot["started"].wait()
+        if future.done():
+            return future.result()
+        return future.result(timeout=max(0.0, connection_slot["started_at"] + self.timeout - time.monotonic()))
+
+    def execute_raw(self, query, connection_slot):
+        """
+        Execute the SQL of a query on one of the read-only connections of the pool.
+        :param query: catalog query to be executed
+        :param connection_slot: dictionary through which the connection can be interrupted while the query runs
+        :return: evidence of the query with a sample of raw rows
+        """
+        connection = self.connections.get()
+        try:
+            with connection_slot["lock"]:
+                connection_slot["connection"] = connection
+            connection_slot["started_at"] = time.monotonic()
+            connection_slot["started"].set()
+            with metrics_registry.span("ontology_query_seconds", query=query.name):
+                return query.collect_evidence(query.execute_raw(connection))
+        finally:
+            with connection_slot["lock"]:
+                connection_slot.pop("connection", None)
+            self.connections.put(connection)
+
+    @staticmethod
+    def interrupt(connection_slot):
+        with connection_slot["lock"]:
+            connection = connection_slot.get("connection")
+            if connection is not None:
+                connection.interrupt()
+
+    def shutdown(self):
+        """
+        Stop the thread pool and close its connections. Queries that are still queued are cancelled, and queries that
+        timed out were interrupted and return their connection shortly.
+        """
+        if self.pool is None:
+            return
+        self.pool.shutdown(wait=True, cancel_futures=True)
+        while not self.connections.empty():
+            self.connections.get_nowait().close()
@@ -0,0 +1,12 @@
+from twitter_helper import TwitterHelper
+
+
+class ReplayTwitterHelper(TwitterHelper):
+    """
+    The replay twitter helper answers twitter queries from a recording of earlier searches (see tweet_recording.py)
+    instead of the live API. Apart from where the tweets come from, it processes them exactly like the twitter helper,
+    so evaluations can be load tested offline with realistic data. It is used when "AGENT_TWITTER_SOURCE" is "replay".
+    """
+    def get_client(self, knowledge_base):
+        # The live client is never created, only the recording is loaded
+        return knowledge_base.replay_twitter_client
@@ -0,0 +1,146 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class ResultCache:
+    """
+    The result cache stores query results of a data source, so that repeated scenarios are answered without querying
+    the data source again. It keeps the most recently used entries in memory and evicts the least recently used entry
+    once "max_entries" is reached. If a path is given, entries are also written to an SQLite file, which survives
+    restarts and can be shared by several processes. The file is trimmed to its "max_disk_entries" newest entries in
+    batches, whenever it grew by a tenth beyond them. If "ttl" is given, entries expire that many seconds after they
+    were stored. Keys and values must be JSON-serializable.
+    """
+    def __init__(self, max_entries=1024, path=None, max_disk_entries=100000, ttl=None):
+        self.max_entries = max_entries
+        self.path = path
+        self.max_disk_entries = max_disk_entries
+        self.eviction_batch = max(1, max_disk_entries // 10)
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.expirations = 0
+
+        self.disk = None
+        if path is not None:
+            self.open_disk()
+
+    def open_disk(self):
+        self.disk = sqlite3.connect(str(self.path), check_same_thread=False, timeout=10)
+        self.disk.execute("PRAGMA journal_mode = WAL")
+        self.disk.execute("CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT, stored_at DOUBLE)")
+        self.disk.execute("CREATE INDEX IF NOT EXISTS index_cache_stored_at ON cache(stored_at)")
+        self.disk.commit()
+        self.disk_entries = self.disk.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+    def reopen(self):
+        """
+        Open a new connection to the on-disk tier. A process forked after the cache was created must not use the
+        connection of its parent.
+        """
+        self.lock = threading.Lock()
+        if self.path is not None:
+            self.open_disk()
+
+    def close(self):
+        with self.lock:
+            if self.disk is not None:
+                self.disk.close()
+                self.disk = None
+
+    def get(self, key):
+        """
+        Look up a cached value.
+        :param key: cache key
+        :return: cached value, or None on a cache miss
+        """
+        serialized_key = json.dumps(key)
+        with self.lock:
+            if serialized_key in self.entries:
+                value, stored_at = self.entries[serialized_key]
+                if not self._is_expired(stored_at):
+                    self.entries.move_to_end(serialized_key)
+                    self.hits += 1
+                    return value
+                del self.entries[serialized_key]
+                self.expirations += 1
+
+            if self.disk is not None:
+                row = self.disk.execute("SELECT value, stored_at FROM cache WHERE key=?",
+                                        (serialized_key,)).fetchone()
+                if row is not None and not self._is_expired(row[1]):
+                    value = json.loads(row[0])
+                    self._store_in_memory(serialized_key, value, row[1])
+                    self.disk_hits += 1
+                    return value
+
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        """
+        Store a value in the cache.
+        :param key: cache key
+        :param value: value to be cached
+        """
+        serialized_key = json.dumps(key)
+        stored_at = time.time()
+        with self.lock:
+            self._store_in_memory(serialized_key, value, stored_at)
+
+            if self.disk is not None:
+                self.disk.execute("INSERT OR REPLACE INTO cache VALUES (?, ?, ?)",
+                                  (serialized_key, json.dumps(value), stored_at))
+                if self.ttl is not None:
+                    self.disk.execute("DELETE FROM cache WHERE stored_at < ?", (stored_at - self.ttl,))
+                # Counted as if every entry was new, the count is corrected whenever the file is trimmed
+                self.disk_entries += 1
+                if self.disk_entries > self.max_disk_entries + self.eviction_batch:
+                    self._trim_disk()
+                self.disk.commit()
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            if self.disk is not None:
+                self.disk.execute("DELETE FROM cache")
+                self.disk.commit()
+                self.disk_entries = 0
+
+    def get_statistics(self):
+        """
+        Return the hit and miss counters of the cache.
+        :return: dictionary of statistics
+        """
+        with self.lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "expirations": self.expirations,
+                "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0
+            }
+
+    def _trim_disk(self):
+        self.disk.execute("DELETE FROM cache WHERE stored_at < "
+                          "(SELECT stored_at FROM cache ORDER BY stored_at DESC LIMIT 1 OFFSET ?)",
+                          (self.max_disk_entries - 1,))
+        self.disk_entries = self.disk.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+    def _is_expired(self, stored_at):
+        return self.ttl is not None and time.time() - stored_at > self.ttl
+
+    def _store_in_memory(self, serialized_key, value, stored_at):
+        self.entries[serialized_key] = (value, stored_at)
+        self.entries.move_to_end(serialized_key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
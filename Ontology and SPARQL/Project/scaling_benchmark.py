@@ -0,0 +1,240 @@
+import argparse
+import itertools
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from ontology_generator import OntologyGenerator, SchemaVocabulary
+
+PROJECT_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DIRECTORY = os.path.join(PROJECT_DIRECTORY, "benchmark_results")
+
+SCENARIOS = [
+    "Healthy people are happy",
+    "Individual sports require lower body",
+    "Sugar is good for people"
+]
+# Measurements that get worse when they grow, compared between two result files
+COMPARED_MEASUREMENTS = ["build_seconds", "load_seconds", "query_median_ms", "query_p99_ms", "evaluation_median_ms",
+                         "peak_rss_mb"]
+
+
+def get_peak_rss():
+    # ru_maxrss is reported in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def percentile(values, quantile):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * quantile))]
+
+
+def measure(repeat, statements, twitter_latency):
+    """
+    Measure the ontology this process was started with, see "AGENT_ONTOLOGY_PATH" and "AGENT_QUADSTORE_PATH". Has to
+    run in a process of its own, because the quadstore paths are read on import and the peak memory is per process.
+    :param repeat: number of times every catalog query is executed
+    :param statements: number of statements evaluated end-to-end
+    :param twitter_latency: seconds the fake twitter API delays every search
+    :return: dictionary of measurements
+    """
+    from fake_twitter_server import FakeTwitterServer
+    from quadstore import QUADSTORE_PATH, build_quadstore
+
+    # Every search is answered by a local fake twitter API, so end-to-end throughput does not depend on the network
+    twitter = FakeTwitterServer(latency=twitter_latency, rate_limit=10 ** 9).start()
+    os.environ["TWITTER_API_BASE_URL"] = twitter.base_url
+
+    from agent import Agent
+    from knowledge_base import KnowledgeBase
+
+    measurements = {}
+    start = time.perf_counter()
+    build_quadstore()
+    measurements["build_seconds"] = time.perf_counter() - start
+    measurements["quadstore_mb"] = os.path.getsize(QUADSTORE_PATH) / 1024 ** 2
+
+    start = time.perf_counter()
+    knowledge_base = KnowledgeBase.get_instance()
+    # The ontology is only loaded on first use
+    knowledge_base.ontology_snapshot
+    measurements["load_seconds"] = time.perf_counter() - start
+    measurements["rss_after_load_mb"] = get_peak_rss()
+
+    queries = {}
+    for scenario, catalog_queries in knowledge_base.ontology_snapshot.query_catalog.scenarios.items():
+        for query in catalog_queries:
+            timings = []
+            for _ in range(repeat):
+                query_start = time.perf_counter()
+                evidence = query.collect_evidence(query.execute_raw())
+                timings.append(time.perf_counter() - query_start)
+            queries[scenario + ": " + query.name] = {
+                "instances": evidence.count,
+                "median_ms": statistics.median(timings) * 1000,
+                "p99_ms": percentile(timings, 0.99) * 1000
+            }
+    measurements["queries"] = queries
+    query_medians = [query["median_ms"] for query in queries.values()]
+    measurements["query_median_ms"] = statistics.median(query_medians)
+    measurements["query_p99_ms"] = percentile([query["p99_ms"] for query in queries.values()], 0.99)
+
+    agent = Agent()
+    timings = []
+    start = time.perf_counter()
+    for scenario in itertools.islice(itertools.cycle(SCENARIOS), statements):
+        evaluation_start = time.perf_counter()
+        agent.evaluate_scenario(scenario)
+        timings.append(time.perf_counter() - evaluation_start)
+    measurements["evaluations_per_second"] = statements / (time.perf_counter() - start)
+    measurements["evaluation_median_ms"] = statistics.median(timings) * 1000
+    measurements["evaluation_p99_ms"] = percentile(timings, 0.99) * 1000
+
+    measurements["peak_rss_mb"] = get_peak_rss()
+    twitter.shutdown()
+    return measurements
+
+
+def run_size(people, args, vocabulary, work_directory):
+    """
+    Generate the synthetic ontology of one size and measure it in a fresh process.
+    :param people: number of synthetic people
+    :param args: parsed command line arguments
+    :param vocabulary: schema vocabulary shared by the generators of all sizes
+    :param work_directory: directory the generated ontology and its quadstore are written to
+    :return: dictionary with the parameters of the ontology and its measurements
+    """
+    ontology_path = os.path.join(work_directory, "ontology-{}.owl".format(people))
+    generator = OntologyGenerator(people, disease_depth=args.disease_depth, disease_branching=args.disease_branching,
+                                  seed=args.seed, vocabulary=vocabulary)
+    start = time.perf_counter()
+    individuals = generator.write(ontology_path)
+    generation_seconds = time.perf_counter() - start
+
+    # Caches would hide the cost of the queries, so both are disabled
+    environment = dict(os.environ, AGENT_ONTOLOGY_PATH=ontology_path,
+                       AGENT_QUADSTORE_PATH=os.path.join(work_directory, "ontology-{}.sqlite3".format(people)),
+                       AGENT_ONTOLOGY_CACHE_SIZE="0", AGENT_ONTOLOGY_CACHE_PATH="", AGENT_TWITTER_CACHE_TTL="0",
+                       AGENT_TWITTER_CACHE_PATH="")
+    command = [sys.executable, os.path.abspath(__file__), "--measure", "--repeat", str(args.repeat), "--statements",
+               str(args.statements), "--twitter-latency", str(args.twitter_latency)]
+    output = subprocess.run(command, cwd=PROJECT_DIRECTORY, env=environment, stdout=subprocess.PIPE, check=True,
+                            text=True).stdout
+
+    return {
+        "people": people,
+        "recipes": generator.recipes,
+        "ingredients": generator.ingredients,
+        "diseases": generator.diseases,
+        "disease_depth": generator.disease_depth,
+        "disease_branching": generator.disease_branching,
+        "individuals": individuals,
+        "ontology_mb": os.path.getsize(ontology_path) / 1024 ** 2,
+        "generation_seconds": generation_seconds,
+        "measurements": json.loads(output.splitlines()[-1])
+    }
+
+
+def report(result):
+    measurements = result["measurements"]
+    print("{:>8} people | build {:8.2f} s | load {:6.2f} s | query median {:8.2f} ms, p99 {:8.2f} ms | "
+          "{:7.1f} evaluations/s | peak RSS {:7.1f} MB".format(
+              result["people"], measurements["build_seconds"], measurements["load_seconds"],
+              measurements["query_median_ms"], measurements["query_p99_ms"], measurements["evaluations_per_second"],
+              measurements["peak_rss_mb"]))
+
+
+def compare(results, previous_results, tolerance):
+    """
+    Compare the measurements with those of a previous run, size by size.
+    :param results: results of this run
+    :param previous_results: results of a previous run as saved by "main"
+    :param tolerance: relative increase of a measurement that counts as a regression
+    :return: number of regressions
+    """
+    print("Compared with " + previous_results["label"])
+    previous_by_size = {result["people"]: result["measurements"] for result in previous_results["results"]}
+    regressions = 0
+    for result in results:
+        previous = previous_by_size.get(result["people"])
+        if previous is None:
+            continue
+        for name in COMPARED_MEASUREMENTS:
+            if not previous.get(name):
+                continue
+            change = result["measurements"][name] / previous[name] - 1
+            regressed = change > tolerance
+            regressions += regressed
+            print("{:>8} people | {:<22} {:10.2f} -> {:10.2f} ({:+7.1%}){}".format(
+                result["people"], name, previous[name], result["measurements"][name], change,
+                "  REGRESSION" if regressed else ""))
+    return regressions
+
+
+def get_label():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_DIRECTORY, stdout=subprocess.PIPE,
+                              stderr=subprocess.DEVNULL, check=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unversioned"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure how the agent scales with synthetic ontologies of growing "
+                                                 "size and compare the measurements with a previous version.")
+    parser.add_argument("-s", "--sizes", type=int, nargs="+", default=[1000, 10000, 100000],
+                        help="numbers of synthetic people, one ontology per number")
+    parser.add_argument("--disease-depth", type=int, default=3, help="levels of synthetic subclasses per disease class")
+    parser.add_argument("--disease-branching", type=int, default=2, help="synthetic subclasses per disease class")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the ontology generator")
+    parser.add_argument("--repeat", type=int, default=20, help="number of times every catalog query is executed")
+    parser.add_argument("-n", "--statements", type=int, default=100, help="number of statements evaluated end-to-end")
+    parser.add_argument("--twitter-latency", type=float, default=0.0,
+                        help="seconds the fake twitter API delays every search")
+    parser.add_argument("--label", default=None, help="name of this run, by default the current git commit")
+    parser.add_argument("-o", "--output", help="JSON file the results are saved to, by default "
+                                               "benchmark_results/scaling-<label>.json")
+    parser.add_argument("--compare", help="JSON file of a previous run to compare the results with")
+    parser.add_argument("--tolerance", type=float, default=0.1,
+                        help="relative increase of a measurement that counts as a regression")
+    parser.add_argument("--work-directory", help="directory for the generated ontologies, by default a temporary one")
+    parser.add_argument("--measure", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(measure(args.repeat, args.statements, args.twitter_latency)))
+        return
+
+    label = args.label or get_label()
+    vocabulary = SchemaVocabulary()
+    results = []
+    with tempfile.TemporaryDirectory() as temporary_directory:
+        work_directory = args.work_directory or temporary_directory
+        os.makedirs(work_directory, exist_ok=True)
+        for people in args.sizes:
+            result = run_size(people, args, vocabulary, work_directory)
+            report(result)
+            results.append(result)
+
+    output = args.output or os.path.join(RESULTS_DIRECTORY, "scaling-" + label + ".json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as output_file:
+        json.dump({"label": label, "created_at": time.time(), "python": platform.python_version(),
+                   "platform": platform.platform(), "results": results}, output_file, indent=2)
+    print("Saved the results to " + output)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as previous_file:
+            regressions = compare(results, json.load(previous_file), args.tolerance)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
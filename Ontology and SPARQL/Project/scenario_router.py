@@ -0,0 +1,109 @@
+import re
+from collections import defaultdict
+
+from text_normalizer import form_query
+
+# Words that invert a statement, "n't" and "cannot" count as "not"
+NEGATION_PATTERN = re.compile(r"\b(not|no|never|none|nobody|nothing|neither|nor|without)\b|n['’]t\b|\bcannot\b")
+
+
+class RouteMatch:
+    """
+    A route match names the catalog entry a statement was routed to, the signature it matched and how similar the
+    statement is to that signature (1 for an exact match after normalization).
+    """
+    def __init__(self, scenario, signature, similarity):
+        self.scenario = scenario
+        self.signature = signature
+        self.similarity = similarity
+
+
+class ScenarioRouter:
+    """
+    The scenario router maps a statement to the catalog entry it is about. Every entry has one or more signatures,
+    which are normalized with the same tokenize and stem step that is used for twitter queries. Statements that
+    normalize to a signature are found with a single dictionary lookup. Other statements are matched through an
+    inverted index from stemmed token to signatures: only signatures that share a token with the statement are
+    compared, and tokens that occur in more than "max_posting" signatures are not used to find candidates. A candidate
+    matches if the Jaccard similarity of the token sets reaches "min_similarity" and the statement is negated by the
+    same words as the signature, so that "Sugar is not good for people" never matches "Sugar is good for people".
+    """
+    def __init__(self, signatures, min_similarity=0.8, max_posting=50):
+        """
+        :param signatures: dictionary mapping the name of every catalog entry to its signatures
+        :param min_similarity: minimal Jaccard similarity of a fuzzy match
+        :param max_posting: maximal number of signatures a token may occur in to be used for finding candidates
+        """
+        self.min_similarity = min_similarity
+        self.max_posting = max_posting
+
+        self.exact = {}
+        self.signatures = []
+        self.index = defaultdict(list)
+        for scenario, scenario_signatures in signatures.items():
+            for signature in scenario_signatures:
+                tokens = self.tokens(signature)
+                negations = self.negations(signature)
+                self.exact[self.exact_key(tokens, negations)] = len(self.signatures)
+                for token in tokens:
+                    self.index[token].append(len(self.signatures))
+                self.signatures.append((scenario, signature, tokens, negations))
+
+    @staticmethod
+    def tokens(statement):
+        """
+        Normalize a statement into its set of stemmed tokens without punctuation and negations, which are compared
+        separately, so that "isn't" and "is not" result in the same tokens.
+        :param statement: statement or signature
+        :return: set of tokens
+        """
+        statement = NEGATION_PATTERN.sub(" ", statement.lower())
+        return frozenset(token for token in form_query(statement).split() if token.isalnum())
+
+    @staticmethod
+    def negations(statement):
+        """
+        Find the words that negate a statement. They have to agree between a statement and its signature, because a
+        single negation barely lowers the similarity of the token sets but inverts the statement.
+        :param statement: statement or signature
+        :return: set of negation words
+        """
+        return frozenset("not" if match.group(1) is None else match.group(1)
+                         for match in NEGATION_PATTERN.finditer(statement.lower()))
+
+    @staticmethod
+    def exact_key(tokens, negations):
+        return " ".join(sorted(tokens)) + "|" + " ".join(sorted(negations))
+
+    def route(self, statement):
+        """
+        Find the catalog entry of a statement.
+        :param statement: statement as entered by the user
+        :return: route match, or None if no signature is similar enough
+        """
+        tokens = self.tokens(statement)
+        if not tokens:
+            return None
+        negations = self.negations(statement)
+
+        exact_match = self.exact.get(self.exact_key(tokens, negations))
+        if exact_match is not None:
+            scenario, signature, _, _ = self.signatures[exact_match]
+            return RouteMatch(scenario, signature, 1.0)
+
+        candidates = set()
+        for token in tokens:
+            posting = self.index.get(token, ())
+            if len(posting) <= self.max_posting:
+                candidates.update(posting)
+
+        best_match = None
+        for candidate in sorted(candidates):
+            scenario, signature, candidate_tokens, candidate_negations = self.signatures[candidate]
+            if candidate_negations != negations:
+                continue
+            similarity = len(tokens & candidate_tokens) / len(tokens | candidate_tokens)
+            if similarity >= self.min_similarity and (best_match is None or similarity > best_match.similarity):
+                best_match = RouteMatch(scenario, signature, similarity)
+
+        return best_match
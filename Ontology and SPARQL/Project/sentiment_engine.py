@@ -0,0 +1,113 @@
+import re
+import threading
+from collections import OrderedDict
+
+from metrics import metrics_registry
+
+# Mentions, special characters and links are removed from tweets before their sentiment is analyzed
+TWEET_NOISE_PATTERN = re.compile(r"(@[A-Za-z0-9]+)|([^0-9A-Za-z \t])|(\w+://\S+)")
+
+
+def clean_tweet(tweet):
+    """
+    Remove mentions, special characters and links from the text of a tweet.
+    :param tweet: text of the tweet
+    :return: cleaned text
+    """
+    return ' '.join(TWEET_NOISE_PATTERN.sub(" ", tweet).split())
+
+
+def polarity_label(polarity):
+    if polarity > 0:
+        return 'positive'
+    elif polarity == 0:
+        return 'neutral'
+    else:
+        return 'negative'
+
+
+def score_texts(texts):
+    """
+    Compute the polarity of cleaned texts with the pattern lexicon that TextBlob uses. This function is also run in
+    the worker processes of the sentiment engine.
+    :param texts: list of cleaned texts
+    :return: list of polarities
+    """
+    # TextBlob is only imported once tweets are scored, statements that never reach twitter do not load it
+    from textblob.en import sentiment as pattern_sentiment
+
+    return [pattern_sentiment(text)[0] for text in texts]
+
+
+class SentimentEngine:
+    """
+    The sentiment engine classifies a whole page of tweets at once. Texts are cleaned with precompiled patterns and
+    scored directly with the pattern lexicon of TextBlob, without creating a TextBlob object per tweet. Polarities
+    are memoized by cleaned text in a bounded LRU, so retweets and repeated texts are scored only once. If "workers" is
+    more than 0, batches with at least "process_threshold" unscored texts are split over a process pool.
+    """
+    def __init__(self, memo_size=65536, workers=0, process_threshold=500, chunk_size=100):
+        self.memo_size = memo_size
+        self.memo = OrderedDict()
+        self.lock = threading.Lock()
+
+        self.process_threshold = process_threshold
+        self.chunk_size = chunk_size
+        self.pool = None
+        if workers > 0:
+            # Importing the process pool pulls in multiprocessing, which is only needed with workers
+            from concurrent.futures import ProcessPoolExecutor
+            self.pool = ProcessPoolExecutor(max_workers=workers)
+
+    def close(self):
+        if self.pool is not None:
+            # Waiting lets the pool stop its worker processes, which would otherwise outlive a process that exits
+            self.pool.shutdown(wait=True)
+
+    def classify(self, tweets):
+        """
+        Classify the sentiment of a batch of tweets.
+        :param tweets: list of tweet texts
+        :return: list of 'positive', 'neutral' or 'negative', one per tweet
+        """
+        return [polarity_label(polarity) for polarity in self.polarities(tweets)]
+
+    def polarities(self, tweets):
+        """
+        Compute the polarity of a batch of tweets.
+        :param tweets: list of tweet texts
+        :return: list of polarities between -1 and 1, one per tweet
+        """
+        with metrics_registry.span("sentiment_scoring_seconds"):
+            return self._polarities(tweets)
+
+    def _polarities(self, tweets):
+        cleaned_tweets = [clean_tweet(tweet) for tweet in tweets]
+
+        polarities = {}
+        with self.lock:
+            for text in cleaned_tweets:
+                if text in self.memo:
+                    self.memo.move_to_end(text)
+                    polarities[text] = self.memo[text]
+
+        unscored_texts = [text for text in dict.fromkeys(cleaned_tweets) if text not in polarities]
+        metrics_registry.increment("sentiment_texts_total", len(cleaned_tweets))
+        metrics_registry.increment("sentiment_scored_texts_total", len(unscored_texts))
+        if unscored_texts:
+            polarities.update(zip(unscored_texts, self.score(unscored_texts)))
+
+            with self.lock:
+                for text in unscored_texts:
+                    self.memo[text] = polarities[text]
+                while len(self.memo) > self.memo_size:
+                    self.memo.popitem(last=False)
+
+        return [polarities[text] for text in cleaned_tweets]
+
+    def score(self, texts):
+        if self.pool is None or len(texts) < self.process_threshold:
+            return score_texts(texts)
+
+        chunks = [texts[i:i + self.chunk_size] for i in range(0, len(texts), self.chunk_size)]
+        return [polarity for polarities in self.pool.map(score_texts, chunks) for polarity in polarities]
@@ -0,0 +1,295 @@
+import argparse
+import gc
+import json
+import logging
+import os
+import queue
+import shutil
+import signal
+import socket
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler
+
+# Add the root directory to the system path to import load_env module
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+from load_env import load_environment
+from agent import Agent
+from knowledge_base import KnowledgeBase
+from metrics import SharedMetrics, metrics_registry
+
+# Answer to connections that do not fit into the request queue, sent without handing them to a handler thread
+OVERLOADED_BODY = json.dumps({"error": "the request queue is full"}).encode("utf-8")
+OVERLOADED_RESPONSE = (b"HTTP/1.0 503 Service Unavailable\r\nContent-Type: application/json\r\nRetry-After: 1\r\n"
+                       b"Content-Length: " + str(len(OVERLOADED_BODY)).encode("ascii") + b"\r\n\r\n" + OVERLOADED_BODY)
+
+
+class AgentServer(socketserver.BaseServer):
+    """
+    The agent server answers the JSON API of one worker process on a listening socket that it shares with the other
+    workers. Accepted connections wait in a queue of at most "queue_size" connections until one of "threads" handler
+    threads evaluates them with the shared agent. If the queue is full, a connection is answered with 503 right away,
+    so clients back off instead of piling up latency. With "shared_metrics", the metrics endpoints report the metrics
+    of all workers instead of the ones of this worker.
+    """
+    def __init__(self, listen_socket, agent, threads=8, queue_size=64, shared_metrics=None):
+        super().__init__(listen_socket.getsockname(), AgentRequestHandler)
+        self.socket = listen_socket
+        self.agent = agent
+        self.shared_metrics = shared_metrics
+        self.connections = queue.Queue(queue_size)
+        self.rejected = 0
+
+        for number in range(threads):
+            threading.Thread(target=self.handle_connections, name="agent-handler-" + str(number), daemon=True).start()
+
+    def fileno(self):
+        return self.socket.fileno()
+
+    def get_request(self):
+        return self.socket.accept()
+
+    def process_request(self, request, client_address):
+        try:
+            self.connections.put_nowait((request, client_address))
+        except queue.Full:
+            self.reject(request)
+
+    def reject(self, request):
+        self.rejected += 1
+        try:
+            # Reading the request first lets the client receive the response instead of a reset connection
+            request.settimeout(0.1)
+            request.recv(65536)
+            request.sendall(OVERLOADED_RESPONSE)
+        except OSError:
+            pass
+        self.shutdown_request(request)
+
+    def handle_connections(self):
+        while True:
+            request, client_address = self.connections.get()
+            try:
+                self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                self.shutdown_request(request)
+
+    def shutdown_request(self, request):
+        try:
+            request.shutdown(socket.SHUT_WR)
+        except OSError:
+            pass
+        request.close()
+
+    def handle_error(self, request, client_address):
+        logging.exception("Handling a request failed")
+
+    def is_ready(self):
+        return not self.connections.full()
+
+    def get_metrics(self):
+        return metrics_registry if self.shared_metrics is None else self.shared_metrics.collect()
+
+
+class AgentRequestHandler(BaseHTTPRequestHandler):
+    """
+    GET /health reports whether the worker is alive, GET /ready whether it accepts requests, GET /metrics and
+    /metrics.json export the metrics of all workers, and POST /evaluate with {"scenario": "..."} evaluates a scenario,
+    with "profile": true under cProfile, or with {"scenarios": [...]} a batch of scenarios.
+    """
+    def do_GET(self):
+        if self.path == "/health":
+            self.send_json(200, {"status": "ok", "pid": os.getpid()})
+        elif self.path == "/metrics":
+            self.send_text(200, self.server.get_metrics().to_prometheus(), "text/plain; version=0.0.4")
+        elif self.path == "/metrics.json":
+            self.send_json(200, self.server.get_metrics().to_dict())
+        elif self.path == "/ready":
+            ready = self.server.is_ready()
+            self.send_json(200 if ready else 503, {
+                "status": "ready" if ready else "overloaded",
+                "pid": os.getpid(),
+                "queued": self.server.connections.qsize(),
+                "rejected": self.server.rejected,
+                "ontology": KnowledgeBase.get_instance().get_ontology_status()
+            })
+        else:
+            self.send_json(404, {"error": "unknown path " + self.path})
+
+    def do_POST(self):
+        if self.path != "/evaluate":
+            self.send_json(404, {"error": "unknown path " + self.path})
+            return
+
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        except ValueError as e:
+            self.send_json(400, {"error": "invalid JSON: " + str(e)})
+            return
+        if not isinstance(body, dict) or not (isinstance(body.get("scenario"), str)
+                                              or isinstance(body.get("scenarios"), list)):
+            self.send_json(400, {"error": "expected {\"scenario\": \"...\"} or {\"scenarios\": [...]}"})
+            return
+
+        agent = self.server.agent
+        try:
+            if "scenarios" in body:
+                evaluation_results = agent.evaluate_many([str(scenario) for scenario in body["scenarios"]])
+                self.send_json(200, {"results": [{"scenario": evaluation_result.scenario,
+                                                  "answer": evaluation_result.answer,
+                                                  "duration": evaluation_result.duration}
+                                                 for evaluation_result in evaluation_results]})
+                return
+
+            start = time.perf_counter()
+            if body.get("profile"):
+                answer, profile = agent.profile_scenario(body["scenario"])
+                self.send_json(200, {"scenario": body["scenario"], "answer": answer,
+                                     "duration": time.perf_counter() - start, "profile": profile})
+                return
+
+            answer = agent.evaluate_scenario(body["scenario"])
+            self.send_json(200, {"scenario": body["scenario"], "answer": answer,
+                                 "duration": time.perf_counter() - start})
+        except Exception as e:
+            logging.exception("Evaluating " + str(body) + " failed")
+            self.send_json(500, {"error": str(e)})
+
+    def send_json(self, status, body):
+        self.send_text(status, json.dumps(body), "application/json")
+
+    def send_text(self, status, text, content_type):
+        content = text.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def address_string(self):
+        # Connections on a Unix socket have no address
+        return str(self.client_address[0]) if self.client_address else "unix"
+
+    def log_message(self, format, *args):
+        pass
+
+
+def create_listen_socket(host, port, unix_socket=None, backlog=1024):
+    """
+    Create the socket all workers accept connections on.
+    :param host: host to listen on, if no Unix socket is given
+    :param port: port to listen on, if no Unix socket is given
+    :param unix_socket: path of a Unix socket to listen on instead of TCP
+    :param backlog: number of connections the operating system keeps waiting for accept
+    :return: listening socket
+    """
+    if unix_socket is not None:
+        if os.path.exists(unix_socket):
+            os.unlink(unix_socket)
+        listen_socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        listen_socket.bind(unix_socket)
+        listen_socket.listen(backlog)
+    else:
+        listen_socket = socket.create_server((host, port), backlog=backlog)
+    # Workers wait for connections with select, a worker that loses the race for a connection must not block in accept
+    listen_socket.setblocking(False)
+    return listen_socket
+
+
+def run_worker(listen_socket, agent, threads, queue_size, metrics_directory):
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    KnowledgeBase.get_instance().after_fork()
+    # The metrics recorded before the fork are published once by the master, not by every worker
+    metrics_registry.reset()
+    shared_metrics = SharedMetrics(metrics_directory, interval=float(os.environ.get("AGENT_METRICS_INTERVAL", 1.0)))
+    shared_metrics.start()
+    AgentServer(listen_socket, agent, threads, queue_size, shared_metrics).serve_forever()
+
+
+def serve(listen_socket, workers, threads, queue_size):
+    """
+    Load the knowledge base, fork the workers and restart workers that die, until the server is terminated. The
+    ontology is loaded before forking, so the workers start warm. The twitter client and the sentiment engine hold
+    connections, thread pools and process pools that must not be shared between processes, so every worker creates
+    its own on first use.
+    :param listen_socket: socket the workers accept connections on
+    :param workers: number of worker processes
+    :param threads: number of handler threads per worker
+    :param queue_size: number of connections a worker accepts before it answers 503
+    """
+    agent = Agent()
+    agent.load_data_sources(["ontology"])
+    # Objects that exist before forking are never collected, so the garbage collector of a worker does not touch and
+    # thereby copy their pages
+    gc.freeze()
+    # Every process writes its metrics to this directory, so every worker can report the metrics of all of them
+    metrics_directory = tempfile.mkdtemp(prefix="agent-metrics-")
+    SharedMetrics(metrics_directory).publish()
+
+    children = set()
+    running = True
+
+    def start_worker():
+        pid = os.fork()
+        if pid == 0:
+            try:
+                run_worker(listen_socket, agent, threads, queue_size, metrics_directory)
+            finally:
+                os._exit(1)
+        children.add(pid)
+
+    def stop(signal_number, frame):
+        nonlocal running
+        running = False
+        for child in children:
+            os.kill(child, signal.SIGTERM)
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    for _ in range(workers):
+        start_worker()
+    print("Serving the agent with " + str(workers) + " workers on " + str(listen_socket.getsockname()), flush=True)
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        children.discard(pid)
+        if running:
+            logging.warning("Worker " + str(pid) + " exited with status " + str(status) + ", starting a new one")
+            start_worker()
+    shutil.rmtree(metrics_directory, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the agent as a JSON API on a pool of pre-forked workers.")
+    parser.add_argument("--host", default=os.environ.get("AGENT_SERVER_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("AGENT_SERVER_PORT", 8080)))
+    parser.add_argument("--unix-socket", default=os.environ.get("AGENT_SERVER_UNIX_SOCKET") or None,
+                        help="path of a Unix socket to listen on instead of TCP")
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("AGENT_SERVER_WORKERS", os.cpu_count())),
+                        help="number of worker processes")
+    parser.add_argument("--threads", type=int, default=int(os.environ.get("AGENT_SERVER_THREADS", 8)),
+                        help="number of handler threads per worker")
+    parser.add_argument("--queue-size", type=int, default=int(os.environ.get("AGENT_SERVER_QUEUE_SIZE", 64)),
+                        help="number of connections a worker accepts before it answers 503")
+    arguments = parser.parse_args()
+
+    load_environment()
+
+    listen_socket = create_listen_socket(arguments.host, arguments.port, arguments.unix_socket)
+    serve(listen_socket, arguments.workers, arguments.threads, arguments.queue_size)
+
+
+if __name__ == "__main__":
+    main()
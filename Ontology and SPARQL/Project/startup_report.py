@@ -0,0 +1,120 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+PROJECT_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+
+# Started with "python -X importtime", so the imports of every phase are reported between the markers of the phases
+PROBE = """
+import os, sys, time
+start = float(os.environ["AGENT_STARTUP_REPORT_START"])
+def mark(phase):
+    sys.stderr.write("startup phase: " + phase + " " + repr(time.time() - start) + "\\n")
+mark("interpreter")
+sys.path.append("../..")
+from load_env import load_environment
+from agent import Agent
+load_environment()
+mark("import")
+agent = Agent()
+mark("create agent")
+for number, statement in enumerate(sys.argv[1:]):
+    agent.evaluate_scenario(statement)
+    mark("first statement" if number == 0 else "statement " + str(number + 1))
+"""
+
+
+def parse_report(lines):
+    """
+    Split the output of the probe into its phases.
+    :param lines: lines the probe wrote to stderr
+    :return: list of phases, each a tuple (name, seconds since the start, list of imports as tuples (module, self
+             time in microseconds))
+    """
+    phases = []
+    imports = []
+    for line in lines:
+        if line.startswith("startup phase: "):
+            name, seconds = line[len("startup phase: "):].rsplit(" ", 1)
+            phases.append((name, float(seconds), imports))
+            imports = []
+        elif line.startswith("import time:") and "imported package" not in line:
+            self_time, _, module = line[len("import time:"):].split("|")
+            imports.append((module.strip(), int(self_time)))
+    return phases
+
+
+def get_package_times(imports):
+    """
+    Sum up the import time of the modules of every top level package.
+    :param imports: imports as returned by "parse_report"
+    :return: dictionary mapping every package to its import time in seconds and its number of modules
+    """
+    packages = defaultdict(lambda: [0.0, 0])
+    for module, self_time in imports:
+        package = packages[module.split(".")[0]]
+        package[0] += self_time / 10 ** 6
+        package[1] += 1
+    return packages
+
+
+def report(phases, limit):
+    print("{:<20} {:>10} {:>10} {:>10}".format("phase", "seconds", "imports", "modules"))
+    previous = 0.0
+    for name, seconds, imports in phases:
+        print("{:<20} {:10.3f} {:10.3f} {:10d}".format(
+            name, seconds - previous, sum(self_time for _, self_time in imports) / 10 ** 6, len(imports)))
+        previous = seconds
+    print("{:<20} {:10.3f}".format("total", previous))
+
+    print("\nSlowest packages to import, by the phase that imported them")
+    print("{:<20} {:<20} {:>10} {:>10}".format("package", "phase", "seconds", "modules"))
+    rows = [(package, name, seconds, modules) for name, _, imports in phases
+            for package, (seconds, modules) in get_package_times(imports).items()]
+    for package, name, seconds, modules in sorted(rows, key=lambda row: row[2], reverse=True)[:limit]:
+        print("{:<20} {:<20} {:10.3f} {:10d}".format(package, name, seconds, modules))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report where the startup time of the agent goes, by phase and by "
+                                                 "imported package.")
+    parser.add_argument("statements", nargs="*", default=["Healthy people are happy"],
+                        help="statements evaluated after the agent is created")
+    parser.add_argument("-l", "--limit", type=int, default=20, help="number of packages that are reported")
+    parser.add_argument("--live-twitter", action="store_true",
+                        help="search the twitter API of the environment instead of a local fake twitter API")
+    parser.add_argument("--json", action="store_true", help="print the phases and imports as JSON")
+    args = parser.parse_args()
+
+    environment = dict(os.environ)
+    twitter = None
+    if not args.live_twitter:
+        from fake_twitter_server import FakeTwitterServer
+        twitter = FakeTwitterServer(rate_limit=10 ** 9).start()
+        environment["TWITTER_API_BASE_URL"] = twitter.base_url
+
+    # Phases are timed from here, so the startup of the interpreter counts as well
+    environment["AGENT_STARTUP_REPORT_START"] = repr(time.time())
+    process = subprocess.run([sys.executable, "-X", "importtime", "-c", PROBE] + args.statements,
+                             cwd=PROJECT_DIRECTORY, env=environment, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                             text=True)
+    if twitter is not None:
+        twitter.shutdown()
+    phases = parse_report(process.stderr.splitlines())
+    if process.returncode != 0:
+        sys.stderr.write(process.stderr)
+        sys.exit(process.returncode)
+
+    if args.json:
+        print(json.dumps([{"phase": name, "seconds": seconds, "imports": imports}
+                          for name, seconds, imports in phases]))
+    else:
+        report(phases, args.limit)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+import os
+import sys
+
+import pytest
+
+# The modules of the project are imported by their plain names, like the scripts of the project do
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def fake_twitter(monkeypatch):
+    """
+    Serve generated tweets on a local fake twitter API and replace the process-wide knowledge base by one whose
+    twitter client searches it.
+    """
+    from fake_twitter_server import FakeTwitterServer
+    from knowledge_base import KnowledgeBase
+
+    server = FakeTwitterServer(rate_limit=10 ** 9).start()
+    monkeypatch.setenv("TWITTER_API_BASE_URL", server.base_url)
+    KnowledgeBase.reset_instance()
+    yield server
+    KnowledgeBase.reset_instance()
+    server.shutdown()
@@ -0,0 +1,65 @@
+import pytest
+
+from action_planner import ActionPlanner
+from action_type import ActionType
+
+TWITTER = ActionType.QUERY_TWITTER
+
+
+def create_planner(**settings):
+    settings.setdefault("exploration", 0.0)
+    return ActionPlanner(enabled=True, **settings)
+
+
+def test_disabled_planner_never_skips():
+    assert not ActionPlanner(enabled=False).can_skip(TWITTER, 1.0, 0.1)
+
+
+def test_estimate_without_observations_is_the_trust():
+    planner = create_planner(min_observations=0)
+    assert planner.estimate_change(TWITTER, 0.5) == 0.5
+
+
+def test_estimate_is_a_quantile_of_the_observed_changes():
+    planner = create_planner(min_observations=3, quantile=0.5)
+    for change in (0.1, -0.2, 0.3):
+        planner.record(TWITTER, 1.0, change)
+    assert planner.estimate_change(TWITTER, 0.5) == 0.2
+
+
+@pytest.mark.parametrize("veracity, skip", [
+    (0.0, False),
+    # The ontology alone answers "true", twitter could make it "high confidence"
+    (0.5, False),
+    (0.45, False),
+    (-0.5, False),
+    (0.2, True),
+    (-0.2, True),
+    (0.9, True),
+    (-0.9, True)
+])
+def test_skips_only_if_the_answer_cannot_change(veracity, skip):
+    planner = create_planner(min_observations=1000)
+    assert planner.can_skip(TWITTER, veracity, 0.1) == skip
+
+
+def test_margin_widens_the_estimate():
+    planner = create_planner(min_observations=1000, margin=0.15)
+    assert not planner.can_skip(TWITTER, 0.75, 0.1)
+    assert planner.can_skip(TWITTER, 0.8, 0.1)
+
+
+def test_cheap_actions_are_always_taken():
+    planner = create_planner(min_observations=1000, min_latency=0.5)
+    planner.record(TWITTER, 0.1, 0.0)
+    assert not planner.can_skip(TWITTER, 0.9, 0.1)
+
+
+def test_exploration_takes_a_share_of_the_skippable_actions():
+    planner = create_planner(min_observations=1000, exploration=0.2, seed=1)
+    planner.record(TWITTER, 1.0, 0.0)
+    skips = sum(planner.can_skip(TWITTER, 0.9, 0.1) for _ in range(1000))
+    statistics = planner.get_statistics()["QUERY_TWITTER"]
+    assert statistics["skips"] == skips
+    assert statistics["explorations"] == 1000 - skips
+    assert 100 < statistics["explorations"] < 300
@@ -0,0 +1,119 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from agent import Agent
+
+SCENARIOS = [
+    "Healthy people are happy",
+    "Individual sports require lower body",
+    "Sugar is good for people",
+    "Sugar is not good for people",
+    "Unknown thing"
+]
+
+
+def test_concurrent_evaluations_do_not_share_state(fake_twitter):
+    agent = Agent()
+    sequential_answers = [agent.evaluate_scenario(scenario) for scenario in SCENARIOS]
+    helpers = dict(agent.data_sources.items())
+
+    scenarios = SCENARIOS * 20
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        answers = list(executor.map(agent.evaluate_scenario, scenarios))
+
+    assert fake_twitter.requests > 0
+    assert answers == sequential_answers * 20
+    # Every evaluation collected its results in helpers of its own
+    assert dict(agent.data_sources.items()) == helpers
+    assert all(helper.result.is_empty() for helper in helpers.values())
+
+
+def evaluate(agent, scenario):
+    context = agent.create_context(scenario)
+    answer = agent.evaluate_context(context)
+    return context, answer
+
+
+def test_concurrent_queries_match_the_sequential_evaluation(fake_twitter, monkeypatch):
+    sequential_agent = Agent()
+    monkeypatch.setenv("AGENT_CONCURRENT_QUERIES", "1")
+    concurrent_agent = Agent()
+    assert concurrent_agent.concurrent and not sequential_agent.concurrent
+
+    for scenario in SCENARIOS:
+        sequential_context, sequential_answer = evaluate(sequential_agent, scenario)
+        concurrent_context, concurrent_answer = evaluate(concurrent_agent, scenario)
+        assert vars(concurrent_context.internal_state) == vars(sequential_context.internal_state)
+        assert concurrent_context.environment_state.veracity == sequential_context.environment_state.veracity
+        assert concurrent_answer == sequential_answer
+
+
+def test_source_over_its_latency_budget_contributes_no_evidence(fake_twitter, monkeypatch):
+    monkeypatch.setenv("AGENT_CONCURRENT_QUERIES", "1")
+    monkeypatch.setenv("AGENT_TWITTER_LATENCY_BUDGET", "0.2")
+    fake_twitter.latency = 2.0
+    agent = Agent()
+
+    context, answer = evaluate(agent, "Healthy people are happy")
+    assert "Twitter did not respond in time." in answer
+    assert context.timed_out_sources == {"twitter"}
+    assert context.data_sources["twitter"].result.is_empty()
+    assert context.internal_state.twitter_queried == 0
+    # The veracity only holds the evidence of the ontology
+    ontology_only_veracity = agent.ontology_trust * context.data_sources["ontology"].get_result_confidence()
+    assert context.environment_state.veracity == ontology_only_veracity
+
+
+def test_batch_looks_up_equal_scenarios_once(fake_twitter, monkeypatch):
+    agent = Agent()
+    looked_up = {}
+    for name, helper in agent.data_sources.items():
+        def execute_many(scenarios, name=name, execute_many=helper.execute_many):
+            looked_up[name] = list(scenarios)
+            return execute_many(scenarios)
+        monkeypatch.setattr(helper, "execute_many", execute_many)
+
+    scenarios = ["Sugar is good for people", "Healthy people are happy", "sugar IS good for people",
+                 "Sugar is not good for people", "Healthy people are happy"]
+    results = agent.evaluate_many(scenarios)
+
+    unique_scenarios = ["Sugar is good for people", "Healthy people are happy", "Sugar is not good for people"]
+    assert looked_up == {"ontology": unique_scenarios, "twitter": unique_scenarios}
+    assert fake_twitter.requests == len(unique_scenarios)
+    assert [result.scenario for result in results] == scenarios
+    assert [result.answer for result in results] == [agent.evaluate_scenario(scenario) for scenario in scenarios]
+
+
+@pytest.mark.parametrize("concurrent", ["0", "1"])
+def test_async_evaluations_do_not_block_the_event_loop(fake_twitter, monkeypatch, concurrent):
+    monkeypatch.setenv("AGENT_CONCURRENT_QUERIES", concurrent)
+    fake_twitter.latency = 0.3
+    agent = Agent()
+    # Loading the ontology is not part of the evaluations
+    agent.load_data_sources()
+    gaps = []
+
+    async def tick():
+        last = time.perf_counter()
+        while True:
+            await asyncio.sleep(0.01)
+            now = time.perf_counter()
+            gaps.append(now - last)
+            last = now
+
+    async def evaluate_all():
+        ticker = asyncio.ensure_future(tick())
+        start = time.perf_counter()
+        answers = await asyncio.gather(*[agent.evaluate_scenario_async(scenario) for scenario in SCENARIOS])
+        duration = time.perf_counter() - start
+        ticker.cancel()
+        return answers, duration
+
+    answers, duration = asyncio.run(evaluate_all())
+    # The searches on twitter overlap, and the ticker kept running while they were awaited
+    assert duration < len(SCENARIOS) * fake_twitter.latency
+    assert len(gaps) > 10 and max(gaps) < 0.1
+    assert answers == [agent.evaluate_scenario(scenario) for scenario in SCENARIOS]
@@ -0,0 +1,78 @@
+import json
+import os
+import signal
+import time
+
+import pytest
+
+from knowledge_base import KnowledgeBase
+from ontology_helper import OntologyHelper
+from sentiment_engine import clean_tweet, polarity_label, score_texts
+
+
+def test_knowledge_base_is_shared_until_it_is_reset():
+    knowledge_base = KnowledgeBase.get_instance()
+    assert KnowledgeBase.get_instance() is knowledge_base
+
+    snapshot = knowledge_base.ontology_snapshot
+    reset_knowledge_base = KnowledgeBase.reset_instance()
+    assert reset_knowledge_base is not knowledge_base
+    assert KnowledgeBase.get_instance() is reset_knowledge_base
+    # The previous knowledge base is closed with its snapshot
+    assert snapshot.closed
+
+
+def test_helpers_share_the_snapshot_and_the_evidence():
+    first_helper, second_helper = OntologyHelper(), OntologyHelper()
+    assert first_helper.knowledge_base is second_helper.knowledge_base
+    hits = first_helper.result_cache.get_statistics()["hits"]
+
+    first_result = first_helper.for_evaluation().execute_queries("Sugar is good for people")
+    second_result = second_helper.for_evaluation().execute_queries("sugar is GOOD for people")
+    assert not first_result.is_empty()
+    assert second_result.to_dict() == first_result.to_dict()
+    assert first_helper.result_cache.get_statistics()["hits"] == hits + 1
+
+
+def test_forked_worker_classifies_with_its_own_sentiment_processes(monkeypatch, tmp_path):
+    monkeypatch.setenv("AGENT_SENTIMENT_WORKERS", "1")
+    knowledge_base = KnowledgeBase()
+    # Batches of at least 500 unscored texts are split over the process pool
+    parent_texts = ["parent tweet " + str(number) + (" is great" if number % 2 else " is awful")
+                    for number in range(600)]
+    worker_texts = ["worker tweet " + str(number) + (" is bad" if number % 3 else " is fine")
+                    for number in range(600)]
+    try:
+        inherited_engine = knowledge_base.sentiment_engine
+        assert inherited_engine.pool is not None
+        parent_labels = inherited_engine.classify(parent_texts)
+
+        labels_path = tmp_path / "labels.json"
+        pid = os.fork()
+        if pid == 0:
+            status = 1
+            try:
+                knowledge_base.after_fork()
+                engine = knowledge_base.sentiment_engine
+                labels = engine.classify(worker_texts) if engine is not inherited_engine else None
+                labels_path.write_text(json.dumps(labels))
+                knowledge_base.close()
+                status = 0
+            finally:
+                os._exit(status)
+
+        # A worker that receives the results of another process would wait for its batch forever
+        deadline = time.monotonic() + 60
+        while os.waitpid(pid, os.WNOHANG) == (0, 0):
+            if time.monotonic() > deadline:
+                os.kill(pid, signal.SIGKILL)
+                pytest.fail("the forked worker did not finish its batch")
+            time.sleep(0.05)
+        worker_labels = json.loads(labels_path.read_text())
+        assert worker_labels == [polarity_label(polarity) for polarity in score_texts(
+            [clean_tweet(text) for text in worker_texts])]
+        # The process pool of the parent is not disturbed by the worker
+        assert inherited_engine.classify(worker_texts) == worker_labels
+        assert inherited_engine.classify(parent_texts) == parent_labels
+    finally:
+        knowledge_base.close()
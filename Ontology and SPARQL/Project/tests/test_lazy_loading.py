@@ -0,0 +1,32 @@
+from knowledge_base import KnowledgeBase
+from lazy_data_sources import LazyDataSources
+
+
+def test_data_source_is_created_on_first_lookup():
+    created = []
+    data_sources = LazyDataSources({"ontology": lambda: created.append("ontology") or "ontology helper",
+                                    "twitter": lambda: created.append("twitter") or "twitter helper"})
+    assert list(data_sources) == ["ontology", "twitter"]
+    assert created == []
+
+    assert data_sources["twitter"] == "twitter helper"
+    assert data_sources["twitter"] == "twitter helper"
+    assert created == ["twitter"]
+    assert not data_sources.is_loaded("ontology")
+
+    data_sources.load()
+    assert created == ["twitter", "ontology"]
+
+
+def test_ontology_is_loaded_on_first_use():
+    knowledge_base = KnowledgeBase()
+    try:
+        # What the twitter helper needs from the knowledge base does not load the ontology
+        knowledge_base.twitter_cache.get(["query"])
+        assert knowledge_base._ontology_snapshot is None
+
+        with knowledge_base.use_ontology_snapshot() as snapshot:
+            assert knowledge_base.ontology_snapshot is snapshot
+        assert snapshot.version == 1
+    finally:
+        knowledge_base.close()
@@ -0,0 +1,59 @@
+import json
+
+from metrics import MetricsRegistry, SharedMetrics
+
+
+def test_histogram_estimates_quantiles_by_bucket():
+    registry = MetricsRegistry()
+    for seconds in (0.002, 0.003, 0.2, 3.0):
+        registry.observe("stage_seconds", seconds, stage="a")
+    histogram = registry.to_dict()["histograms"]["stage_seconds"][0]
+    assert histogram["count"] == 4
+    assert histogram["p50"] == 0.005
+    assert histogram["p99"] == 5.0
+
+
+def test_prometheus_export():
+    registry = MetricsRegistry()
+    registry.observe("stage_seconds", 0.002)
+    registry.increment("errors_total", query="a \"b\"")
+    text = registry.to_prometheus()
+    assert "# TYPE stage_seconds histogram" in text
+    assert "stage_seconds_bucket{le=\"+Inf\"} 1" in text
+    assert "errors_total{query=\"a \\\"b\\\"\"} 1" in text
+
+
+def test_disabled_registry_records_nothing():
+    registry = MetricsRegistry(enabled=False)
+    registry.observe("stage_seconds", 0.1)
+    registry.increment("errors_total")
+    assert registry.to_dict() == {"histograms": {}, "counters": {}}
+
+
+def test_merged_state_adds_up_histograms_and_counters():
+    first, second, merged = MetricsRegistry(), MetricsRegistry(), MetricsRegistry()
+    first.observe("stage_seconds", 0.002, stage="a")
+    second.observe("stage_seconds", 0.2, stage="a")
+    second.observe("stage_seconds", 0.2, stage="b")
+    first.increment("errors_total", 2)
+    second.increment("errors_total", 3)
+
+    merged.merge_state(json.loads(json.dumps(first.get_state())))
+    merged.merge_state(json.loads(json.dumps(second.get_state())))
+    result = merged.to_dict()
+    assert [histogram["count"] for histogram in result["histograms"]["stage_seconds"]] == [2, 1]
+    assert result["histograms"]["stage_seconds"][0]["sum"] == 0.202
+    assert result["counters"]["errors_total"] == [{"labels": {}, "value": 5}]
+
+
+def test_shared_metrics_collect_the_files_of_all_processes(tmp_path):
+    other_process = MetricsRegistry()
+    other_process.increment("requests_total", 4)
+    (tmp_path / "1.json").write_text(json.dumps(other_process.get_state()), encoding="utf-8")
+    # A process that has not published yet
+    (tmp_path / "2.json").write_text("", encoding="utf-8")
+
+    this_process = MetricsRegistry()
+    this_process.increment("requests_total", 1)
+    collected = SharedMetrics(str(tmp_path), this_process).collect()
+    assert collected.to_dict()["counters"]["requests_total"][0]["value"] == 5
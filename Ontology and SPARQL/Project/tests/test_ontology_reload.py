@@ -0,0 +1,51 @@
+import os
+
+import pytest
+
+from knowledge_base import KnowledgeBase
+from ontology_snapshot import validate_quadstore
+from quadstore import build_quadstore, read_build_info
+
+
+def test_broken_quadstore_does_not_replace_the_previous_one(tmp_path):
+    path = tmp_path / "ontology.sqlite3"
+    build_quadstore(path, validate=validate_quadstore)
+    build_info = read_build_info(path)
+
+    def reject(temporary_path):
+        raise ValueError("broken")
+
+    with pytest.raises(ValueError):
+        build_quadstore(path, validate=reject)
+    assert read_build_info(path) == build_info
+    assert os.listdir(tmp_path) == ["ontology.sqlite3"]
+
+
+def test_replaced_snapshot_is_closed_after_its_evaluations():
+    knowledge_base = KnowledgeBase()
+    try:
+        with knowledge_base.use_ontology_snapshot() as snapshot:
+            assert knowledge_base.reload_ontology()
+            assert knowledge_base.ontology_snapshot is not snapshot
+            # The evaluation that holds the previous snapshot can still query it
+            assert not snapshot.closed
+            snapshot.validate()
+        assert snapshot.closed
+        assert not knowledge_base.ontology_snapshot.closed
+    finally:
+        knowledge_base.close()
+    assert knowledge_base.ontology_snapshot.closed
+
+
+def test_after_fork_opens_the_quadstore_anew():
+    knowledge_base = KnowledgeBase()
+    inherited_snapshot = knowledge_base.ontology_snapshot
+    try:
+        knowledge_base.after_fork()
+        assert knowledge_base.ontology_snapshot is not inherited_snapshot
+        assert knowledge_base.ontology_snapshot.world is not inherited_snapshot.world
+        assert knowledge_base.ontology_snapshot.version == inherited_snapshot.version
+        assert knowledge_base.ontology_snapshot.ontology_hash == inherited_snapshot.ontology_hash
+    finally:
+        inherited_snapshot.close()
+        knowledge_base.close()
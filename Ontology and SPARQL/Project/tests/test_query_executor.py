@@ -0,0 +1,81 @@
+import sqlite3
+import time
+
+from knowledge_base import KnowledgeBase
+from ontology_helper import OntologyHelper
+from query_executor import QueryExecutor
+
+# Counts without end until the connection is interrupted
+ENDLESS_SQL = "WITH RECURSIVE numbers(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM numbers) SELECT COUNT(*) FROM numbers"
+
+
+class SQLQuery:
+    """
+    Stands in for a catalog query with plain SQL. "pause(seconds)" can be called in the SQL to make a query slow.
+    """
+    def __init__(self, name, sql):
+        self.name = name
+        self.sql = sql
+
+    def execute_raw(self, connection):
+        connection.create_function("pause", 1, lambda seconds: time.sleep(seconds))
+        return connection.execute(self.sql)
+
+    @staticmethod
+    def collect_evidence(raw_rows):
+        return list(raw_rows)
+
+    @staticmethod
+    def resolve(evidence):
+        return evidence
+
+
+def create_executor(tmp_path, workers, timeout):
+    path = tmp_path / "quadstore.sqlite3"
+    sqlite3.connect(str(path)).close()
+    return QueryExecutor(path, workers, timeout)
+
+
+def test_queued_queries_keep_their_timeout(tmp_path):
+    executor = create_executor(tmp_path, workers=1, timeout=0.5)
+    try:
+        # Together the queries take longer than the timeout, but none of them runs longer than it
+        queries = [SQLQuery("query " + str(number), "SELECT pause(0.3), " + str(number)) for number in range(3)]
+        assert [evidence for _, evidence in executor.execute(queries)] == [[(None, 0)], [(None, 1)], [(None, 2)]]
+    finally:
+        executor.shutdown()
+
+
+def test_timed_out_query_yields_no_evidence(tmp_path):
+    executor = create_executor(tmp_path, workers=2, timeout=0.2)
+    try:
+        results = executor.execute([SQLQuery("endless", ENDLESS_SQL), SQLQuery("fast", "SELECT 1")])
+        assert [(query.name, evidence) for query, evidence in results] == [("endless", None), ("fast", [(1,)])]
+        # The endless query was interrupted, so its connection serves the next queries
+        results = executor.execute([SQLQuery("fast", "SELECT 2"), SQLQuery("fast", "SELECT 3")])
+        assert [evidence for _, evidence in results] == [[(2,)], [(3,)]]
+    finally:
+        executor.shutdown()
+
+
+def test_incomplete_evidence_is_not_cached(monkeypatch):
+    KnowledgeBase.reset_instance()
+    helper = OntologyHelper()
+    query_executor = helper.knowledge_base.ontology_snapshot.query_executor
+    execute = query_executor.execute
+
+    def execute_with_timeout(queries):
+        results = execute(queries)
+        # The first query timed out
+        return [(results[0][0], None)] + results[1:]
+
+    monkeypatch.setattr(query_executor, "execute", execute_with_timeout)
+    incomplete_result = helper.for_evaluation().execute_queries("Sugar is good for people")
+    monkeypatch.undo()
+    complete_result = helper.for_evaluation().execute_queries("Sugar is good for people")
+    cached_result = helper.for_evaluation().execute_queries("Sugar is good for people")
+
+    assert incomplete_result.to_dict() != complete_result.to_dict()
+    assert cached_result.to_dict() == complete_result.to_dict()
+    statistics = helper.result_cache.get_statistics()
+    assert (statistics["hits"], statistics["misses"]) == (1, 2)
@@ -0,0 +1,69 @@
+import sqlite3
+import time
+
+from result_cache import ResultCache
+
+
+def count_disk_entries(path):
+    connection = sqlite3.connect(str(path))
+    try:
+        return connection.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+    finally:
+        connection.close()
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ResultCache(max_entries=2)
+    cache.put(["a"], 1)
+    cache.put(["b"], 2)
+    assert cache.get(["a"]) == 1
+    cache.put(["c"], 3)
+
+    assert cache.get(["b"]) is None
+    assert cache.get(["a"]) == 1
+    assert cache.get(["c"]) == 3
+    statistics = cache.get_statistics()
+    assert (statistics["hits"], statistics["misses"]) == (3, 1)
+
+
+def test_disk_tier_survives_a_restart(tmp_path):
+    path = tmp_path / "cache.sqlite3"
+    cache = ResultCache(max_entries=1, path=path)
+    cache.put(["scenario", "hash"], {"positive": 1})
+    cache.close()
+
+    restarted_cache = ResultCache(max_entries=1, path=path)
+    assert restarted_cache.get(["scenario", "hash"]) == {"positive": 1}
+    assert restarted_cache.get_statistics()["disk_hits"] == 1
+
+
+def test_entries_expire_after_the_ttl(tmp_path):
+    cache = ResultCache(path=tmp_path / "cache.sqlite3", ttl=0.05)
+    cache.put(["query"], [1, 2])
+    assert cache.get(["query"]) == [1, 2]
+    time.sleep(0.1)
+    assert cache.get(["query"]) is None
+    assert cache.get_statistics()["expirations"] == 1
+
+
+def test_disk_tier_is_trimmed_in_batches(tmp_path):
+    path = tmp_path / "cache.sqlite3"
+    cache = ResultCache(max_entries=1, path=path, max_disk_entries=20)
+    for number in range(22):
+        cache.put([number], number)
+    # Trimming waits until the file holds a batch of entries beyond its limit
+    assert count_disk_entries(path) == 22
+
+    cache.put([22], 22)
+    assert count_disk_entries(path) == 20
+    assert cache.get([2]) is None
+    assert cache.get([3]) == 3
+
+
+def test_replaced_entries_do_not_trim_early(tmp_path):
+    path = tmp_path / "cache.sqlite3"
+    cache = ResultCache(max_entries=1, path=path, max_disk_entries=20)
+    for _ in range(50):
+        cache.put(["same"], 1)
+    assert count_disk_entries(path) == 1
+    assert cache.get(["same"]) == 1
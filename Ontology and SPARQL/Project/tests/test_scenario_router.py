@@ -0,0 +1,56 @@
+import json
+
+import pytest
+
+from query_catalog import CATALOG_PATH
+from scenario_router import ScenarioRouter
+
+
+@pytest.fixture(scope="module")
+def router():
+    with open(CATALOG_PATH, encoding="utf-8") as catalog_file:
+        catalog = json.load(catalog_file)
+    return ScenarioRouter({scenario: [scenario] + entry.get("signatures", [])
+                           for scenario, entry in catalog["scenarios"].items()})
+
+
+@pytest.mark.parametrize("statement, scenario", [
+    ("Healthy people are happy", "Healthy people are happy"),
+    ("healthy  people are HAPPY!", "Healthy people are happy"),
+    ("Sugar is good for people", "Sugar is good for people"),
+    ("Individual sports need the lower body", "Individual sports require lower body")
+])
+def test_exact_match(router, statement, scenario):
+    route_match = router.route(statement)
+    assert route_match.scenario == scenario
+    assert route_match.similarity == 1.0
+
+
+def test_fuzzy_match(router):
+    route_match = router.route("Sugar is good for all people")
+    assert route_match.scenario == "Sugar is good for people"
+    assert 0.8 <= route_match.similarity < 1.0
+
+
+@pytest.mark.parametrize("statement", [
+    "Sugar is not good for people",
+    "Sugar isn't good for people",
+    "Healthy people are not happy",
+    "Healthy people are never happy",
+    "Individual sports never require lower body",
+    "Individual sports don't require the lower body",
+    "No individual sports require lower body"
+])
+def test_negated_statement_is_not_routed(router, statement):
+    assert router.route(statement) is None
+
+
+def test_negated_signature_matches_negated_statement():
+    router = ScenarioRouter({"Sugar is not healthy": ["Sugar is not healthy"]})
+    assert router.route("Sugar isn't healthy").scenario == "Sugar is not healthy"
+    assert router.route("Sugar is healthy") is None
+
+
+def test_unrelated_statement_is_not_routed(router):
+    assert router.route("The moon is made of cheese") is None
+    assert router.route("?!") is None
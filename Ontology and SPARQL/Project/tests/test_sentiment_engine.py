@@ -0,0 +1,62 @@
+from textblob import TextBlob
+
+from metrics import metrics_registry
+from sentiment_engine import SentimentEngine, clean_tweet, polarity_label
+
+TWEETS = [
+    "@someone I think sugar is great!! https://t.co/abc",
+    "Sugar is really bad and wrong #health",
+    "RT @news: What an awful and stupid claim, sugar is good",
+    "Healthy people are happy, love it",
+    "Just read a thread about sugar",
+    "",
+]
+
+
+def get_counter(name):
+    counters = metrics_registry.to_dict()["counters"].get(name, [])
+    return sum(counter["value"] for counter in counters)
+
+
+def test_labels_equal_those_of_textblob():
+    engine = SentimentEngine()
+    expected_labels = [polarity_label(TextBlob(clean_tweet(tweet)).sentiment.polarity) for tweet in TWEETS]
+    assert engine.classify(TWEETS) == expected_labels
+    assert set(expected_labels) == {"positive", "negative", "neutral"}
+
+
+def test_repeated_texts_are_scored_once():
+    engine = SentimentEngine(memo_size=16)
+    texts, scored_texts = get_counter("sentiment_texts_total"), get_counter("sentiment_scored_texts_total")
+
+    # A retweet and a copy with another link clean to the same text
+    first_labels = engine.classify(TWEETS[:2] + [TWEETS[0].replace("abc", "xyz")])
+    assert get_counter("sentiment_texts_total") - texts == 3
+    assert get_counter("sentiment_scored_texts_total") - scored_texts == 2
+
+    second_labels = engine.classify(TWEETS[:2])
+    assert second_labels == first_labels[:2]
+    assert get_counter("sentiment_texts_total") - texts == 5
+    assert get_counter("sentiment_scored_texts_total") - scored_texts == 2
+
+
+def test_only_large_batches_are_scored_by_the_process_pool():
+    engine = SentimentEngine(workers=1, process_threshold=10, chunk_size=4)
+    chunks = []
+    pool_map = engine.pool.map
+
+    def map_chunks(function, texts_by_chunk):
+        chunks.extend(texts_by_chunk)
+        return pool_map(function, texts_by_chunk)
+
+    engine.pool.map = map_chunks
+    try:
+        small_batch = ["small batch tweet " + str(number) + " is great" for number in range(9)]
+        large_batch = ["large batch tweet " + str(number) + " is awful" for number in range(10)]
+        assert engine.classify(small_batch) == ["positive"] * 9
+        assert chunks == []
+
+        assert engine.classify(large_batch) == ["negative"] * 10
+        assert [len(chunk) for chunk in chunks] == [4, 4, 2]
+    finally:
+        engine.close()
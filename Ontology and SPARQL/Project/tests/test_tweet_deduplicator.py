@@ -0,0 +1,42 @@
+import pytest
+
+from tweet_deduplicator import TweetDeduplicator, normalize_tweet
+
+
+def test_normalization_ignores_retweet_marker_mentions_links_and_case():
+    assert normalize_tweet("RT @bob: Sugar is GREAT for you! https://t.co/abc") == \
+        normalize_tweet("sugar is great for you")
+
+
+def test_exact_copies_are_dropped():
+    deduplicator = TweetDeduplicator(min_similarity=None)
+    tweets = ["Sugar is great for you", "RT @bob: sugar is great for you!", "Sugar is terrible for you"]
+    assert deduplicator.deduplicate(tweets) == ["Sugar is great for you", "Sugar is terrible for you"]
+
+
+def test_near_duplicates_are_dropped():
+    deduplicator = TweetDeduplicator(min_similarity=0.7)
+    original = "healthy people are happy because they exercise every single day and sleep well at night"
+    near_duplicate = original + " wow"
+    assert deduplicator.add(original)
+    assert not deduplicator.add(near_duplicate)
+    assert deduplicator.add("sugar makes people sad and tired after a long day at work in the city")
+
+
+@pytest.mark.parametrize("min_similarity", [None, 0.7])
+def test_first_tweet_of_a_group_is_kept_in_order(min_similarity):
+    deduplicator = TweetDeduplicator(min_similarity)
+    tweets = [{"text": "Sport is good"}, {"text": "Sugar is bad"}, {"text": "sport is good!"}]
+    assert deduplicator.deduplicate(tweets, lambda tweet: tweet["text"]) == tweets[:2]
+
+
+def test_pages_are_deduplicated_against_earlier_pages():
+    deduplicator = TweetDeduplicator()
+    assert deduplicator.deduplicate(["Sugar is bad", "Sport is good"]) == ["Sugar is bad", "Sport is good"]
+    assert deduplicator.deduplicate(["sport is good", "Sleep is important"]) == ["Sleep is important"]
+
+
+def test_empty_tweets_are_only_exact_copies_of_each_other():
+    deduplicator = TweetDeduplicator()
+    assert deduplicator.add("https://t.co/abc")
+    assert not deduplicator.add("@bob")
@@ -0,0 +1,74 @@
+import time
+
+import pytest
+
+from tweet_recording import ReplayTwitterClient, TweetRecorder
+from twitter_client import TwitterClient, TwitterError
+
+
+@pytest.fixture
+def recording(fake_twitter, tmp_path):
+    """
+    Record two pages of one search and one page of another on the fake twitter API.
+    :return: path of the recording and the tweets of the searches
+    """
+    path = tmp_path / "recording.jsonl.gz"
+    client = TwitterClient(base_url=fake_twitter.base_url)
+    client.recorder = TweetRecorder(path)
+    try:
+        first_page = client.search("Sugar is good for people", 5)
+        second_page = client.search("Sugar is good for people", 5, max_id=first_page[-1]["id"] - 1)
+        other_page = client.search("Healthy people are happy", 3)
+    finally:
+        client.close()
+    return path, first_page + second_page, other_page
+
+
+def test_replay_serves_the_recorded_tweets(recording):
+    path, tweets, other_tweets = recording
+    client = ReplayTwitterClient(path)
+    try:
+        # Recorded pages are merged per normalized query and can be paged differently
+        assert client.search("sugar is GOOD for people", 10) == tweets
+        assert client.search("Sugar is good for people", 4, max_id=tweets[3]["id"]) == tweets[3:7]
+        assert client.search("Healthy people are happy", 10) == other_tweets
+        assert client.search("Never recorded", 10) == []
+    finally:
+        client.close()
+
+
+def test_replay_delays_searches(recording):
+    client = ReplayTwitterClient(recording[0], latency=0.2, jitter=0.1, seed=1)
+    try:
+        start = time.perf_counter()
+        client.search("Sugar is good for people")
+        assert 0.2 <= time.perf_counter() - start < 0.4
+
+        # A search whose delay exceeds its timeout fails after the timeout
+        start = time.perf_counter()
+        with pytest.raises(TwitterError, match="timed out"):
+            client.search("Sugar is good for people", timeout=0.05)
+        assert time.perf_counter() - start < 0.2
+    finally:
+        client.close()
+
+
+def get_failures(path, seed, searches=200):
+    client = ReplayTwitterClient(path, error_rate=0.3, seed=seed)
+    failures = []
+    try:
+        for number in range(searches):
+            try:
+                client.search("Sugar is good for people")
+            except TwitterError:
+                failures.append(number)
+    finally:
+        client.close()
+    return failures
+
+
+def test_replay_fails_reproducibly_with_a_seed(recording):
+    failures = get_failures(recording[0], seed=7)
+    assert 40 <= len(failures) <= 80
+    assert get_failures(recording[0], seed=7) == failures
+    assert get_failures(recording[0], seed=8) != failures
@@ -0,0 +1,91 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from twitter_client import MIN_RETRY_DELAY, RateLimiter, TwitterClient, TwitterError
+
+
+class ScriptedHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.server.requests.append(time.monotonic())
+        status, body, headers = self.server.responses.pop(0)
+        content = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(content)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def scripted_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ScriptedHandler)
+    server.requests = []
+    server.responses = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def create_client(server):
+    return TwitterClient(base_url="http://127.0.0.1:" + str(server.server_address[1]), timeout=5.0)
+
+
+def test_bucket_allows_its_capacity_at_once():
+    limiter = RateLimiter(limit=3, window=60)
+    deadline = time.monotonic()
+    assert all(limiter.acquire(deadline) for _ in range(3))
+    # The next token takes 20 s to refill, which is after the deadline
+    assert not limiter.acquire(time.monotonic() + 1)
+
+
+def test_exhausted_window_blocks_until_the_reset():
+    limiter = RateLimiter(limit=10, window=60)
+    limiter.update({"x-rate-limit-remaining": "0", "x-rate-limit-reset": str(time.time() + 30)})
+    assert not limiter.acquire(time.monotonic() + 10)
+    assert limiter.blocked_until - time.monotonic() > 20
+
+
+def test_throttled_request_without_headers_waits_the_minimum_delay():
+    limiter = RateLimiter(limit=10, window=60)
+    limiter.throttled({})
+    assert not limiter.acquire(time.monotonic() + MIN_RETRY_DELAY / 2)
+    assert limiter.acquire(time.monotonic() + MIN_RETRY_DELAY * 2)
+
+
+def test_throttled_request_honors_retry_after():
+    limiter = RateLimiter(limit=10, window=60)
+    limiter.throttled({"retry-after": "30"})
+    assert limiter.blocked_until - time.monotonic() > 25
+    limiter.throttled({"retry-after": "Wed, 21 Oct 2015 07:28:00 GMT"})
+    assert limiter.blocked_until - time.monotonic() > 25
+
+
+def test_search_backs_off_after_a_429_without_headers(scripted_server):
+    scripted_server.responses = [(429, "{}", {}), (200, json.dumps({"statuses": [{"full_text": "tweet"}]}), {})]
+    statuses = create_client(scripted_server).search("query")
+    assert statuses == [{"full_text": "tweet", "text": "tweet"}]
+    first_request, retry = scripted_server.requests
+    assert retry - first_request >= MIN_RETRY_DELAY * 0.9
+
+
+def test_search_gives_up_at_the_deadline_when_throttled(scripted_server):
+    scripted_server.responses = [(429, "{}", {"Retry-After": "60"})]
+    with pytest.raises(TwitterError):
+        create_client(scripted_server).search("query", timeout=0.5)
+    assert len(scripted_server.requests) == 1
+
+
+@pytest.mark.parametrize("body", ["<html>busy</html>", "[]"])
+def test_search_raises_twitter_error_on_invalid_json(scripted_server, body):
+    scripted_server.responses = [(200, body, {})]
+    with pytest.raises(TwitterError):
+        create_client(scripted_server).search("query")
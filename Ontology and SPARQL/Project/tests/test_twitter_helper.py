@@ -0,0 +1,24 @@
+import time
+
+from knowledge_base import KnowledgeBase
+from twitter_helper import TwitterHelper
+
+
+def test_search_is_cached_until_it_expires(fake_twitter, monkeypatch):
+    monkeypatch.setenv("AGENT_TWITTER_CACHE_TTL", "0.5")
+    KnowledgeBase.reset_instance()
+    helper = TwitterHelper()
+
+    result = helper.for_evaluation().execute_queries("Sugar is good for people")
+    # Searches are cached by their normalized query
+    cached_result = helper.for_evaluation().execute_queries("sugar is GOOD for people")
+    assert fake_twitter.requests == 1
+    assert not result.is_empty()
+    assert cached_result.to_dict() == result.to_dict()
+
+    time.sleep(0.6)
+    fetched_result = helper.for_evaluation().execute_queries("Sugar is good for people")
+    assert fake_twitter.requests == 2
+    assert fetched_result.to_dict() == result.to_dict()
+    statistics = helper.result_cache.get_statistics()
+    assert (statistics["hits"], statistics["misses"], statistics["expirations"]) == (1, 2, 1)
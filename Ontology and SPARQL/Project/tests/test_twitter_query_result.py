@@ -0,0 +1,43 @@
+import json
+
+from twitter_query_result import TwitterQueryResult
+
+
+def create_result(tweets):
+    result = TwitterQueryResult()
+    for text, polarity in tweets:
+        result.append(text, polarity)
+    return result
+
+
+def get_counts(result):
+    return len(result), result.positive_count, result.negative_count, result.neutral_count
+
+
+def test_sentiments_are_counted_when_tweets_are_added():
+    result = create_result([("great", 0.8), ("awful", -1.0), ("a tweet", 0.0), ("nice", 0.25)])
+    assert get_counts(result) == (4, 2, 1, 1)
+    assert result.tweets == [{"text": "great", "sentiment": "positive"}, {"text": "awful", "sentiment": "negative"},
+                             {"text": "a tweet", "sentiment": "neutral"}, {"text": "nice", "sentiment": "positive"}]
+
+    result.extend(create_result([("bad", -0.5), ("worse", -0.7)]))
+    assert get_counts(result) == (6, 2, 3, 1)
+    assert not result.is_empty()
+    assert TwitterQueryResult().is_empty()
+
+
+def test_dictionary_round_trip():
+    result = create_result([("great", 0.8), ("awful", -1.0), ("a tweet", 0.0)])
+    # Results are cached as JSON
+    result_dict = json.loads(json.dumps(result.to_dict()))
+
+    restored_result = TwitterQueryResult()
+    restored_result.add_dict(result_dict)
+    assert restored_result.to_dict() == result.to_dict()
+    assert get_counts(restored_result) == get_counts(result)
+    assert restored_result.get_positive_interval() == result.get_positive_interval()
+
+    # Adding to a result appends the tweets
+    restored_result.add_dict(result_dict)
+    assert get_counts(restored_result) == (6, 2, 2, 2)
+    assert restored_result.texts == result.texts * 2
@@ -0,0 +1,107 @@
+import pytest
+
+from result_cache import ResultCache
+from twitter_client import TwitterError
+from twitter_helper import TwitterHelper
+from twitter_query_result import TwitterQueryResult
+
+POSITIVE_WORDS = ["great", "wonderful", "excellent", "amazing", "perfect"]
+NEGATIVE_WORDS = ["terrible", "awful", "horrible", "disgusting", "worst"]
+
+
+class FakeClient:
+    """
+    Serves pages of tweets with decreasing ids, positive ones with the given share, and fails the pages in "failing".
+    """
+    def __init__(self, positive_share, failing=()):
+        self.positive_share = positive_share
+        self.failing = failing
+        self.requests = []
+
+    def search(self, query, count, timeout, max_id=None):
+        self.requests.append((count, max_id))
+        if len(self.requests) in self.failing:
+            raise TwitterError("Failed to send request: page " + str(len(self.requests)))
+        first_id = 10 ** 6 if max_id is None else max_id
+        tweets = []
+        for tweet_id in range(first_id, first_id - count, -1):
+            positive = (tweet_id % 10) < self.positive_share * 10
+            words = POSITIVE_WORDS if positive else NEGATIVE_WORDS
+            tweets.append({"id": tweet_id, "text": words[tweet_id % 5] + " tweet number " + str(tweet_id)})
+        return tweets
+
+
+class FakeClientTwitterHelper(TwitterHelper):
+    def __init__(self, client):
+        self.fake_client = client
+        super().__init__()
+        self.result_cache = ResultCache(max_entries=16)
+        self.page_size = 50
+        self.max_tweets = 500
+        self.max_latency = 10.0
+        self.max_half_width = 0.05
+
+    def get_client(self, knowledge_base):
+        return self.fake_client
+
+
+def create_result(positive, negative):
+    result = TwitterQueryResult()
+    for _ in range(positive):
+        result.append("good", 0.5)
+    for _ in range(negative):
+        result.append("bad", -0.5)
+    return result
+
+
+@pytest.mark.parametrize("positive, negative, converged", [
+    (0, 0, False),
+    (50, 0, True),
+    (0, 50, True),
+    (25, 25, False),
+    (500, 500, True),
+])
+def test_stop_rule(positive, negative, converged):
+    assert create_result(positive, negative).has_converged(0.05) == converged
+
+
+def test_contested_statement_stops_once_precise_enough():
+    client = FakeClient(positive_share=0.5)
+    result = FakeClientTwitterHelper(client).fetch_streamed_tweets("query", ["key"])
+    # 400 tweets narrow the interval of an even share to +-0.049
+    assert len(client.requests) == 8
+    assert len(result) == 400
+
+
+def test_clear_cut_statement_costs_a_single_page():
+    client = FakeClient(positive_share=1.0)
+    result = FakeClientTwitterHelper(client).fetch_streamed_tweets("query", ["key"])
+    assert len(client.requests) == 1
+    assert len(result) == 50 and result.positive_count == 50
+
+
+def test_contested_statement_fetches_until_the_tweet_budget():
+    client = FakeClient(positive_share=0.5)
+    helper = FakeClientTwitterHelper(client)
+    # 500 tweets narrow the interval of an even share to +-0.044
+    helper.max_half_width = 0.03
+    result = helper.fetch_streamed_tweets("query", ["key"])
+    assert len(client.requests) == 10
+    assert len(result) == 500
+    # Pages go back in time without overlapping
+    assert [max_id for _, max_id in client.requests[1:3]] == [10 ** 6 - 50, 10 ** 6 - 100]
+    assert helper.result_cache.get(["key"]) is not None
+
+
+def test_failed_page_keeps_the_tweets_of_earlier_pages_without_caching_them():
+    client = FakeClient(positive_share=0.5, failing=(3,))
+    helper = FakeClientTwitterHelper(client)
+    result = helper.fetch_streamed_tweets("query", ["key"])
+    assert len(result) == 100
+    assert helper.result_cache.get(["key"]) is None
+
+
+def test_failed_first_page_raises():
+    helper = FakeClientTwitterHelper(FakeClient(positive_share=0.5, failing=(1,)))
+    with pytest.raises(TwitterError):
+        helper.fetch_streamed_tweets("query", ["key"])
@@ -0,0 +1,43 @@
+import logging
+
+# NLTK takes a large part of the startup time to import, so it is imported when the first statement is normalized
+stemmer = None
+
+# Set to False once NLTK reported that the punkt models are missing
+punkt_available = True
+
+
+def tokenize(text):
+    """
+    Split a text into tokens with NLTK's word tokenizer. If the punkt models have not been downloaded (see README),
+    a regular expression based tokenizer that needs no models is used instead.
+    :param text: text to be tokenized
+    :return: list of tokens
+    """
+    global punkt_available
+    from nltk.tokenize import word_tokenize, wordpunct_tokenize
+
+    if punkt_available:
+        try:
+            return word_tokenize(text)
+        except LookupError:
+            logging.warning("NLTK punkt models are missing, falling back to a regular expression tokenizer")
+            punkt_available = False
+    return wordpunct_tokenize(text)
+
+
+def form_query(query):
+    """
+    Normalize a statement into a lowercase string of stemmed tokens.
+    :param query: statement as entered by the user
+    :return: normalized statement
+    """
+    global stemmer
+    if stemmer is None:
+        from nltk.stem import PorterStemmer
+        stemmer = PorterStemmer()
+
+    tokens = tokenize(query.lower())
+    for i in range(len(tokens)):
+        tokens[i] = stemmer.stem(tokens[i])
+    return ' '.join(tokens)
@@ -0,0 +1,97 @@
+import hashlib
+import struct
+from collections import defaultdict
+from functools import lru_cache
+
+from sentiment_engine import clean_tweet
+
+# MinHash signatures consist of BANDS * ROWS minima, two tweets become candidates if all minima of a band agree
+BANDS = 4
+ROWS = 4
+# Every row has its own 32 bit hash function, taken from one 64 byte digest of the token
+ROW_HASHES_FORMAT = struct.Struct("<" + str(BANDS * ROWS) + "I")
+
+
+def normalize_tweet(tweet):
+    """
+    Normalize the text of a tweet for comparison: mentions, links, punctuation, case and a leading "RT" are ignored.
+    :param tweet: text of the tweet
+    :return: list of tokens
+    """
+    tokens = clean_tweet(tweet).lower().split()
+    if tokens and tokens[0] == "rt":
+        del tokens[0]
+    return tokens
+
+
+@lru_cache(maxsize=65536)
+def token_hashes(token):
+    return ROW_HASHES_FORMAT.unpack(hashlib.blake2b(token.encode("utf-8"), digest_size=ROW_HASHES_FORMAT.size).digest())
+
+
+def minhash(tokens):
+    """
+    Compute the MinHash signature of a set of tokens. Two sets agree on a row of their signatures with a probability
+    equal to their Jaccard similarity.
+    :param tokens: non-empty set of tokens
+    :return: list of BANDS * ROWS minima
+    """
+    return list(map(min, zip(*map(token_hashes, tokens))))
+
+
+class TweetDeduplicator:
+    """
+    The tweet deduplicator drops tweets that repeat a tweet it has already seen, so that retweets, copypasta and
+    amplification by bots do not count several times. Exact copies of a normalized text are found by its content hash.
+    Near duplicates are tweets whose token sets have a Jaccard similarity of at least "min_similarity" with a kept
+    tweet. They are found through the bands of the MinHash signatures of the kept tweets: a tweet is only compared to
+    the kept tweets that agree with it on every row of some band, which is likely for similar tweets and practically
+    impossible for unrelated ones. Both checks take constant time per tweet, so a deduplicator can be fed one page of
+    tweets after another.
+    """
+    def __init__(self, min_similarity=0.7):
+        """
+        :param min_similarity: minimal Jaccard similarity of near duplicates, None to only drop exact copies
+        """
+        self.min_similarity = min_similarity
+        self.digests = set()
+        self.token_sets = []
+        self.index = defaultdict(list)
+
+    def add(self, tweet):
+        """
+        Check whether a tweet is new and remember it if so.
+        :param tweet: text of the tweet
+        :return: whether the tweet is neither a copy nor a near duplicate of a tweet seen before
+        """
+        tokens = normalize_tweet(tweet)
+        digest = hashlib.blake2b(" ".join(tokens).encode("utf-8"), digest_size=16).digest()
+        if digest in self.digests:
+            return False
+        self.digests.add(digest)
+
+        if self.min_similarity is None or not tokens:
+            return True
+
+        token_set = frozenset(tokens)
+        signature = minhash(token_set)
+        keys = [(band,) + tuple(signature[band * ROWS:(band + 1) * ROWS]) for band in range(BANDS)]
+        for key in keys:
+            for candidate in self.index.get(key, ()):
+                candidate_set = self.token_sets[candidate]
+                if len(token_set & candidate_set) >= self.min_similarity * len(token_set | candidate_set):
+                    return False
+
+        for key in keys:
+            self.index[key].append(len(self.token_sets))
+        self.token_sets.append(token_set)
+        return True
+
+    def deduplicate(self, tweets, text=lambda tweet: tweet):
+        """
+        Keep the first of every group of duplicate tweets.
+        :param tweets: list of tweets
+        :param text: function returning the text of a tweet
+        :return: list of kept tweets, in their original order
+        """
+        return [tweet for tweet in tweets if self.add(text(tweet))]
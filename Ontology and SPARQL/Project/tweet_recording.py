@@ -0,0 +1,110 @@
+import gzip
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from text_normalizer import form_query
+from twitter_client import TwitterError
+
+
+class TweetRecorder:
+    """
+    The tweet recorder appends every successful search of the twitter client to a gzip compressed JSON lines file,
+    one line per search with its query, count, "max_id" and the returned tweets. Every write adds a complete gzip
+    member, so a recording stays readable if the process stops, and several runs can record into the same file.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+
+    def record(self, query, count, max_id, statuses):
+        line = json.dumps({"query": query, "count": count, "max_id": max_id, "statuses": statuses}) + "\n"
+        with self.lock:
+            with gzip.open(self.path, "at", encoding="utf-8") as file:
+                file.write(line)
+
+
+def read_recordings(path):
+    """
+    Read the searches of a recording.
+    :param path: path of the gzip compressed JSON lines file
+    :return: generator of dictionaries with the query, count, "max_id" and tweets of a search
+    """
+    with gzip.open(path, "rt", encoding="utf-8") as file:
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
+
+
+class ReplayTwitterClient:
+    """
+    The replay twitter client serves recorded searches instead of querying twitter, so the agent can be load tested on
+    a machine without credentials or network access. All tweets recorded for a query are merged and looked up by the
+    normalized query, so the replay also answers searches with a different count or "max_id" than the recorded ones.
+    Queries that were never recorded find no tweets. Every search can be delayed by "latency" seconds plus a uniformly
+    distributed "jitter" and fails with a probability of "error_rate", like a live search that runs into a network
+    error; a search whose delay exceeds its timeout fails after the timeout.
+    """
+    def __init__(self, path, latency=0.0, jitter=0.0, error_rate=0.0, seed=None, max_connections=8, timeout=5.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.timeout = timeout
+        self.random = random.Random(seed)
+        self.random_lock = threading.Lock()
+
+        tweets_by_query = {}
+        for recording in read_recordings(path):
+            tweets = tweets_by_query.setdefault(form_query(recording["query"]), {})
+            for status in recording["statuses"]:
+                tweets[status["id"]] = status
+        # Tweets of every query, most recent first
+        self.tweets = {query: sorted(tweets.values(), key=lambda status: status["id"], reverse=True)
+                       for query, tweets in tweets_by_query.items()}
+
+        self.pool = ThreadPoolExecutor(max_workers=max_connections, thread_name_prefix="twitter-replay")
+
+    @classmethod
+    def from_environment(cls):
+        """
+        Create a replay client from the settings in the environment variables.
+        :return: replay twitter client
+        """
+        seed = os.environ.get("AGENT_TWITTER_REPLAY_SEED")
+        return cls(os.environ["AGENT_TWITTER_REPLAY_PATH"],
+                   float(os.environ.get("AGENT_TWITTER_REPLAY_LATENCY", 0.0)),
+                   float(os.environ.get("AGENT_TWITTER_REPLAY_JITTER", 0.0)),
+                   float(os.environ.get("AGENT_TWITTER_REPLAY_ERROR_RATE", 0.0)),
+                   int(seed) if seed else None,
+                   int(os.environ.get("TWITTER_MAX_CONNECTIONS", 8)),
+                   float(os.environ.get("TWITTER_TIMEOUT", 5.0)))
+
+    def search(self, query, count=10, timeout=None, max_id=None):
+        """
+        Replay a search, see "TwitterClient.search".
+        """
+        timeout = self.timeout if timeout is None else timeout
+        with self.random_lock:
+            delay = self.latency + self.random.uniform(0, self.jitter)
+            failed = self.random.random() < self.error_rate
+
+        if delay > timeout:
+            time.sleep(max(0.0, timeout))
+            raise TwitterError("Failed to send request: replayed search timed out")
+        time.sleep(delay)
+        if failed:
+            raise TwitterError("Failed to send request: replayed network error")
+
+        tweets = self.tweets.get(form_query(query), [])
+        if max_id is not None:
+            tweets = [status for status in tweets if status["id"] <= max_id]
+        return [dict(status) for status in tweets[:count]]
+
+    def search_async(self, query, count=10, timeout=None, max_id=None):
+        return self.pool.submit(self.search, query, count, timeout, max_id)
+
+    def close(self):
+        self.pool.shutdown(wait=False)
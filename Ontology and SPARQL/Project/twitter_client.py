@@ -0,0 +1,221 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import metrics_registry
+
+DEFAULT_BASE_URL = "https://api.twitter.com"
+SEARCH_PATH = "/1.1/search/tweets.json"
+
+# Standard search allows 180 requests per user and 15 minute window
+DEFAULT_RATE_LIMIT = 180
+DEFAULT_RATE_LIMIT_WINDOW = 15 * 60
+# Seconds without requests after a throttled request that neither tells when the window resets nor when to retry
+MIN_RETRY_DELAY = 1.0
+
+
+class TwitterError(Exception):
+    """
+    Raised when a search on twitter fails, times out or is rejected because of the rate limit.
+    """
+
+
+class RateLimiter:
+    """
+    The rate limiter is a token bucket that decides when the next request may be sent. It is refilled continuously,
+    and every response corrects it with the "x-rate-limit-remaining" and "x-rate-limit-reset" headers of the API: the
+    remaining requests are spread evenly until the window resets, and no request is sent before the reset once the
+    window is exhausted. A throttled request blocks the bucket for its "Retry-After" header, or at least
+    "MIN_RETRY_DELAY" seconds.
+    """
+    def __init__(self, limit=DEFAULT_RATE_LIMIT, window=DEFAULT_RATE_LIMIT_WINDOW):
+        self.capacity = limit
+        self.tokens = float(limit)
+        self.rate = limit / window
+        self.updated_at = time.monotonic()
+        self.blocked_until = 0.0
+        self.condition = threading.Condition()
+
+    def _refill(self, now):
+        if now < self.blocked_until:
+            return
+        if self.updated_at < self.blocked_until:
+            # The window has been reset, the next response tells how many requests the new window allows
+            self.tokens = max(self.tokens, 1.0)
+            self.updated_at = self.blocked_until
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def acquire(self, deadline):
+        """
+        Wait until a request may be sent.
+        :param deadline: time (time.monotonic) after which the request is no longer useful
+        :return: whether a request may be sent before the deadline
+        """
+        with self.condition:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+
+                if now < self.blocked_until:
+                    wait = self.blocked_until - now
+                else:
+                    wait = (1 - self.tokens) / self.rate
+                if now + wait > deadline:
+                    return False
+                self.condition.wait(wait)
+
+    def update(self, headers):
+        """
+        Adjust the bucket to the rate limit headers of a response.
+        :param headers: headers of the response
+        """
+        if "x-rate-limit-remaining" not in headers or "x-rate-limit-reset" not in headers:
+            return
+
+        remaining = int(headers["x-rate-limit-remaining"])
+        # The reset is given in whole seconds since the epoch
+        seconds_until_reset = max(1.0, float(headers["x-rate-limit-reset"]) - time.time())
+        with self.condition:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens = min(self.tokens, remaining)
+            if remaining == 0:
+                self.blocked_until = now + seconds_until_reset
+            else:
+                self.rate = remaining / seconds_until_reset
+            self.condition.notify_all()
+
+    def throttled(self, headers):
+        """
+        Block the bucket after a request was throttled with status 429.
+        :param headers: headers of the response
+        """
+        delay = MIN_RETRY_DELAY
+        try:
+            delay = max(delay, float(headers.get("retry-after", 0)))
+        except ValueError:
+            # "Retry-After" may also be an HTTP date, which the minimum delay replaces
+            pass
+        with self.condition:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens = min(self.tokens, 0.0)
+            self.blocked_until = max(self.blocked_until, now + delay)
+            self.condition.notify_all()
+
+
+class TwitterClient:
+    """
+    The twitter client searches tweets through the standard search API. It keeps a pool of keep-alive connections,
+    runs several searches concurrently on a thread pool, schedules requests according to the rate limit of the API
+    and gives every request a deadline. The base URL can be changed, so the client can be tested against a local fake
+    server (see fake_twitter_server.py).
+    """
+    def __init__(self, auth=None, base_url=DEFAULT_BASE_URL, max_connections=8, timeout=5.0):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.rate_limiter = RateLimiter()
+
+        # Requests takes long to import, so it is only imported once a client is created
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.session = requests.Session()
+        self.session.auth = auth
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_connections)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self.pool = ThreadPoolExecutor(max_workers=max_connections, thread_name_prefix="twitter")
+
+        # Set to a TweetRecorder to record every successful search for replaying it later
+        self.recorder = None
+
+    @classmethod
+    def from_environment(cls):
+        """
+        Create a client from the API credentials and settings in the environment variables.
+        Create a .env file with your API credentials.
+        See .env.example for required variables.
+        :return: twitter client
+        """
+        from requests_oauthlib import OAuth1
+
+        auth = OAuth1(os.environ.get('TWITTER_CONSUMER_KEY', ''),
+                      os.environ.get('TWITTER_CONSUMER_SECRET', ''),
+                      os.environ.get('TWITTER_ACCESS_TOKEN', ''),
+                      os.environ.get('TWITTER_ACCESS_TOKEN_SECRET', ''))
+        return cls(auth,
+                   os.environ.get('TWITTER_API_BASE_URL', DEFAULT_BASE_URL),
+                   int(os.environ.get('TWITTER_MAX_CONNECTIONS', 8)),
+                   float(os.environ.get('TWITTER_TIMEOUT', 5.0)))
+
+    def search(self, query, count=10, timeout=None, max_id=None):
+        """
+        Search recent tweets.
+        :param query: search query
+        :param count: number of tweets to fetch
+        :param timeout: seconds until the deadline of the request, including the time waiting for the rate limit
+        :param max_id: only return tweets with an id lower than or equal to this id (for paging back in time)
+        :return: list of tweets as returned by the API
+        """
+        # Already imported when the client was created
+        import requests
+
+        deadline = time.monotonic() + (self.timeout if timeout is None else timeout)
+        parameters = {"q": query, "count": count, "tweet_mode": "extended"}
+        if max_id is not None:
+            parameters["max_id"] = max_id
+
+        while True:
+            if not self.rate_limiter.acquire(deadline):
+                raise TwitterError("Rate limit of the twitter API does not allow a request before the deadline")
+
+            try:
+                response = self.session.get(self.base_url + SEARCH_PATH, params=parameters,
+                                            timeout=max(0.001, deadline - time.monotonic()))
+            except requests.RequestException as e:
+                raise TwitterError("Failed to send request: " + str(e)) from e
+
+            self.rate_limiter.update(response.headers)
+            # A request that was throttled anyway is retried once the rate limiter allows it
+            if response.status_code != 429:
+                break
+            self.rate_limiter.throttled(response.headers)
+            metrics_registry.increment("twitter_rate_limited_total")
+
+        if response.status_code != 200:
+            raise TwitterError("Twitter API responded with status " + str(response.status_code) + ": "
+                               + response.text[:200])
+
+        try:
+            body = response.json()
+        except ValueError as e:
+            raise TwitterError("Twitter API responded with invalid JSON: " + response.text[:200]) from e
+        if not isinstance(body, dict):
+            raise TwitterError("Twitter API responded with unexpected JSON: " + response.text[:200])
+
+        statuses = body.get("statuses", [])
+        for status in statuses:
+            # Extended tweets carry their text in "full_text"
+            status.setdefault("text", status.get("full_text", ""))
+
+        if self.recorder is not None:
+            self.recorder.record(query, count, max_id, statuses)
+        return statuses
+
+    def search_async(self, query, count=10, timeout=None, max_id=None):
+        """
+        Start a search on the thread pool of the client.
+        :return: future of the list of tweets
+        """
+        return self.pool.submit(self.search, query, count, timeout, max_id)
+
+    def close(self):
+        self.pool.shutdown(wait=False)
+        self.session.close()
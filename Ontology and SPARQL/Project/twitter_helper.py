@@ -1,14 +1,15 @@
-import re
-import tweepy
+import logging
 import os
-from tweepy import OAuthHandler
-from textblob import TextBlob
-from twitter_query_result import TwitterQueryResult
+import time
+from concurrent.futures import Future
+from knowledge_base import KnowledgeBase
+from metrics import metrics_registry
+from twitter_query_result import DICT_FORMAT, TwitterQueryResult
 from data_source_helper import IDataSourceHelper
-# import nltk
-# from nltk.corpus import stopwords
-from nltk.tokenize import word_tokenize
-from nltk.stem import PorterStemmer
+from sentiment_engine import clean_tweet
+from text_normalizer import form_query
+from twitter_client import TwitterError
+from tweet_deduplicator import TweetDeduplicator
 
 from result import IResult
 
@@ -16,33 +17,32 @@ from result import IResult
 class TwitterHelper(IDataSourceHelper):
 
     def __init__(self):
+        # The twitter client and its connection pool are shared by all agents of the process
+        knowledge_base = KnowledgeBase.get_instance()
+        self.client = self.get_client(knowledge_base)
+        self.result_cache = knowledge_base.twitter_cache
+        self.sentiment_engine = knowledge_base.sentiment_engine
+        # Tweets whose words overlap this much with an earlier tweet are near duplicates, 0 only drops exact copies
+        self.duplicate_similarity = float(os.environ.get("AGENT_TWITTER_DUPLICATE_SIMILARITY", 0.7)) or None
+
+        # In streaming mode, pages of tweets are fetched until the result converges or a budget runs out
+        self.streaming = os.environ.get("AGENT_TWITTER_STREAMING", "0") == "1"
+        self.page_size = int(os.environ.get("AGENT_TWITTER_PAGE_SIZE", 100))
+        self.max_tweets = int(os.environ.get("AGENT_TWITTER_MAX_TWEETS", 1000))
+        self.max_latency = float(os.environ.get("AGENT_TWITTER_MAX_LATENCY", 5.0))
+        self.max_half_width = float(os.environ.get("AGENT_TWITTER_MAX_HALF_WIDTH", 0.05))
+
+        self.result = TwitterQueryResult()
+
+    def get_client(self, knowledge_base):
         """
-        Twitter API authentication using environment variables.
-        Create a .env file with your API credentials.
-        See .env.example for required variables.
+        The method "get_client" returns the client the tweets are searched with.
+        :param knowledge_base: knowledge base that holds the clients
+        :return: twitter client
         """
-        # Load API keys from environment variables
-        consumer_key = os.environ.get('TWITTER_CONSUMER_KEY', '')
-        consumer_secret = os.environ.get('TWITTER_CONSUMER_SECRET', '')
-        access_token = os.environ.get('TWITTER_ACCESS_TOKEN', '')
-        access_token_secret = os.environ.get('TWITTER_ACCESS_TOKEN_SECRET', '')
-        bearer_token = os.environ.get('TWITTER_BEARER_TOKEN', '')
-
-        # attempt authentication
-        try:
-            # create OAuthHandler object
-            self.auth = OAuthHandler(consumer_key, consumer_secret)
-            # set access token and secret
-            self.auth.set_access_token(access_token, access_token_secret)
-            # create tweepy API object to fetch tweets
-            self.api = tweepy.API(self.auth)
-            # # self.api = tweepy.Client(bearer_token=bearer_token)
-
-        except tweepy.TweepError as e:
-            # print("Error: Authentication Failed")
-            print("Error : " + str(e))
-
-        self.stemmer = PorterStemmer()
+        return knowledge_base.twitter_client
+
+    def reset_result(self):
         self.result = TwitterQueryResult()
 
     def get_result_confidence(self) -> float:
@@ -53,34 +53,11 @@ class TwitterHelper(IDataSourceHelper):
         is to 0, the less confident twitter is about the given scenario.
         :return: interpretation of query result
         """
-        # calling function to get tweets
-        # tweets = self.execute_queries(query='', count=2000)
-        # picking positive tweets from tweets
-        ptweets = [tweet for tweet in self.result.tweets if tweet['sentiment'] == 'positive']
-        # # percentage of positive tweets
-        # print("Positive tweets percentage: {} %".format(100 * len(ptweets) / len(self.result)))
-        # # picking negative tweets from tweets
-        ntweets = [tweet for tweet in self.result.tweets if tweet['sentiment'] == 'negative']
-        # # percentage of negative tweets
-        # print("Negative tweets percentage: {} %".format(100 * len(ntweets) / len(self.result)))
-        # # percentage of neutral tweets
-        # print("Neutral tweets percentage: {} % \
-        #     ".format(100 * (len(self.result) - (len(ntweets) + len(ptweets))) / len(self.result)))
-
-        # # printing first 5 positive tweets
-        # print("\n\nPositive tweets:")
-        # for tweet in ptweets[:10]:
-        #     print(tweet['text'])
-        #
-        # # printing first 5 negative tweets
-        # print("\n\nNegative tweets:")
-        # for tweet in ntweets[:10]:
-        #     print(tweet['text'])
-
-        number_of_results = len(self.result.tweets)
-        # number_of_positive_results = len(self.result.positive_results)
-        if number_of_results >= 0 and len(ptweets) > 0:
-            return (1 / (number_of_results / len(ptweets)) - 0.5) * 2
+        # The sentiment counts are maintained while tweets are added to the result
+        number_of_results = len(self.result)
+        number_of_positive_results = self.result.positive_count
+        if number_of_results >= 0 and number_of_positive_results > 0:
+            return (1 / (number_of_results / number_of_positive_results) - 0.5) * 2
 
         return 0
 
@@ -104,67 +81,167 @@ class TwitterHelper(IDataSourceHelper):
         Utility function to clean tweet text by removing links, special characters
         using simple regex statements.
         '''
-        return ' '.join(re.sub("(@[A-Za-z0-9]+)|([^0-9A-Za-z \t])|(\w+:\/\/\S+)", " ", tweet).split())
+        return clean_tweet(tweet)
 
     def get_tweet_sentiment(self, tweet):
         '''
         Utility function to classify sentiment of passed tweet
-        using textblob's sentiment method
-        '''
-        # create TextBlob object of passed tweet text
-        analysis = TextBlob(self.clean_tweet(tweet))
-        # set sentiment
-        if analysis.sentiment.polarity > 0:
-            return 'positive'
-        elif analysis.sentiment.polarity == 0:
-            return 'neutral'
-        else:
-            return 'negative'
+        using textblob's sentiment lexicon
+        '''
+        return self.sentiment_engine.classify([tweet])[0]
 
-    def execute_queries(self, query, count=10) -> IResult:
+    def execute_queries(self, query, count=10, timeout=None) -> IResult:
         '''
         Main function to fetch tweets and parse them.
+        :param query: search query
+        :param count: number of tweets to fetch
+        :param timeout: seconds the search may take, the default timeout of the twitter client if None
         '''
-        # empty list to store parsed tweets
-        tweets = []
+        return self.finish_queries(self.start_queries(query, count, timeout))
 
+    def start_queries(self, query, count=10, timeout=None):
+        '''
+        Start fetching tweets without waiting for them, so several searches can be in flight at once. Pass the returned
+        future to "finish_queries" to fill the result. Searches are cached by their normalized query and count, a
+        cached search needs neither a request nor sentiment analysis. In streaming mode, "count" and "timeout" are
+        replaced by the tweet and latency budgets of the stream.
+        :return: future of the twitter query result
+        '''
+        if self.streaming:
+            key = [form_query(query), "stream", self.max_tweets, self.max_half_width, DICT_FORMAT]
+        else:
+            key = [form_query(query), count, DICT_FORMAT]
+        result_dict = self.result_cache.get(key)
+        if result_dict is not None:
+            result = TwitterQueryResult()
+            result.add_dict(result_dict)
+            future = Future()
+            future.set_result(result)
+            return future
+
+        if self.streaming:
+            return self.client.pool.submit(self.fetch_streamed_tweets, query, key)
+        return self.client.pool.submit(self.fetch_tweets, query, count, timeout, key)
+
+    def fetch_tweets(self, query, count, timeout, key):
+        '''
+        Fetch tweets, parse them and cache the result under the given key.
+        '''
+        # call twitter api to fetch tweets
+        fetched_tweets = self.search(query, count, timeout)
+
+        # retweets, copies and near duplicates are only counted once
+        deduplicator = TweetDeduplicator(self.duplicate_similarity)
+        result = self.parse_tweets(deduplicator.deduplicate(fetched_tweets, text=lambda tweet: tweet['text']))
+        metrics_registry.increment("twitter_duplicates_total", len(fetched_tweets) - len(result))
+
+        self.result_cache.put(key, result.to_dict())
+        return result
+
+    def fetch_streamed_tweets(self, query, key):
+        '''
+        Fetch pages of tweets until the share of positive tweets is known precisely enough, so clear-cut statements
+        cost a single page and contested ones get more tweets. Fetching also stops when the tweet or latency budget
+        runs out. The result is cached under the given key, unless a page failed.
+        '''
+        result = TwitterQueryResult()
+        pages = self.stream_tweets(query, self.page_size, self.max_tweets, time.monotonic() + self.max_latency)
         try:
-            # call twitter api to fetch tweets
-            fetched_tweets = self.api.search_tweets(q=query, count=count)
-
-            # parsing tweets one by one
-            for tweet in fetched_tweets:
-                # empty dictionary to store required params of a tweet
-                parsed_tweet = {}
-
-                # saving text of tweet
-                parsed_tweet['text'] = tweet.text
-                # saving sentiment of tweet
-                parsed_tweet['sentiment'] = self.get_tweet_sentiment(tweet.text)
-
-                # appending parsed tweet to tweets list
-                if tweet.retweet_count > 0:
-                    # if tweet has retweets, ensure that it is appended only once
-                    if parsed_tweet not in tweets:
-                        tweets.append(parsed_tweet)
-                else:
-                    tweets.append(parsed_tweet)
-            # print(tweets)
-            # return parsed tweets
-            # return tweets
-            self.result.tweets = tweets
-
-        except tweepy.errors.TweepyException as e:
-            # print error (if any)
-            print("Error : " + str(e))
+            for page in pages:
+                result.extend(page)
+                if result.has_converged(self.max_half_width):
+                    break
+        except TwitterError as e:
+            if result.is_empty():
+                raise
+            logging.warning("Searching twitter stopped after " + str(len(result)) + " tweets: " + str(e))
+            return result
+        finally:
+            pages.close()
+
+        self.result_cache.put(key, result.to_dict())
+        return result
+
+    def stream_tweets(self, query, page_size, max_tweets, deadline):
+        '''
+        Generator of parsed tweets, one twitter query result per page. Pages are only fetched when the next one is
+        requested, going back in time from the most recent tweets. Duplicates are dropped across pages.
+        :param query: search query
+        :param page_size: number of tweets fetched per page
+        :param max_tweets: number of tweets after which no further page is fetched
+        :param deadline: time (time.monotonic) after which no further page is fetched
+        '''
+        deduplicator = TweetDeduplicator(self.duplicate_similarity)
+        fetched_count = 0
+        max_id = None
+        while fetched_count < max_tweets and time.monotonic() < deadline:
+            fetched_tweets = self.search(query, min(page_size, max_tweets - fetched_count),
+                                         deadline - time.monotonic(), max_id)
+            if not fetched_tweets:
+                return
+
+            fetched_count += len(fetched_tweets)
+            max_id = min(tweet['id'] for tweet in fetched_tweets) - 1
+            page = self.parse_tweets(deduplicator.deduplicate(fetched_tweets, text=lambda tweet: tweet['text']))
+            metrics_registry.increment("twitter_duplicates_total", len(fetched_tweets) - len(page))
+            yield page
+
+    def search(self, query, count, timeout, max_id=None):
+        '''
+        Search tweets with the client and record the latency and failures of the search.
+        '''
+        with metrics_registry.span("twitter_search_seconds"):
+            try:
+                fetched_tweets = self.client.search(query, count, timeout, max_id)
+            except TwitterError:
+                metrics_registry.increment("twitter_search_errors_total")
+                raise
+        metrics_registry.increment("twitter_tweets_total", len(fetched_tweets))
+        return fetched_tweets
+
+    def parse_tweets(self, fetched_tweets):
+        '''
+        Classify the sentiment of fetched tweets.
+        :param fetched_tweets: tweets as returned by the twitter client
+        :return: twitter query result with the text and polarity of every tweet
+        '''
+        texts = [tweet['text'] for tweet in fetched_tweets]
 
+        result = TwitterQueryResult()
+        # classifying the sentiment of all tweets in one batch
+        for text, polarity in zip(texts, self.sentiment_engine.polarities(texts)):
+            result.append(text, polarity)
+        return result
+
+    def finish_queries(self, result_future) -> IResult:
+        '''
+        Wait for a search started with "start_queries" and make its tweets the result.
+        '''
+        self.result = self.wait_for_result(result_future)
         return self.result
 
+    def execute_many(self, queries, count=10, timeout=None):
+        '''
+        Fetch tweets for several queries at once. All searches are started before the first one is waited for, so they
+        share the connection pool of the twitter client.
+        :param queries: search queries
+        :return: list of twitter query results in the order of the queries
+        '''
+        result_futures = [self.start_queries(query, count, timeout) for query in queries]
+        return [self.wait_for_result(result_future) for result_future in result_futures]
+
+    def wait_for_result(self, result_future):
+        '''
+        Wait for a search started with "start_queries".
+        :return: twitter query result, empty if the search failed
+        '''
+        try:
+            return result_future.result()
+        except TwitterError as e:
+            logging.warning("Searching twitter failed: " + str(e))
+            return TwitterQueryResult()
+
     def form_query(self, query):
-        query = query.lower()
-        tokens = word_tokenize(query)
-        for i in range(len(tokens)):
-            tokens[i] = self.stemmer.stem(tokens[i])
-        return ' '.join(tokens)
+        return form_query(query)
 
 
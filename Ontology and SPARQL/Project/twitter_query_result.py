@@ -1,10 +1,120 @@
+import math
+from array import array
+
 from result import IResult
 
+# Version of the dictionaries created by "to_dict", part of the cache keys of twitter results
+DICT_FORMAT = 2
 
-class TwitterQueryResult(IResult):
+SENTIMENT_LABELS = {1: 'positive', 0: 'neutral', -1: 'negative'}
 
+
+class TwitterQueryResult(IResult):
+    """
+    The result of a twitter search, stored by column: the texts of the tweets, their sentiment as one signed byte each
+    (1 positive, 0 neutral, -1 negative) and their polarity as a 4 byte float. Apart from its text, a tweet takes 13
+    bytes instead of a dictionary per tweet. The sentiment counters are updated when tweets are appended, so
+    interpreting the result does not scan the tweets.
+    """
     def __init__(self):
-        self.tweets = []
+        self.texts = []
+        self.sentiments = array('b')
+        self.polarities = array('f')
+
+        self.positive_count = 0
+        self.negative_count = 0
+        self.neutral_count = 0
+
+    def __len__(self):
+        return len(self.texts)
+
+    def append(self, text, polarity):
+        """
+        Append a tweet and count its sentiment.
+        :param text: text of the tweet
+        :param polarity: polarity of the tweet between -1 and 1
+        """
+        sentiment = (polarity > 0) - (polarity < 0)
+        self.texts.append(text)
+        self.sentiments.append(sentiment)
+        self.polarities.append(polarity)
+
+        if sentiment > 0:
+            self.positive_count += 1
+        elif sentiment < 0:
+            self.negative_count += 1
+        else:
+            self.neutral_count += 1
+
+    def extend(self, other):
+        """
+        Append all tweets of another result, for example the next page of a search.
+        :param other: twitter query result
+        """
+        self.texts.extend(other.texts)
+        self.sentiments.extend(other.sentiments)
+        self.polarities.extend(other.polarities)
+        self.positive_count += other.positive_count
+        self.negative_count += other.negative_count
+        self.neutral_count += other.neutral_count
+
+    @property
+    def tweets(self):
+        """
+        The tweets as a list of dictionaries with their text and sentiment label, created on every access.
+        """
+        return [{'text': text, 'sentiment': SENTIMENT_LABELS[sentiment]}
+                for text, sentiment in zip(self.texts, self.sentiments)]
+
+    def get_positive_interval(self, z=1.96):
+        """
+        Return the Wilson score interval of the share of positive tweets, by default at a confidence of 95 %.
+        :param z: quantile of the standard normal distribution for the confidence level
+        :return: lower and upper bound of the interval
+        """
+        total = len(self.texts)
+        if total == 0:
+            return 0.0, 1.0
+
+        share = self.positive_count / total
+        center = (share + z * z / (2 * total)) / (1 + z * z / total)
+        half_width = z * math.sqrt(share * (1 - share) / total + z * z / (4 * total * total)) / (1 + z * z / total)
+        return center - half_width, center + half_width
+
+    def has_converged(self, max_half_width):
+        """
+        Decide whether more tweets could still change the interpretation of the result. This is not the case once the
+        interval of the positive share lies on one side of 0.5, where the confidence of twitter changes its sign, or
+        is at most "max_half_width" wide to either side.
+        :param max_half_width: half width of the interval below which a result is precise enough
+        :return: whether fetching more tweets can stop
+        """
+        low, high = self.get_positive_interval()
+        return low > 0.5 or high < 0.5 or (high - low) / 2 <= max_half_width
+
+    def to_dict(self):
+        """
+        Convert the result into a JSON-serializable dictionary, for instance to cache it.
+        :return: dictionary with the texts, sentiments and polarities of the tweets
+        """
+        return {
+            "texts": list(self.texts),
+            "sentiments": self.sentiments.tolist(),
+            "polarities": self.polarities.tolist()
+        }
+
+    def add_dict(self, result_dict):
+        """
+        Append the tweets of a dictionary created by "to_dict".
+        :param result_dict: dictionary with the texts, sentiments and polarities of the tweets
+        """
+        sentiments = result_dict["sentiments"]
+        self.texts.extend(result_dict["texts"])
+        self.sentiments.extend(sentiments)
+        self.polarities.extend(result_dict["polarities"])
+        self.positive_count += sentiments.count(1)
+        self.negative_count += sentiments.count(-1)
+        self.neutral_count += sentiments.count(0)
 
     def is_empty(self) -> bool:
-        return self.tweets == []
+        return len(self.texts) == 0
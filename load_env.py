@@ -17,6 +17,10 @@ def load_environment():
         'TWITTER_ACCESS_TOKEN_SECRET',
         'TWITTER_BEARER_TOKEN'
     ]
+
+    # Replayed tweets come from a recording and need no credentials
+    if os.environ.get('AGENT_TWITTER_SOURCE') == 'replay':
+        required_vars = ['AGENT_TWITTER_REPLAY_PATH']
     
     missing_vars = [var for var in required_vars if not os.environ.get(var)]
     